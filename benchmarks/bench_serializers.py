@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Pronote Desktop — Micro-benchmarks des sérialiseurs du backend.
+
+Génère une année scolaire d'objets au format pronotepy (voir
+`synthetic_pronotepy.py`, une part des objets est privée de ses attributs
+optionnels pour exercer les replis `hasattr`), puis mesure pour chaque
+sérialiseur et pour `jsonify` : le temps par objet et les allocations
+(tracemalloc). Les temps sont aussi exprimés relativement à une boucle de
+calibration, ce qui rend le fichier de référence comparable d'une machine à
+l'autre ; `--baseline` fait échouer le run en cas de régression.
+
+Exemples :
+    python3 benchmarks/bench_serializers.py --update-baseline
+    python3 benchmarks/bench_serializers.py --baseline benchmarks/baselines/serializers.json
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+for _path in (BENCH_DIR, REPO_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import synthetic_pronotepy  # noqa: E402
+
+REPORT_VERSION = 1
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "serializers.json")
+
+
+def build_dataset(module: Any) -> dict[str, list]:
+    """Objets bruts d'une année complète, tels que les renvoie l'upstream."""
+    upstream = module.upstream
+    school = upstream.school
+    mondays = list(synthetic_pronotepy._mondays(school.year_start, school.year_end))
+    client = module.Client("https://synthetic.pronote.invalid/pronote/eleve.html", "bench", "bench")
+    return {
+        "lessons": [lesson for monday in mondays for lesson in upstream.lessons_for_week(monday)],
+        "homework": [item for monday in mondays for item in upstream.homework_for_week(monday)],
+        "grades": [(grade, period) for period in upstream.periods for grade in upstream.grades_for_period(period)],
+        "discussions": list(upstream.discussions),
+        "informations": list(upstream.informations),
+        "menus": client.menus(school.year_start, school.year_end),
+    }
+
+
+def serializer_cases(api: Any, dataset: dict[str, list]) -> list[tuple[str, Callable[[], Any], int]]:
+    """(nom, fonction qui sérialise tout le jeu, nombre d'objets)."""
+    period_dicts = {id(p): api.period_to_dict(p) for _grade, p in dataset["grades"]}
+    serialized = {
+        "lessons": [api.lesson_to_dict(l) for l in dataset["lessons"]],
+        "grades": [api.grade_to_dict(g, period_dicts[id(p)]) for g, p in dataset["grades"]],
+        "discussions": [api.discussion_to_dict(d) for d in dataset["discussions"]],
+    }
+
+    def jsonify(payload: list) -> Callable[[], Any]:
+        def run() -> Any:
+            with api.app.test_request_context():
+                return api.jsonify(payload).get_data()
+        return run
+
+    return [
+        ("lesson_to_dict", lambda: [api.lesson_to_dict(l) for l in dataset["lessons"]], len(dataset["lessons"])),
+        ("homework_to_dict", lambda: [api.homework_to_dict(h) for h in dataset["homework"]], len(dataset["homework"])),
+        ("grade_to_dict", lambda: [api.grade_to_dict(g, period_dicts[id(p)]) for g, p in dataset["grades"]], len(dataset["grades"])),
+        ("discussion_to_dict", lambda: [api.discussion_to_dict(d) for d in dataset["discussions"]], len(dataset["discussions"])),
+        ("info_to_dict", lambda: [api.info_to_dict(i) for i in dataset["informations"]], len(dataset["informations"])),
+        ("_normalize_value", lambda: [api._normalize_value(m) for m in dataset["menus"]], len(dataset["menus"])),
+        ("menus_to_dicts", lambda: api.menus_to_dicts(dataset["menus"]), len(dataset["menus"])),
+        ("jsonify_lessons", jsonify(serialized["lessons"]), len(serialized["lessons"])),
+        ("jsonify_grades", jsonify(serialized["grades"]), len(serialized["grades"])),
+        ("jsonify_discussions", jsonify(serialized["discussions"]), len(serialized["discussions"])),
+    ]
+
+
+def calibrate(rounds: int = 5) -> float:
+    """Durée (ns) d'une boucle Python de référence, pour normaliser les temps."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter_ns()
+        for i in range(20000):
+            {"id": str(i), "name": "x" if i % 2 else None, "items": [i, i + 1]}.get("name")
+        best = min(best, time.perf_counter_ns() - started)
+    return best / 20000
+
+
+def measure(fn: Callable[[], Any], items: int, repeat: int, calibration_ns: float) -> dict[str, Any]:
+    fn()  # échauffement (caches, imports paresseux)
+    best = float("inf")
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter_ns()
+            fn()
+            best = min(best, time.perf_counter_ns() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    per_item_ns = best / items if items else 0.0
+    return {
+        "items": items,
+        "best_ms": round(best / 1e6, 3),
+        "per_item_us": round(per_item_ns / 1000, 3),
+        "relative_cost": round(per_item_ns / calibration_ns, 3) if calibration_ns else 0.0,
+        "peak_kb": round((peak - before) / 1024, 1),
+        "retained_bytes_per_item": round((retained - before) / items, 1) if items else 0.0,
+    }
+
+
+def run_bench(api: Any, module: Any, *, repeat: int = 5, cases: Optional[list[str]] = None) -> dict[str, Any]:
+    dataset = build_dataset(module)
+    calibration_ns = calibrate()
+    results = {}
+    for name, fn, items in serializer_cases(api, dataset):
+        if cases is None or name in cases:
+            results[name] = measure(fn, items, repeat, calibration_ns)
+    school = module.upstream.school
+    return {
+        "report_version": REPORT_VERSION,
+        "meta": {
+            "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "calibration_ns": round(calibration_ns, 2),
+            "school": {k: (v.isoformat() if isinstance(v, datetime.date) else v) for k, v in vars(school).items()},
+        },
+        "cases": results,
+    }
+
+
+def find_regressions(
+    baseline: dict[str, Any],
+    report: dict[str, Any],
+    *,
+    time_tolerance: float = 0.30,
+    memory_tolerance: float = 0.15,
+) -> list[str]:
+    """Régressions au-delà des tolérances (coût relatif et octets retenus par objet)."""
+    problems = []
+    for name, now in report.get("cases", {}).items():
+        before = baseline.get("cases", {}).get(name)
+        if before is None:
+            continue
+        if before["relative_cost"] and now["relative_cost"] > before["relative_cost"] * (1 + time_tolerance):
+            problems.append(
+                f"{name}: coût relatif {before['relative_cost']:.2f} → {now['relative_cost']:.2f} "
+                f"({(now['relative_cost'] / before['relative_cost'] - 1) * 100:+.0f}%)"
+            )
+        old_bytes, new_bytes = before["retained_bytes_per_item"], now["retained_bytes_per_item"]
+        if old_bytes > 0 and new_bytes > old_bytes * (1 + memory_tolerance):
+            problems.append(f"{name}: mémoire retenue {old_bytes:.0f} → {new_bytes:.0f} octets/objet")
+    return problems
+
+
+def _parse_args(argv: Optional[list[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks des sérialiseurs du backend Pronote Desktop")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cases", help="Liste de cas séparés par des virgules (défaut : tous)")
+    parser.add_argument("--lessons-per-week", type=int, default=30)
+    parser.add_argument("--grades-per-period", type=int, default=60)
+    parser.add_argument("--sparse-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Fichier JSON du rapport (défaut : stdout)")
+    parser.add_argument("--baseline", help="Référence à comparer (échec si régression)")
+    parser.add_argument("--update-baseline", action="store_true", help=f"Écrit le rapport dans {DEFAULT_BASELINE}")
+    parser.add_argument("--time-tolerance", type=float, default=0.30)
+    parser.add_argument("--memory-tolerance", type=float, default=0.15)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import load_backend
+
+    args = _parse_args(argv)
+    school = synthetic_pronotepy.SyntheticSchool(
+        lessons_per_week=args.lessons_per_week,
+        grades_per_period=args.grades_per_period,
+        sparse_ratio=args.sparse_ratio,
+        seed=args.seed,
+    )
+    module = synthetic_pronotepy.build_module(school)
+    api = load_backend.import_backend(module)
+    report = run_bench(
+        api, module, repeat=args.repeat, cases=[c.strip() for c in args.cases.split(",")] if args.cases else None
+    )
+    serialized = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    output = DEFAULT_BASELINE if args.update_baseline else args.output
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            f.write(serialized + "\n")
+    else:
+        print(serialized)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = find_regressions(
+            baseline, report, time_tolerance=args.time_tolerance, memory_tolerance=args.memory_tolerance
+        )
+        for line in problems:
+            print(f"RÉGRESSION {line}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Pronote Desktop — Benchmark de charge bout-en-bout du backend Flask.
+
+Lance la vraie application `pronote_api.app` sur un serveur WSGI local,
+adossée à un upstream pronotepy synthétique (voir `synthetic_pronotepy.py`),
+puis envoie une charge concurrente sur chaque route `/api/*`. Le rapport JSON
+(débit, percentiles de latence, nombre d'appels upstream par route) est
+stable et peut être comparé entre versions avec `--compare`.
+
+Exemples :
+    python3 benchmarks/load_backend.py --output bench-report.json
+    python3 benchmarks/load_backend.py --latency-ms 40 --error-rate 0.05 --compare bench-report.json
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+for _path in (BENCH_DIR, REPO_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import synthetic_pronotepy  # noqa: E402
+
+REPORT_VERSION = 1
+
+# (nom, méthode, chemin, corps JSON). Les ids référencent les données synthétiques.
+ROUTES: list[tuple[str, str, str, Optional[dict]]] = [
+    ("health", "GET", "/api/health", None),
+    ("metrics", "GET", "/api/metrics", None),
+    ("config", "GET", "/api/config", None),
+    ("timetable_week", "GET", "/api/timetable?from={monday}&to={sunday}", None),
+    ("timetable_month", "GET", "/api/timetable?from={monday}&to={month_end}", None),
+    ("timetable_month_columnar", "GET", "/api/timetable?from={monday}&to={month_end}&format=columnar", None),
+    ("homework", "GET", "/api/homework?from={monday}&to={fortnight}", None),
+    ("homework_done", "PATCH", "/api/homework/{homework_id}/done", {"done": True}),
+    ("lesson_content", "GET", "/api/lessons/{lesson_id}/content?from={monday}&to={sunday}", None),
+    ("periods", "GET", "/api/periods", None),
+    ("grades", "GET", "/api/grades?period_id={period_id}", None),
+    ("grades_columnar", "GET", "/api/grades?period_id={period_id}&format=columnar", None),
+    ("averages", "GET", "/api/averages?period_id={period_id}", None),
+    ("absences", "GET", "/api/absences?period_id={period_id}", None),
+    ("delays", "GET", "/api/delays?period_id={period_id}", None),
+    ("discussions", "GET", "/api/discussions", None),
+    ("discussion_reply", "POST", "/api/discussions/{discussion_id}/reply", {"content": "Bien reçu."}),
+    ("discussion_status", "PATCH", "/api/discussions/{discussion_id}/status", {"mark_as": "read"}),
+    ("discussion_new", "POST", "/api/discussions/new", {"recipient_ids": ["rcp-1", "rcp-2"], "subject": "Bench", "content": "Message"}),
+    ("recipients", "GET", "/api/recipients", None),
+    ("search", "GET", "/api/search?q=controle+chap&limit=20", None),
+    ("informations", "GET", "/api/informations", None),
+    ("information_read", "PATCH", "/api/informations/{information_id}/read", {}),
+    ("menus", "GET", "/api/menus?from={monday}&to={sunday}", None),
+    ("export_ical", "GET", "/api/export/ical", None),
+]
+
+
+def import_backend(module: Any):
+    """Importe `pronote_api` branché sur le module pronotepy synthétique."""
+    sandbox = tempfile.mkdtemp(prefix="pronote-bench-")
+    os.environ.setdefault("PRONOTE_CONFIG", os.path.join(sandbox, "config.json"))
+    os.environ.setdefault("PRONOTE_DATA_DIR", os.path.join(sandbox, "data"))
+    os.environ.setdefault("PRONOTE_CACHE_DIR", os.path.join(sandbox, "cache"))
+    sys.modules["pronotepy"] = module
+    import pronote_api
+
+    prepare_backend(pronote_api, module)
+    return pronote_api
+
+
+def prepare_backend(api: Any, module: Any) -> None:
+    """Rebranche un backend déjà importé sur `module` avec un adapter neuf."""
+    api.pronotepy = module
+    api._adapter = api._with_resilience(api.build_backend_adapter(), api.CONFIG)
+
+
+def _percentile(sorted_values: list[float], ratio: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(ratio * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def _route_params(upstream: synthetic_pronotepy.SyntheticUpstream) -> dict[str, str]:
+    school = upstream.school
+    # Semaine courante (bornée à l'année simulée) : c'est la fenêtre par défaut des routes.
+    reference = min(max(datetime.date.today(), school.year_start), school.year_end)
+    monday = reference - datetime.timedelta(days=reference.weekday())
+    return {
+        "monday": monday.isoformat(),
+        "sunday": (monday + datetime.timedelta(days=6)).isoformat(),
+        "fortnight": (monday + datetime.timedelta(days=13)).isoformat(),
+        "month_end": (monday + datetime.timedelta(days=27)).isoformat(),
+        "homework_id": f"hw-{monday.isoformat()}-0",
+        "lesson_id": f"les-{monday.isoformat()}-0",
+        "period_id": next(
+            (p.id for p in upstream.periods if p.start.date() <= reference <= p.end.date()),
+            upstream.periods[0].id,
+        ),
+        "discussion_id": "dsc-0",
+        "information_id": "inf-0",
+    }
+
+
+class _Worker(threading.local):
+    """Une connexion HTTP keep-alive par thread de charge."""
+
+    def connection(self, port: int) -> http.client.HTTPConnection:
+        conn = getattr(self, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            self.conn = conn
+        return conn
+
+    def reset(self) -> None:
+        conn = getattr(self, "conn", None)
+        if conn is not None:
+            conn.close()
+        self.conn = None
+
+
+def _send(worker: _Worker, port: int, method: str, path: str, body: Optional[dict]) -> tuple[int, float, int]:
+    payload = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if payload is not None else {}
+    started = time.perf_counter()
+    try:
+        conn = worker.connection(port)
+        conn.request(method, path, body=payload, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        status = response.status
+        if response.getheader("Connection", "").lower() == "close":
+            worker.reset()
+    except (OSError, http.client.HTTPException):
+        worker.reset()
+        return 599, (time.perf_counter() - started) * 1000, 0
+    return status, (time.perf_counter() - started) * 1000, len(data)
+
+
+def run_load(
+    api: Any,
+    module: Any,
+    *,
+    concurrency: int = 8,
+    requests_per_route: int = 50,
+    routes: Optional[list[str]] = None,
+) -> dict[str, Any]:
+    """Exécute la charge route par route et renvoie le rapport (dict JSON-sérialisable)."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class _QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args: Any, **kwargs: Any) -> None:
+            pass
+
+    upstream = module.upstream
+    school = upstream.school
+    params = _route_params(upstream)
+    selected = [r for r in ROUTES if routes is None or r[0] in routes]
+
+    server = make_server("127.0.0.1", 0, api.app, threaded=True, request_handler=_QuietHandler)
+    port = server.server_port
+    server_thread = threading.Thread(target=server.serve_forever, name="bench-server", daemon=True)
+    server_thread.start()
+    worker = _Worker()
+    report_routes: dict[str, Any] = {}
+    try:
+        status, _, _ = _send(worker, port, "POST", "/api/login", {
+            "pronote_url": "https://synthetic.pronote.invalid/pronote/eleve.html",
+            "username": "bench",
+            "password": "bench",
+        })
+        if status != 200:
+            raise RuntimeError(f"Connexion au backend synthétique impossible (HTTP {status})")
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-load") as pool:
+            for name, method, template, body in selected:
+                path = template.format(**params)
+                upstream.reset_calls()
+                started = time.perf_counter()
+                results = list(pool.map(lambda _: _send(worker, port, method, path, body), range(requests_per_route)))
+                elapsed = time.perf_counter() - started
+                latencies = sorted(r[1] for r in results)
+                errors = sum(1 for r in results if r[0] >= 500)
+                upstream_calls = upstream.call_counts()
+                report_routes[name] = {
+                    "method": method,
+                    "path": template,
+                    "requests": len(results),
+                    "errors": errors,
+                    "status_codes": {str(code): sum(1 for r in results if r[0] == code) for code in sorted({r[0] for r in results})},
+                    "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+                    "latency_ms": {
+                        "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                        "p50": round(_percentile(latencies, 0.50), 3),
+                        "p90": round(_percentile(latencies, 0.90), 3),
+                        "p99": round(_percentile(latencies, 0.99), 3),
+                        "max": round(latencies[-1], 3) if latencies else 0.0,
+                    },
+                    "response_bytes_mean": round(sum(r[2] for r in results) / len(results), 1) if results else 0.0,
+                    "upstream_calls": sum(upstream_calls.values()),
+                    "upstream_calls_per_request": round(sum(upstream_calls.values()) / len(results), 3) if results else 0.0,
+                    "upstream_breakdown": dict(sorted(upstream_calls.items())),
+                }
+    finally:
+        worker.reset()
+        server.shutdown()
+        server_thread.join(timeout=5)
+
+    total_requests = sum(r["requests"] for r in report_routes.values())
+    return {
+        "report_version": REPORT_VERSION,
+        "meta": {
+            "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": concurrency,
+            "requests_per_route": requests_per_route,
+            "school": {k: (v.isoformat() if isinstance(v, datetime.date) else v) for k, v in vars(school).items()},
+        },
+        "routes": report_routes,
+        "totals": {
+            "requests": total_requests,
+            "errors": sum(r["errors"] for r in report_routes.values()),
+            "upstream_calls": sum(r["upstream_calls"] for r in report_routes.values()),
+        },
+    }
+
+
+def compare_reports(previous: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Lignes lisibles : évolution p50/p99/débit/appels upstream par route."""
+    lines = [f"{'route':<20} {'p50 ms':>16} {'p99 ms':>16} {'req/s':>16} {'upstream/req':>14}"]
+    for name, now in current.get("routes", {}).items():
+        before = previous.get("routes", {}).get(name)
+        if before is None:
+            lines.append(f"{name:<20} (nouvelle route)")
+            continue
+
+        def delta(old: float, new: float) -> str:
+            if not old:
+                return f"{new:.2f}"
+            return f"{new:.2f} ({(new - old) / old * 100:+.0f}%)"
+
+        lines.append(
+            f"{name:<20} {delta(before['latency_ms']['p50'], now['latency_ms']['p50']):>16} "
+            f"{delta(before['latency_ms']['p99'], now['latency_ms']['p99']):>16} "
+            f"{delta(before['throughput_rps'], now['throughput_rps']):>16} "
+            f"{before['upstream_calls_per_request']:.2f}→{now['upstream_calls_per_request']:.2f}"
+        )
+    return lines
+
+
+def _parse_args(argv: Optional[list[str]]) -> argparse.Namespace:
+    defaults = synthetic_pronotepy.SyntheticSchool()
+    parser = argparse.ArgumentParser(description="Benchmark de charge du backend Pronote Desktop")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests-per-route", type=int, default=50)
+    parser.add_argument("--routes", help="Liste de routes séparées par des virgules (défaut : toutes)")
+    parser.add_argument("--lessons-per-week", type=int, default=defaults.lessons_per_week)
+    parser.add_argument("--homework-per-week", type=int, default=defaults.homework_per_week)
+    parser.add_argument("--periods", type=int, default=defaults.periods)
+    parser.add_argument("--grades-per-period", type=int, default=defaults.grades_per_period)
+    parser.add_argument("--discussions", type=int, default=defaults.discussions)
+    parser.add_argument("--messages-per-discussion", type=int, default=defaults.messages_per_discussion)
+    parser.add_argument("--informations", type=int, default=defaults.informations)
+    parser.add_argument("--recipients", type=int, default=defaults.recipients)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-jitter-ms", type=float, default=defaults.latency_jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", help="Fichier JSON du rapport (défaut : stdout)")
+    parser.add_argument("--compare", help="Rapport précédent à comparer")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(argv)
+    school = synthetic_pronotepy.SyntheticSchool(
+        lessons_per_week=args.lessons_per_week,
+        homework_per_week=args.homework_per_week,
+        periods=args.periods,
+        grades_per_period=args.grades_per_period,
+        discussions=args.discussions,
+        messages_per_discussion=args.messages_per_discussion,
+        informations=args.informations,
+        recipients=args.recipients,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    module = synthetic_pronotepy.build_module(school)
+    api = import_backend(module)
+    report = run_load(
+        api,
+        module,
+        concurrency=args.concurrency,
+        requests_per_route=args.requests_per_route,
+        routes=[r.strip() for r in args.routes.split(",")] if args.routes else None,
+    )
+    serialized = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(serialized + "\n")
+    else:
+        print(serialized)
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print("\n".join(compare_reports(previous, report)), file=sys.stderr)
+    return 1 if report["totals"]["errors"] and not args.error_rate else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
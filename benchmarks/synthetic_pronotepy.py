@@ -0,0 +1,562 @@
+"""
+Pronote Desktop — Upstream Pronote synthétique pour les benchmarks backend.
+
+Construit un module `pronotepy` de remplacement dont les volumes (cours par
+semaine, discussions, messages, notes par période…), la latence par appel et
+le taux d'erreur sont paramétrables. Chaque appel « réseau » (méthode client
+ou propriété paresseuse de période) est compté pour pouvoir mesurer combien
+d'appels upstream coûte une route.
+"""
+
+import dataclasses
+import datetime
+import random
+import threading
+import time
+import types
+from collections import Counter
+from typing import Any, Optional
+
+
+def _current_school_year() -> tuple[datetime.date, datetime.date]:
+    today = datetime.date.today()
+    first_year = today.year if today.month >= 8 else today.year - 1
+    return datetime.date(first_year, 9, 1), datetime.date(first_year + 1, 7, 3)
+
+
+@dataclasses.dataclass
+class SyntheticSchool:
+    """Volumes et comportement de l'upstream simulé."""
+
+    lessons_per_week: int = 30
+    homework_per_week: int = 12
+    periods: int = 3
+    grades_per_period: int = 60
+    subjects: int = 12
+    discussions: int = 40
+    messages_per_discussion: int = 6
+    informations: int = 30
+    recipients: int = 300
+    rooms: int = 25
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    # Proportion d'objets privés de leurs attributs optionnels (chemins `hasattr`).
+    sparse_ratio: float = 0.0
+    seed: int = 1234
+    # Année scolaire en cours par défaut : les fenêtres « aujourd'hui ± N jours » du backend tombent dedans.
+    year_start: datetime.date = dataclasses.field(default_factory=lambda: _current_school_year()[0])
+    year_end: datetime.date = dataclasses.field(default_factory=lambda: _current_school_year()[1])
+
+
+class SyntheticUpstreamError(Exception):
+    """Erreur injectée (équivalent d'un PronoteAPIError / timeout réseau)."""
+
+
+_OPTIONAL_LESSON_ATTRS = ("memo", "status", "group_name", "background_color", "outing", "detention", "exempted")
+_OPTIONAL_GRADE_ATTRS = ("comment", "average", "max", "min", "is_bonus", "is_optionnal", "is_out_of_20")
+_OPTIONAL_INFO_ATTRS = ("author", "category", "content")
+
+_SUBJECT_NAMES = (
+    "Mathématiques", "Français", "Histoire-Géographie", "Anglais", "Espagnol", "Physique-Chimie",
+    "SVT", "Technologie", "EPS", "Arts plastiques", "Éducation musicale", "NSI", "SES", "Philosophie",
+)
+_TEACHERS = (
+    "Mme Martin", "M. Bernard", "Mme Dubois", "M. Thomas", "Mme Robert", "M. Richard", "Mme Petit",
+    "M. Durand", "Mme Leroy", "M. Moreau", "Mme Simon", "M. Laurent", "Mme Lefèbvre", "M. Michel",
+)
+_WORDS = (
+    "contrôle", "chapitre", "exercice", "révision", "sortie", "réunion", "conseil", "classe", "élèves",
+    "parents", "devoir", "évaluation", "projet", "séance", "cahier", "manuel", "calculatrice", "dictée",
+    "exposé", "oral", "brevet", "baccalauréat", "stage", "orientation", "cantine", "absence", "retard",
+)
+
+
+class _Obj:
+    """Objet pronotepy générique : attributs simples, `to_dict()` comme pronotepy.Object."""
+
+    def __init__(self, **fields: Any) -> None:
+        self.__dict__.update(fields)
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+
+
+def _sparsify(obj: Any, attrs: tuple, rng: random.Random, ratio: float) -> Any:
+    if ratio and rng.random() < ratio:
+        for attr in attrs:
+            obj.__dict__.pop(attr, None)
+    return obj
+
+
+class SyntheticUpstream:
+    """État partagé : données générées, compteurs d'appels, latence et erreurs."""
+
+    def __init__(self, school: SyntheticSchool) -> None:
+        self.school = school
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._fault_rng = random.Random(school.seed ^ 0x5EED)
+        self._rng = random.Random(school.seed)
+        self.subjects = [
+            _Obj(id=f"sub-{i}", name=_SUBJECT_NAMES[i % len(_SUBJECT_NAMES)] + ("" if i < len(_SUBJECT_NAMES) else f" {i}"), groups=False)
+            for i in range(max(1, school.subjects))
+        ]
+        self.rooms = [f"Salle {100 + i}" for i in range(max(1, school.rooms))]
+        self._weeks: dict[datetime.date, list] = {}
+        self._homework_weeks: dict[datetime.date, list] = {}
+        self.periods = self._build_periods()
+        self.discussions = [self._build_discussion(i) for i in range(school.discussions)]
+        self.informations = [self._build_information(i) for i in range(school.informations)]
+        self.recipients = [
+            _Obj(
+                id=f"rcp-{i}",
+                name=f"{_TEACHERS[i % len(_TEACHERS)]} {i}",
+                type="teacher" if i % 5 else "staff",
+                email=None,
+                functions=[],
+                with_discussion=True,
+            )
+            for i in range(school.recipients)
+        ]
+
+    # ─── Simulation réseau ────────────────────────────────────────────────────
+    def hit(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+            fail = self.school.error_rate > 0 and self._fault_rng.random() < self.school.error_rate
+            jitter = self._fault_rng.uniform(0, self.school.latency_jitter_ms) if self.school.latency_jitter_ms else 0.0
+        delay = (self.school.latency_ms + jitter) / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise SyntheticUpstreamError(f"erreur injectée sur {name}")
+
+    def reset_calls(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def call_counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+    # ─── Génération ───────────────────────────────────────────────────────────
+    def _text(self, rng: random.Random, words: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+    def _attachment(self, rng: random.Random, owner: str, index: int) -> _Obj:
+        return _Obj(
+            id=f"{owner}-file-{index}",
+            name=f"document-{index}.pdf",
+            url=f"https://synthetic.pronote.invalid/files/{owner}/{index}.pdf",
+            type=1,
+        )
+
+    def _build_periods(self) -> list:
+        school = self.school
+        span = (school.year_end - school.year_start).days
+        count = max(1, school.periods)
+        periods = []
+        for index in range(count):
+            start = school.year_start + datetime.timedelta(days=span * index // count)
+            end = school.year_start + datetime.timedelta(days=span * (index + 1) // count - 1)
+            periods.append(SyntheticPeriod(self, f"per-{index + 1}", f"Trimestre {index + 1}", start, end))
+        return periods
+
+    def lessons_for_week(self, monday: datetime.date) -> list:
+        cached = self._weeks.get(monday)
+        if cached is not None:
+            return cached
+        school = self.school
+        rng = random.Random(f"{school.seed}:lessons:{monday.toordinal()}")
+        lessons = []
+        for index in range(school.lessons_per_week):
+            day = monday + datetime.timedelta(days=index % 5)
+            hour = 8 + (index // 5) % 9
+            subject = rng.choice(self.subjects)
+            teacher = rng.choice(_TEACHERS)
+            room = rng.choice(self.rooms)
+            group = f"{rng.randint(3, 6)}{rng.choice('ABCD')}"
+            start = datetime.datetime.combine(day, datetime.time(hour, 0))
+            lesson = SyntheticLesson(
+                self,
+                id=f"les-{monday.isoformat()}-{index}",
+                subject=subject,
+                teacher_name=teacher,
+                teacher_names=[teacher],
+                classroom=room,
+                classrooms=[room],
+                start=start,
+                end=start + datetime.timedelta(minutes=55),
+                canceled=rng.random() < 0.03,
+                outing=False,
+                detention=False,
+                exempted=False,
+                background_color=f"#{rng.randrange(0x1000000):06x}",
+                status="Cours annulé" if rng.random() < 0.03 else None,
+                group_name=group,
+                group_names=[group],
+                memo=self._text(rng, 4) if rng.random() < 0.2 else None,
+                _content=_Obj(
+                    title=subject.name,
+                    description=self._text(rng, 20),
+                    category="Cours",
+                    files=[self._attachment(rng, f"les-{monday.isoformat()}-{index}", 0)] if rng.random() < 0.1 else [],
+                ),
+            )
+            lessons.append(_sparsify(lesson, _OPTIONAL_LESSON_ATTRS, rng, school.sparse_ratio))
+        self._weeks[monday] = lessons
+        return lessons
+
+    def homework_for_week(self, monday: datetime.date) -> list:
+        cached = self._homework_weeks.get(monday)
+        if cached is not None:
+            return cached
+        school = self.school
+        rng = random.Random(f"{school.seed}:homework:{monday.toordinal()}")
+        items = []
+        for index in range(school.homework_per_week):
+            hw_id = f"hw-{monday.isoformat()}-{index}"
+            items.append(SyntheticHomework(
+                self,
+                id=hw_id,
+                subject=rng.choice(self.subjects),
+                description=self._text(rng, 15),
+                done=rng.random() < 0.4,
+                date=monday + datetime.timedelta(days=index % 5),
+                files=[self._attachment(rng, hw_id, i) for i in range(rng.choice((0, 0, 0, 1, 2)))],
+            ))
+        self._homework_weeks[monday] = items
+        return items
+
+    def grades_for_period(self, period: "SyntheticPeriod") -> list:
+        school = self.school
+        rng = random.Random(f"{school.seed}:grades:{period.id}")
+        span = max(1, (period.end - period.start).days)
+        grades = []
+        for index in range(school.grades_per_period):
+            out_of = rng.choice((20, 20, 20, 10, 5, 40))
+            roll = rng.random()
+            if roll < 0.04:
+                value = "Abs"
+            elif roll < 0.06:
+                value = "Disp"
+            else:
+                value = f"{rng.uniform(0, out_of):.2f}".rstrip("0").rstrip(".").replace(".", ",")
+            grade = _Obj(
+                id=f"gr-{period.id}-{index}",
+                grade=value,
+                out_of=str(out_of),
+                default_out_of="20",
+                date=period.start + datetime.timedelta(days=rng.randrange(span)),
+                subject=rng.choice(self.subjects),
+                period=period,
+                average=f"{rng.uniform(6, 16):.2f}".replace(".", ","),
+                max=f"{rng.uniform(14, 20):.2f}".replace(".", ","),
+                min=f"{rng.uniform(0, 8):.2f}".replace(".", ","),
+                coefficient=rng.choice(("1", "1", "2", "0,5", "3")),
+                comment=self._text(rng, 3) if rng.random() < 0.3 else "",
+                is_bonus=rng.random() < 0.05,
+                is_optionnal=rng.random() < 0.05,
+                is_out_of_20=out_of == 20,
+            )
+            grades.append(_sparsify(grade, _OPTIONAL_GRADE_ATTRS, rng, school.sparse_ratio))
+        return grades
+
+    def averages_for_period(self, period: "SyntheticPeriod") -> list:
+        rng = random.Random(f"{self.school.seed}:averages:{period.id}")
+        return [
+            _Obj(
+                student=f"{rng.uniform(6, 18):.2f}".replace(".", ","),
+                class_average=f"{rng.uniform(8, 14):.2f}".replace(".", ","),
+                max=f"{rng.uniform(15, 20):.2f}".replace(".", ","),
+                min=f"{rng.uniform(0, 7):.2f}".replace(".", ","),
+                out_of="20",
+                default_out_of="20",
+                subject=subject,
+                background_color=f"#{rng.randrange(0x1000000):06x}",
+            )
+            for subject in self.subjects
+        ]
+
+    def absences_for_period(self, period: "SyntheticPeriod") -> list:
+        rng = random.Random(f"{self.school.seed}:absences:{period.id}")
+        span = max(1, (period.end - period.start).days)
+        items = []
+        for index in range(rng.randint(2, 10)):
+            day = period.start + datetime.timedelta(days=rng.randrange(span))
+            items.append(_Obj(
+                id=f"abs-{period.id}-{index}",
+                from_date=datetime.datetime.combine(day, datetime.time(8)),
+                to_date=datetime.datetime.combine(day, datetime.time(12)),
+                justified=rng.random() < 0.7,
+                hours="4h00",
+                days=0,
+                reasons=[rng.choice(("Maladie", "Rendez-vous", "Transport"))],
+            ))
+        return items
+
+    def delays_for_period(self, period: "SyntheticPeriod") -> list:
+        rng = random.Random(f"{self.school.seed}:delays:{period.id}")
+        span = max(1, (period.end - period.start).days)
+        return [
+            _Obj(
+                id=f"del-{period.id}-{index}",
+                date=datetime.datetime.combine(period.start + datetime.timedelta(days=rng.randrange(span)), datetime.time(8, 5)),
+                minutes=rng.randint(2, 25),
+                justified=rng.random() < 0.5,
+                justification="",
+                reasons=["Transport"],
+            )
+            for index in range(rng.randint(1, 8))
+        ]
+
+    def _build_discussion(self, index: int) -> "SyntheticDiscussion":
+        rng = self._rng
+        start = datetime.datetime.combine(self.school.year_start, datetime.time(8)) + datetime.timedelta(hours=index * 7)
+        messages = [
+            _Obj(
+                id=f"msg-{index}-{m}",
+                author=rng.choice(_TEACHERS),
+                content=self._text(rng, 40),
+                date=start + datetime.timedelta(minutes=m * 30),
+                seen=rng.random() < 0.8,
+            )
+            for m in range(self.school.messages_per_discussion)
+        ]
+        return SyntheticDiscussion(
+            self,
+            id=f"dsc-{index}",
+            subject=self._text(rng, 4),
+            creator=rng.choice(_TEACHERS),
+            unread=rng.random() < 0.25,
+            date=start,
+            messages=messages,
+            participants=[],
+        )
+
+    def _build_information(self, index: int) -> "SyntheticInformation":
+        rng = self._rng
+        info = SyntheticInformation(
+            self,
+            id=f"inf-{index}",
+            title=self._text(rng, 5),
+            author=rng.choice(("Administration", "Vie scolaire", rng.choice(_TEACHERS))),
+            content=self._text(rng, 60),
+            creation_date=datetime.datetime.combine(self.school.year_start, datetime.time(9)) + datetime.timedelta(days=index),
+            read=rng.random() < 0.6,
+            category=rng.choice(("Général", "Vie scolaire", "Sorties")),
+        )
+        return _sparsify(info, _OPTIONAL_INFO_ATTRS, rng, self.school.sparse_ratio)
+
+
+class SyntheticLesson(_Obj):
+    def __init__(self, upstream: SyntheticUpstream, **fields: Any) -> None:
+        super().__init__(**fields)
+        self._upstream = upstream
+
+    @property
+    def content(self) -> Any:
+        self._upstream.hit("Lesson.content")
+        return self._content
+
+
+class SyntheticHomework(_Obj):
+    def __init__(self, upstream: SyntheticUpstream, **fields: Any) -> None:
+        super().__init__(**fields)
+        self._upstream = upstream
+
+    def set_done(self, done: bool) -> None:
+        self._upstream.hit("Homework.set_done")
+        self.done = bool(done)
+
+
+class SyntheticDiscussion(_Obj):
+    def __init__(self, upstream: SyntheticUpstream, **fields: Any) -> None:
+        super().__init__(**fields)
+        self._upstream = upstream
+
+    def reply(self, content: str) -> None:
+        self._upstream.hit("Discussion.reply")
+        self.messages.append(_Obj(
+            id=f"{self.id}-reply-{len(self.messages)}",
+            author="Moi",
+            content=content,
+            date=datetime.datetime.now(),
+            seen=True,
+        ))
+
+    def mark_as(self, mark_as: str) -> None:
+        self._upstream.hit("Discussion.mark_as")
+        self.unread = mark_as == "unread"
+
+    def delete(self) -> None:
+        self._upstream.hit("Discussion.delete")
+        self._upstream.discussions = [d for d in self._upstream.discussions if d is not self]
+
+
+class SyntheticInformation(_Obj):
+    def __init__(self, upstream: SyntheticUpstream, **fields: Any) -> None:
+        super().__init__(**fields)
+        self._upstream = upstream
+
+    def mark_as_read(self) -> None:
+        self._upstream.hit("Information.mark_as_read")
+        self.read = True
+
+
+class SyntheticPeriod:
+    """Période pronotepy : notes, moyennes, absences et retards sont des appels paresseux."""
+
+    def __init__(self, upstream: SyntheticUpstream, period_id: str, name: str, start: datetime.date, end: datetime.date) -> None:
+        self._upstream = upstream
+        self.id = period_id
+        self.name = name
+        self.start = datetime.datetime.combine(start, datetime.time())
+        self.end = datetime.datetime.combine(end, datetime.time())
+
+    @property
+    def grades(self) -> list:
+        self._upstream.hit("Period.grades")
+        return self._upstream.grades_for_period(self)
+
+    @property
+    def averages(self) -> list:
+        self._upstream.hit("Period.averages")
+        return self._upstream.averages_for_period(self)
+
+    @property
+    def absences(self) -> list:
+        self._upstream.hit("Period.absences")
+        return self._upstream.absences_for_period(self)
+
+    @property
+    def delays(self) -> list:
+        self._upstream.hit("Period.delays")
+        return self._upstream.delays_for_period(self)
+
+
+def _mondays(date_from: datetime.date, date_to: datetime.date):
+    monday = date_from - datetime.timedelta(days=date_from.weekday())
+    while monday <= date_to:
+        yield monday
+        monday += datetime.timedelta(days=7)
+
+
+def _as_date(value: Any) -> datetime.date:
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+
+def build_module(school: Optional[SyntheticSchool] = None) -> types.ModuleType:
+    """Module `pronotepy` complet adossé à un SyntheticUpstream (exposé en `module.upstream`)."""
+    upstream = SyntheticUpstream(school or SyntheticSchool())
+    module = types.ModuleType("pronotepy")
+
+    class _BaseClient:
+        def __init__(self, pronote_url: str, username: str = "", password: str = "", **kwargs: Any) -> None:
+            upstream.hit(f"{type(self).__name__}.login")
+            self.pronote_url = pronote_url
+            self.username = username
+            self.logged_in = bool(password)
+            self.info = _Obj(name="Compte Synthétique", establishment="Collège Synthétique", class_name="3A")
+
+        @property
+        def periods(self) -> list:
+            upstream.hit("Client.periods")
+            return list(upstream.periods)
+
+        def lessons(self, date_from: Any, date_to: Any = None) -> list:
+            upstream.hit("Client.lessons")
+            start = _as_date(date_from)
+            end = _as_date(date_to) if date_to is not None else start
+            return [
+                lesson
+                for monday in _mondays(start, end)
+                for lesson in upstream.lessons_for_week(monday)
+                if start <= lesson.start.date() <= end
+            ]
+
+        def homework(self, date_from: Any, date_to: Any = None) -> list:
+            upstream.hit("Client.homework")
+            start = _as_date(date_from)
+            end = _as_date(date_to) if date_to is not None else start + datetime.timedelta(days=14)
+            return [
+                item
+                for monday in _mondays(start, end)
+                for item in upstream.homework_for_week(monday)
+                if start <= item.date <= end
+            ]
+
+        def discussions(self, only_unread: bool = False) -> list:
+            upstream.hit("Client.discussions")
+            return [d for d in upstream.discussions if d.unread or not only_unread]
+
+        def information_and_surveys(self, date_from: Any = None, date_to: Any = None, only_unread: bool = False) -> list:
+            upstream.hit("Client.information_and_surveys")
+            return [i for i in upstream.informations if not only_unread or not getattr(i, "read", False)]
+
+        def get_recipients(self) -> list:
+            upstream.hit("Client.get_recipients")
+            return list(upstream.recipients)
+
+        def new_discussion(self, recipients: list, subject: str, content: str) -> Any:
+            upstream.hit("Client.new_discussion")
+            discussion = SyntheticDiscussion(
+                upstream,
+                id=f"dsc-new-{len(upstream.discussions)}",
+                subject=subject,
+                creator="Moi",
+                unread=False,
+                date=datetime.datetime.now(),
+                messages=[_Obj(id="msg-new", author="Moi", content=content, date=datetime.datetime.now(), seen=True)],
+                participants=[],
+            )
+            upstream.discussions.append(discussion)
+            return discussion
+
+        def menus(self, date_from: Any, date_to: Any = None) -> list:
+            upstream.hit("Client.menus")
+            start = _as_date(date_from)
+            end = _as_date(date_to) if date_to is not None else start
+            days = (end - start).days + 1
+            return [
+                _Obj(
+                    id=f"menu-{(start + datetime.timedelta(days=i)).isoformat()}",
+                    name=None,
+                    date=start + datetime.timedelta(days=i),
+                    is_lunch=True,
+                    is_dinner=False,
+                    first_meal=[_Obj(name="Salade composée", labels=[_Obj(id="bio", name="Bio", color="#00aa00")])],
+                    main_meal=[_Obj(name="Poulet rôti", labels=[]), _Obj(name="Poisson pané", labels=[])],
+                    side_meal=[_Obj(name="Haricots verts", labels=[])],
+                    other_meal=[],
+                    cheese=[_Obj(name="Emmental", labels=[])],
+                    dessert=[_Obj(name="Fruit de saison", labels=[_Obj(id="local", name="Local", color="#aa5500")])],
+                )
+                for i in range(max(0, days))
+                if (start + datetime.timedelta(days=i)).weekday() < 5
+            ]
+
+        def export_ical(self, timezone_shift: int = 0, **kwargs: Any) -> str:
+            upstream.hit("Client.export_ical")
+            return "BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//synthetic//FR\nEND:VCALENDAR\n"
+
+        def refresh(self) -> None:
+            upstream.hit("Client.refresh")
+
+    class Client(_BaseClient):
+        pass
+
+    class TeacherClient(_BaseClient):
+        pass
+
+    module.Client = Client
+    module.TeacherClient = TeacherClient
+    module.Lesson = SyntheticLesson
+    module.Homework = SyntheticHomework
+    module.Grade = _Obj
+    module.Average = _Obj
+    module.Period = SyntheticPeriod
+    module.PronoteAPIError = SyntheticUpstreamError
+    module.upstream = upstream
+    return module
@@ -20,6 +20,8 @@ if systemctl is-active --quiet pronote-desktop-api.service 2>/dev/null; then
     : # Backend géré par systemd — ouverture directe du navigateur
 else
     # Démarrage manuel du backend (fallback si systemd non disponible)
+    # warm : /api/health répond avant l'import de pronotepy (préchargé en arrière-plan)
+    export PRONOTE_STARTUP_MODE="${PRONOTE_STARTUP_MODE:-warm}"
     if [ -f "$VENV_DIR/bin/python3" ]; then
         cd "$INSTALL_DIR"
         "$VENV_DIR/bin/python3" pronote_api.py &
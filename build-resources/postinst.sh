@@ -193,7 +193,8 @@ PY
 
 if ! health_ok; then
   if [ -x "$PY_BIN" ] && [ -f "$BACKEND_SCRIPT" ]; then
-    nohup "$PY_BIN" "$BACKEND_SCRIPT" >/tmp/pronote-backend.log 2>&1 &
+    # warm : /api/health répond avant l'import de pronotepy (préchargé en arrière-plan).
+    PRONOTE_STARTUP_MODE="${PRONOTE_STARTUP_MODE:-warm}" nohup "$PY_BIN" "$BACKEND_SCRIPT" >/tmp/pronote-backend.log 2>&1 &
     for i in $(seq 1 20); do
       if health_ok; then
         break
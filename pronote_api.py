@@ -6,46 +6,1141 @@ Ce serveur Flask fait le pont entre l'interface React et l'API Pronote
 via la bibliothèque pronotepy.
 """
 
-import pronotepy
+from __future__ import annotations
+
+import time
+
+# Origine des phases de démarrage publiées par /api/health.
+_STARTUP_T0 = time.perf_counter()
+
+import base64
+import bisect
+import contextlib
 import datetime
+import fnmatch
+import functools
+import hashlib
+import heapq
+import importlib
 import json
+import math
+import mimetypes
 import os
+import random
+import re
+import secrets
 import subprocess
+import sys
+import tempfile
+import threading
 import traceback
-from typing import Any, List, Optional, Tuple
-from flask import Flask, Response, request, jsonify, send_from_directory
+import tracemalloc
+import types
+import unicodedata
+import weakref
+import zipfile
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 
+
+# ─── Démarrage (import paresseux de pronotepy, phases chronométrées) ──────────
+class StartupTimeline:
+    """Phases de démarrage, en millisecondes depuis le lancement du module."""
+
+    def __init__(self, mode: str, t0: float) -> None:
+        self.mode = mode
+        self._t0 = t0
+        self._lock = threading.Lock()
+        self._phases: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    def _ms(self, instant: float) -> float:
+        return round((instant - self._t0) * 1000, 2)
+
+    def mark(self, name: str) -> None:
+        """Instant ponctuel (ex: `listening`) ; seule la première occurrence compte."""
+        now = time.perf_counter()
+        with self._lock:
+            self._phases.setdefault(name, {"at_ms": self._ms(now), "duration_ms": 0.0})
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            ended = time.perf_counter()
+            values: dict[str, Any] = {"at_ms": self._ms(started), "duration_ms": round((ended - started) * 1000, 2)}
+            if failed:
+                values["failed"] = True
+            with self._lock:
+                self._phases[name] = values
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            phases = {name: dict(values) for name, values in self._phases.items()}
+        return {
+            "mode": self.mode,
+            "pronotepy_loaded": not isinstance(pronotepy, _LazyModule) or pronotepy.loaded,
+            "uptime_ms": self._ms(time.perf_counter()),
+            "phases": phases,
+        }
+
+
+class _LazyModule(types.ModuleType):
+    """Module importé au premier accès à un attribut (thread-safe)."""
+
+    def __init__(self, name: str, timeline: StartupTimeline) -> None:
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_timeline"] = timeline
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_lazy_module"] is not None
+
+    def load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is not None:
+            return module
+        with self.__dict__["_lazy_lock"]:
+            if self.__dict__["_lazy_module"] is None:
+                with self.__dict__["_lazy_timeline"].phase(f"import_{self.__name__}"):
+                    self.__dict__["_lazy_module"] = importlib.import_module(self.__name__)
+            return self.__dict__["_lazy_module"]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.load(), name)
+
+
+# PRONOTE_STARTUP_MODE :
+# - eager (défaut) : pronotepy importé au chargement du module ;
+# - lazy : importé à la première connexion ;
+# - warm : comme lazy, mais préchargé en arrière-plan dès que le serveur écoute.
+STARTUP_MODE = os.environ.get("PRONOTE_STARTUP_MODE", "eager").strip().lower() or "eager"
+_startup = StartupTimeline(STARTUP_MODE, _STARTUP_T0)
+_startup.mark("imports")
+
+if STARTUP_MODE in ("lazy", "warm"):
+    pronotepy = _LazyModule("pronotepy", _startup)
+else:
+    with _startup.phase("import_pronotepy"):
+        import pronotepy
+
+
+def _warm_pronotepy() -> None:
+    """Précharge pronotepy (et ses dépendances crypto) hors du chemin critique."""
+    if isinstance(pronotepy, _LazyModule):
+        try:
+            pronotepy.load()
+        except Exception:
+            traceback.print_exc()
+
 # --- Configuration ---
 CONFIG_PATH = os.environ.get('PRONOTE_CONFIG', '/etc/pronote-desktop/config.json')
+CONFIG_DEFAULTS: dict[str, Any] = {"api_port": 5174, "check_updates": True, "theme": "light"}
 
-def load_config():
-    """Charge la configuration depuis config.json, avec valeurs par défaut."""
-    defaults = {"api_port": 5174, "check_updates": True, "theme": "light"}
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    """Écrit un JSON via fichier temporaire + rename (jamais de fichier tronqué)."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
     try:
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH) as f:
-                data = json.load(f)
-                defaults.update(data)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
     except Exception:
-        pass
-    return defaults
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _watch_with_inotify(directory: str, filename: str, on_change: Callable[[], Any]) -> bool:
+    """Surveille `filename` dans `directory` via inotify (Linux). False si indisponible."""
+    try:
+        import ctypes
+        import ctypes.util
+        import struct
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return False
+        # IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE : couvre écriture directe et rename atomique.
+        if libc.inotify_add_watch(fd, os.fsencode(directory), 0x8 | 0x80 | 0x100 | 0x200) < 0:
+            os.close(fd)
+            return False
+    except Exception:
+        return False
+
+    target = os.fsencode(filename)
+
+    def _loop() -> None:
+        while True:
+            try:
+                buffer = os.read(fd, 4096)
+            except OSError:
+                return
+            offset = 0
+            while offset + 16 <= len(buffer):
+                _, _, _, length = struct.unpack_from("iIII", buffer, offset)
+                name = buffer[offset + 16: offset + 16 + length].split(b"\0", 1)[0]
+                offset += 16 + length
+                if name == target:
+                    on_change()
+
+    threading.Thread(target=_loop, name="pronote-config-inotify", daemon=True).start()
+    return True
+
+
+class ConfigError(Exception):
+    """config.json existe mais n'est pas lisible : écriture refusée."""
+
+
+class ConfigManager:
+    """config.json gardé en mémoire, relu seulement quand le fichier change.
+
+    Le changement est détecté par (inode, mtime, taille) à chaque lecture, ou
+    poussé par inotify/polling une fois `start_watching()` appelé. Les
+    abonnés reçoivent `(ancienne, nouvelle)` configuration à chaque changement.
+    Un fichier invalide (JSON cassé, pas un objet) laisse en place la dernière
+    configuration lue correctement, et `update()` refuse alors d'écrire pour
+    ne pas écraser le fichier avec une configuration partielle.
+    """
+
+    def __init__(self, path: str, defaults: dict[str, Any]) -> None:
+        self._path = path
+        self._defaults = dict(defaults)
+        self._lock = threading.RLock()
+        self._signature: Optional[tuple] = None
+        self._raw: dict[str, Any] = {}
+        self._data: Optional[dict[str, Any]] = None
+        self._invalid = False
+        self._subscribers: List[Callable[[dict, dict], None]] = []
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _stat_signature(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self._path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read_file(self) -> Optional[dict[str, Any]]:
+        """Contenu du fichier, ou None s'il existe mais n'est pas un objet JSON valide."""
+        try:
+            with open(self._path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _apply(self, raw: dict[str, Any], signature: Optional[tuple]) -> None:
+        merged = dict(self._defaults)
+        merged.update(raw)
+        previous = self._data
+        self._raw = raw
+        self._data = merged
+        self._signature = signature
+        if previous is not None and previous != merged:
+            for callback in list(self._subscribers):
+                try:
+                    callback(dict(previous), dict(merged))
+                except Exception:
+                    traceback.print_exc()
+
+    def refresh(self) -> bool:
+        """Relit le fichier si sa signature a changé. Retourne True si relu."""
+        with self._lock:
+            signature = self._stat_signature()
+            if self._data is not None and signature == self._signature:
+                return False
+            raw = self._read_file() if signature is not None else {}
+            self._invalid = raw is None
+            if raw is None:
+                raw = self._raw
+            self._apply(raw, signature)
+            return True
+
+    def get(self) -> dict[str, Any]:
+        self.refresh()
+        with self._lock:
+            return dict(self._data or self._defaults)
+
+    def update(self, changes: dict[str, Any]) -> dict[str, Any]:
+        """Fusionne `changes` dans le fichier (écriture atomique) et notifie.
+
+        Lève ConfigError si le fichier présent est invalide : on ne réécrit
+        pas par-dessus une édition manuelle en cours.
+        """
+        with self._lock:
+            self.refresh()
+            if self._invalid:
+                raise ConfigError(f"{self._path} invalide : corriger le fichier avant de modifier la configuration")
+            raw = dict(self._raw)
+            raw.update(changes)
+            if raw != self._raw or self._signature is None:
+                _atomic_write_json(self._path, raw)
+                self._apply(raw, self._stat_signature())
+            return dict(self._data or self._defaults)
+
+    def subscribe(self, callback: Callable[[dict, dict], None]) -> Callable[[dict, dict], None]:
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def start_watching(self, poll_interval: float = 2.0) -> str:
+        """Démarre la surveillance du fichier : inotify si possible, sinon polling."""
+        directory = os.path.dirname(self._path) or "."
+        if os.path.isdir(directory) and _watch_with_inotify(directory, os.path.basename(self._path), self.refresh):
+            return "inotify"
+
+        def _poll() -> None:
+            while True:
+                time.sleep(poll_interval)
+                self.refresh()
+
+        threading.Thread(target=_poll, name="pronote-config-poll", daemon=True).start()
+        return "poll"
+
+
+config_manager = ConfigManager(CONFIG_PATH, CONFIG_DEFAULTS)
+
+
+def load_config():
+    """Charge la configuration depuis config.json, avec valeurs par défaut (cache mémoire)."""
+    return config_manager.get()
+
+with _startup.phase("config"):
+    CONFIG = load_config()
 
-CONFIG = load_config()
+
+@config_manager.subscribe
+def _refresh_global_config(previous: dict, current: dict) -> None:
+    # CONFIG est lu un peu partout : on le met à jour en place.
+    CONFIG.clear()
+    CONFIG.update(current)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Données locales (fixtures, index…) et cache disque, par utilisateur (XDG).
+DATA_DIR = os.environ.get(
+    'PRONOTE_DATA_DIR',
+    os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'pronote-desktop'),
+)
+CACHE_DIR = os.environ.get(
+    'PRONOTE_CACHE_DIR',
+    os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'pronote-desktop'),
+)
 # DIST_DIR : répertoire du build Vite (dist/ en dev, BASE_DIR en production installée)
 # En production (.deb), les assets sont copiés directement dans BASE_DIR (index.html + assets/)
 # En développement, ils sont dans BASE_DIR/dist/
 DIST_DIR = os.path.join(BASE_DIR, 'dist') if os.path.isdir(os.path.join(BASE_DIR, 'dist')) else BASE_DIR
-app = Flask(__name__, static_folder=os.path.join(DIST_DIR, 'assets'), static_url_path='/assets')
+# Les assets sont servis par StaticFileIndex (route /assets ci-dessous), pas par Flask.
+app = Flask(__name__, static_folder=None)
 CORS(app, origins=["*"])
 
+
+# ─── Fichiers statiques (build Vite) ──────────────────────────────────────────
+# Vite nomme ses assets `nom-<hash>.ext` : leur contenu ne change jamais.
+_HASHED_ASSET_RE = re.compile(r"^assets/.+[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticEntry:
+    __slots__ = ("rel_path", "abs_path", "size", "mtime", "mimetype", "variants", "_etag", "_body")
+
+    def __init__(self, rel_path: str, abs_path: str, size: int, mtime: float) -> None:
+        self.rel_path = rel_path
+        self.abs_path = abs_path
+        self.size = size
+        self.mtime = mtime
+        self.mimetype = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+        self.variants: dict[str, "StaticEntry"] = {}
+        self._etag: Optional[str] = None
+        self._body: Optional[bytes] = None
+
+
+class StaticFileIndex:
+    """Index chemin → (taille, mtime, hash, variantes précompressées) de DIST_DIR.
+
+    Construit une fois au démarrage : la décision « fichier existant ou
+    fallback SPA » est une recherche dans un dict, sans appel à os.stat.
+    Les petits fichiers sont gardés en mémoire après la première lecture.
+    """
+
+    SKIPPED_DIRS = frozenset({"node_modules", "__pycache__"})
+    MEMORY_FILE_LIMIT = 2 * 1024 * 1024
+    MEMORY_TOTAL_LIMIT = 32 * 1024 * 1024
+    REFRESH_INTERVAL = 5.0
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+        self._entries: dict[str, StaticEntry] = {}
+        self._memory_bytes = 0
+        self._last_refresh = 0.0
+        self.refresh()
+
+    def refresh(self) -> None:
+        entries: dict[str, StaticEntry] = {}
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".") and d not in self.SKIPPED_DIRS]
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                abs_path = os.path.join(directory, filename)
+                try:
+                    st = os.stat(abs_path)
+                except OSError:
+                    continue
+                rel_path = os.path.relpath(abs_path, self.root).replace(os.sep, "/")
+                entries[rel_path] = StaticEntry(rel_path, abs_path, st.st_size, st.st_mtime)
+        for rel_path, entry in entries.items():
+            for encoding, suffix in _PRECOMPRESSED:
+                variant = entries.get(rel_path + suffix)
+                if variant is not None:
+                    entry.variants[encoding] = variant
+        with self._lock:
+            self._entries = entries
+            self._memory_bytes = 0
+            self._last_refresh = time.monotonic()
+
+    def lookup(self, rel_path: str) -> Optional[StaticEntry]:
+        entry = self._entries.get(rel_path)
+        if entry is None and rel_path.startswith("assets/"):
+            # Asset inconnu : peut-être un nouveau build (dev). Réindexation limitée.
+            if time.monotonic() - self._last_refresh >= self.REFRESH_INTERVAL:
+                self.refresh()
+                entry = self._entries.get(rel_path)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _body(self, entry: StaticEntry) -> Optional[bytes]:
+        if entry._body is not None:
+            return entry._body
+        if entry.size > self.MEMORY_FILE_LIMIT:
+            return None
+        with open(entry.abs_path, "rb") as f:
+            body = f.read()
+        with self._lock:
+            if self._memory_bytes + len(body) <= self.MEMORY_TOTAL_LIMIT:
+                entry._body = body
+                self._memory_bytes += len(body)
+        return body
+
+    def etag(self, entry: StaticEntry) -> str:
+        if entry._etag is None:
+            digest = hashlib.blake2b(digest_size=16)
+            body = self._body(entry)
+            if body is not None:
+                digest.update(body)
+            else:
+                with open(entry.abs_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(chunk)
+            entry._etag = digest.hexdigest()
+        return entry._etag
+
+    @staticmethod
+    def cache_control(rel_path: str) -> str:
+        if _HASHED_ASSET_RE.match(rel_path):
+            return "public, max-age=31536000, immutable"
+        # index.html & co : toujours revalidés (ETag) pour voir un nouveau build.
+        return "no-cache"
+
+    def serve(self, entry: StaticEntry) -> Response:
+        accepted = request.headers.get("Accept-Encoding", "")
+        body_entry, encoding = entry, None
+        for candidate, _ in _PRECOMPRESSED:
+            variant = entry.variants.get(candidate)
+            if variant is not None and candidate in accepted:
+                body_entry, encoding = variant, candidate
+                break
+
+        body = self._body(body_entry)
+        if body is not None:
+            response = Response(body, mimetype=entry.mimetype)
+        else:
+            response = send_file(body_entry.abs_path, mimetype=entry.mimetype, conditional=False, etag=False)
+        response.set_etag(self.etag(body_entry))
+        response.last_modified = datetime.datetime.fromtimestamp(body_entry.mtime, tz=datetime.timezone.utc)
+        response.headers["Cache-Control"] = self.cache_control(entry.rel_path)
+        if entry.variants:
+            response.vary.add("Accept-Encoding")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response.make_conditional(request, accept_ranges=True, complete_length=body_entry.size)
+
+
+with _startup.phase("static_index"):
+    _static_index = StaticFileIndex(DIST_DIR)
+
+# ─── Upstream HTTP (pool partagé pour pronotepy) ──────────────────────────────
+UPSTREAM_HTTP_DEFAULTS: dict[str, Any] = {
+    "pool_connections": 4,
+    "pool_maxsize": 16,
+    "pool_block": False,
+    "connect_timeout": 5.0,
+    "read_timeout": 30.0,
+    "max_retries": 2,
+    "backoff_factor": 0.3,
+}
+
+
+def _merge_settings(defaults: dict[str, Any], overrides: Any) -> dict[str, Any]:
+    """Applique les valeurs de config.json sur des défauts typés (valeurs invalides ignorées)."""
+    settings = dict(defaults)
+    if isinstance(overrides, dict):
+        for key, default in defaults.items():
+            if key not in overrides:
+                continue
+            try:
+                settings[key] = type(default)(overrides[key])
+            except (TypeError, ValueError):
+                pass
+    return settings
+
+
+def _upstream_http_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `upstream_http` de config.json avec les défauts."""
+    return _merge_settings(UPSTREAM_HTTP_DEFAULTS, config.get("upstream_http"))
+
+
+class UpstreamHttpPool:
+    """Adaptateur HTTP partagé monté sur les sessions `requests` de pronotepy.
+
+    Toutes les connexions (et reconnexions) réutilisent le même pool urllib3 :
+    keep-alive entre pages, timeouts connect/read par défaut, et retry avec
+    backoff sur les erreurs de connexion et les lectures idempotentes (GET).
+    Les POST de l'API Pronote ne sont jamais rejoués une fois envoyés.
+    """
+
+    def __init__(self, settings: dict[str, Any]) -> None:
+        self._settings = dict(settings)
+        self._lock = threading.Lock()
+        self._adapter: Any = None
+        self._counters = {"requests": 0, "errors": 0, "attached_sessions": 0}
+
+    @property
+    def settings(self) -> dict[str, Any]:
+        return dict(self._settings)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _build_adapter(self) -> Any:
+        try:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+        except ImportError:
+            return None
+
+        settings = self._settings
+        pool = self
+        default_timeout = (settings["connect_timeout"], settings["read_timeout"])
+
+        class _TunedHTTPAdapter(HTTPAdapter):
+            def send(self, request, stream=False, timeout=None, **kwargs):
+                pool._count("requests")
+                try:
+                    return super().send(
+                        request,
+                        stream=stream,
+                        timeout=default_timeout if timeout is None else timeout,
+                        **kwargs,
+                    )
+                except Exception:
+                    pool._count("errors")
+                    raise
+
+        retries = Retry(
+            total=settings["max_retries"],
+            connect=settings["max_retries"],
+            read=settings["max_retries"],
+            status=settings["max_retries"],
+            backoff_factor=settings["backoff_factor"],
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        return _TunedHTTPAdapter(
+            pool_connections=settings["pool_connections"],
+            pool_maxsize=settings["pool_maxsize"],
+            pool_block=settings["pool_block"],
+            max_retries=retries,
+        )
+
+    def _get_adapter(self) -> Any:
+        with self._lock:
+            if self._adapter is None:
+                self._adapter = self._build_adapter()
+            return self._adapter
+
+    def attach(self, client: Any) -> bool:
+        """Monte le pool partagé sur la session HTTP du client (idempotent)."""
+        session = getattr(getattr(client, "communication", None), "session", None)
+        if session is None or not hasattr(session, "mount"):
+            return False
+        adapters = getattr(session, "adapters", None)
+        current = self._adapter
+        if current is not None and isinstance(adapters, dict) and adapters.get("https://") is current:
+            return True
+        adapter = self._get_adapter()
+        if adapter is None:
+            return False
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self._count("attached_sessions")
+        return True
+
+    def reconfigure(self, settings: dict[str, Any]) -> None:
+        """Applique de nouveaux réglages; les sessions se ré-attachent au prochain appel."""
+        with self._lock:
+            if settings == self._settings:
+                return
+            self._settings = dict(settings)
+            self._adapter = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            payload: dict[str, Any] = dict(self._counters)
+            adapter = self._adapter
+        pools = []
+        manager = getattr(adapter, "poolmanager", None)
+        container = getattr(manager, "pools", None)
+        if container is not None:
+            for key in list(container.keys()):
+                try:
+                    conn_pool = container[key]
+                except KeyError:
+                    continue
+                idle = getattr(conn_pool, "pool", None)
+                pools.append({
+                    "host": str(getattr(conn_pool, "host", "")),
+                    "connections_opened": int(getattr(conn_pool, "num_connections", 0)),
+                    "requests": int(getattr(conn_pool, "num_requests", 0)),
+                    "idle": idle.qsize() if idle is not None else 0,
+                })
+        opened = sum(p["connections_opened"] for p in pools)
+        served = sum(p["requests"] for p in pools)
+        payload["pools"] = pools
+        payload["connections_opened"] = opened
+        payload["connection_reuse_ratio"] = round(1 - opened / served, 3) if served else None
+        payload["settings"] = self.settings
+        return payload
+
+
+_upstream_http_pool = UpstreamHttpPool(_upstream_http_settings(CONFIG))
+
+
+# ─── Texte (mots sans accents, pour recherche et annuaire) ───────────────────
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fold(text: str) -> str:
+    """Minuscules sans accents ("Élève" → "eleve")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+# ─── Annuaire des destinataires ───────────────────────────────────────────────
+def _recipient_name(recipient: Any) -> str:
+    identity = getattr(recipient, "identity", None)
+    if identity is not None and hasattr(identity, "name"):
+        return str(identity.name)
+    return str(getattr(recipient, "name", "") or "")
+
+
+class RecipientDirectory:
+    """Destinataires indexés par id et par préfixe de chaque mot du nom (sans accents)."""
+
+    def __init__(self, ttl: float = 1800.0) -> None:
+        self.ttl = ttl
+        self.owner: Any = None
+        self._lock = threading.Lock()
+        self._items: list[Any] = []
+        self._by_id: dict[str, Any] = {}
+        self._words: list[tuple[str, int]] = []
+        self._folded: list[str] = []
+        self._loaded_at: Optional[float] = None
+
+    def expired(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, recipients: list[Any], owner: Any = None) -> "RecipientDirectory":
+        items = list(recipients)
+        folded = [_fold(_recipient_name(r)) for r in items]
+        words = sorted((word, index) for index, name in enumerate(folded) for word in set(_WORD_RE.findall(name)))
+        with self._lock:
+            self._items = items
+            self._by_id = {str(getattr(r, "id", "")): r for r in items}
+            self._folded = folded
+            self._words = words
+            self.owner = owner
+            self._loaded_at = time.monotonic()
+        return self
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def all(self) -> list[Any]:
+        return list(self._items)
+
+    def resolve(self, recipient_ids: list[str]) -> tuple[list[Any], list[str]]:
+        """(destinataires trouvés dans l'ordre demandé, ids inconnus)."""
+        by_id = self._by_id
+        found, missing, seen = [], [], set()
+        for raw in recipient_ids:
+            key = str(raw)
+            if key in seen:
+                continue
+            seen.add(key)
+            recipient = by_id.get(key)
+            if recipient is None:
+                missing.append(key)
+            else:
+                found.append(recipient)
+        return found, missing
+
+    def _prefix_matches(self, prefix: str) -> set[int]:
+        words = self._words
+        position = bisect.bisect_left(words, (prefix, -1))
+        matches = set()
+        while position < len(words) and words[position][0].startswith(prefix):
+            matches.add(words[position][1])
+            position += 1
+        return matches
+
+    def search(self, query: str, limit: int = 50) -> list[Any]:
+        """Chaque mot de la requête doit préfixer un mot du nom ; début de nom en premier."""
+        terms = _WORD_RE.findall(_fold(query or ""))
+        with self._lock:
+            if not terms:
+                return self._items[:limit]
+            candidates: Optional[set[int]] = None
+            for term in terms:
+                matches = self._prefix_matches(term)
+                candidates = matches if candidates is None else candidates & matches
+                if not candidates:
+                    return []
+            folded = self._folded
+            needle = " ".join(terms)
+            ranked = sorted(candidates or (), key=lambda i: (not folded[i].startswith(needle), folded[i]))
+            return [self._items[i] for i in ranked[:limit]]
+
+
+# ─── Compteurs des badges (non lus / à faire) ─────────────────────────────────
+class BadgeCounters:
+    """États minimaux (id → lu/fait) retenus à chaque récupération par l'adapter.
+
+    Aucun corps de message ni sérialisation : `/api/counters` se contente de
+    compter, et les actions (marquer lu, fait, supprimer) tiennent l'index à
+    jour sans rechargement. Une entrée plus vieille que `ttl` est rechargée.
+    """
+
+    def __init__(self, ttl: float = 60.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._discussions: dict[str, bool] = {}
+        self._informations: dict[str, bool] = {}
+        self._homework: dict[str, tuple[datetime.date, bool]] = {}
+        self._homework_ranges: list[tuple[datetime.date, datetime.date, float]] = []
+        self._loaded_at: dict[str, float] = {}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._discussions.clear()
+            self._informations.clear()
+            self._homework.clear()
+            self._homework_ranges.clear()
+            self._loaded_at.clear()
+
+    def expired(self, kind: str) -> bool:
+        loaded_at = self._loaded_at.get(kind)
+        return loaded_at is None or time.monotonic() - loaded_at > self.ttl
+
+    def observe_discussions(self, discussions: list[Any]) -> None:
+        states = {str(getattr(d, "id", "")): bool(getattr(d, "unread", False)) for d in discussions}
+        with self._lock:
+            self._discussions = states
+            self._loaded_at["discussions"] = time.monotonic()
+
+    def observe_informations(self, informations: list[Any]) -> None:
+        states = {str(getattr(i, "id", "")): bool(getattr(i, "read", False)) for i in informations}
+        with self._lock:
+            self._informations = states
+            self._loaded_at["informations"] = time.monotonic()
+
+    def observe_homework(self, date_from: datetime.date, date_to: datetime.date, homework: list[Any]) -> None:
+        now = time.monotonic()
+        states = {}
+        for h in homework:
+            date = getattr(h, "date", None)
+            if isinstance(date, datetime.datetime):
+                date = date.date()
+            if isinstance(date, datetime.date):
+                states[str(getattr(h, "id", ""))] = (date, bool(getattr(h, "done", False)))
+        with self._lock:
+            # La plage rechargée fait foi : on remplace ce qu'elle couvre.
+            self._homework = {k: v for k, v in self._homework.items() if not date_from <= v[0] <= date_to}
+            self._homework.update(states)
+            self._homework_ranges = [r for r in self._homework_ranges if now - r[2] <= self.ttl]
+            self._homework_ranges.append((date_from, date_to, now))
+
+    def homework_covered(self, date_from: datetime.date, date_to: datetime.date) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return any(
+                start <= date_from and date_to <= end and now - loaded_at <= self.ttl
+                for start, end, loaded_at in self._homework_ranges
+            )
+
+    def set_discussion_unread(self, discussion_id: str, unread: bool) -> None:
+        with self._lock:
+            if discussion_id in self._discussions:
+                self._discussions[discussion_id] = unread
+
+    def drop_discussion(self, discussion_id: str) -> None:
+        with self._lock:
+            self._discussions.pop(discussion_id, None)
+
+    def set_information_read(self, information_id: str) -> None:
+        with self._lock:
+            if information_id in self._informations:
+                self._informations[information_id] = True
+
+    def set_homework_done(self, homework_id: str, done: bool) -> None:
+        with self._lock:
+            state = self._homework.get(homework_id)
+            if state is not None:
+                self._homework[homework_id] = (state[0], done)
+
+    def counts(self, date_from: datetime.date, date_to: datetime.date) -> dict[str, int]:
+        with self._lock:
+            return {
+                "discussions_unread": sum(self._discussions.values()),
+                "informations_unread": sum(1 for read in self._informations.values() if not read),
+                "homework_pending": sum(
+                    1 for date, done in self._homework.values() if not done and date_from <= date <= date_to
+                ),
+            }
+
+
+# ─── Enregistrements compacts (caches de résultats d'adapter) ────────────────
+class CompactRecord:
+    """Copie à `__slots__` des seuls champs lus par les sérialiseurs.
+
+    Un cache qui garderait les objets pronotepy retiendrait aussi tout leur
+    graphe (client, session, réponses brutes). L'enregistrement ne garde
+    qu'une référence faible vers l'objet d'origine : tant que celui-ci vit,
+    les attributs non copiés (`content`, `set_done`, `grades`…) lui sont
+    délégués ; sinon ils sont absents, comme pour un objet pronotepy incomplet
+    (les sérialiseurs testent `hasattr`).
+    """
+
+    __slots__ = ("_handle", "__weakref__")
+    FIELDS: tuple[str, ...] = ()
+    NESTED: dict[str, type] = {}
+    # Champs dont la propriété pronotepy envoie une requête : copiés par `loaded()`
+    # (dans l'appel de l'adapter), sinon seulement s'ils sont déjà des attributs d'instance.
+    DEFERRED: frozenset[str] = frozenset()
+
+    @classmethod
+    def from_object(cls, obj: Any) -> Any:
+        if isinstance(obj, CompactRecord):
+            return obj
+        record = cls.__new__(cls)
+        try:
+            record._handle = weakref.ref(obj)
+        except TypeError:
+            record._handle = None
+        loaded = getattr(obj, "__dict__", None) or {}
+        for name in cls.FIELDS:
+            if name in cls.DEFERRED and name not in loaded:
+                continue
+            record._copy(obj, name)
+        return record
+
+    @classmethod
+    def loaded(cls, obj: Any) -> Any:
+        """Comme `from_object`, en lisant aussi les champs `DEFERRED` (requêtes upstream)."""
+        record = cls.from_object(obj)
+        for name in cls.DEFERRED:
+            if name not in _set_slots(record):
+                record._copy(obj, name)
+        return record
+
+    def _copy(self, obj: Any, name: str) -> None:
+        try:
+            value = getattr(obj, name)
+        except Exception:
+            return
+        nested = self.NESTED.get(name)
+        if nested is not None and value is not None:
+            if isinstance(value, (list, tuple)):
+                value = [nested.from_object(v) for v in value]
+            else:
+                value = nested.from_object(value)
+        setattr(self, name, value)
+
+    def __getattr__(self, name: str) -> Any:
+        # Un champ différé non chargé reste absent : jamais de requête via l'objet d'origine.
+        handle = self._handle if not name.startswith("__") and name != "_handle" and name not in self.DEFERRED else None
+        target = handle() if handle is not None else None
+        if target is None:
+            raise AttributeError(name)
+        return getattr(target, name)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in _set_slots(self)}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.FIELDS if n in _set_slots(self))
+        return f"{type(self).__name__}({fields})"
+
+
+def _set_slots(record: CompactRecord) -> list[str]:
+    present = []
+    for name in record.FIELDS:
+        try:
+            object.__getattribute__(record, name)
+        except AttributeError:
+            continue
+        present.append(name)
+    return present
+
+
+class SubjectRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "name", "groups")
+
+
+class AttachmentRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "name", "url", "type")
+
+
+class MessageRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "author", "content", "date", "seen")
+
+
+class LessonRecord(CompactRecord):
+    __slots__ = FIELDS = (
+        "id", "subject", "teacher_name", "teacher_names", "classroom", "classrooms", "start", "end",
+        "canceled", "outing", "detention", "exempted", "background_color", "status",
+        "group_name", "group_names", "memo",
+    )
+    NESTED = {"subject": SubjectRecord}
+
+
+class HomeworkRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "subject", "description", "done", "date", "files")
+    NESTED = {"subject": SubjectRecord, "files": AttachmentRecord}
+
+
+class DiscussionRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "subject", "creator", "unread", "date", "messages")
+    NESTED = {"messages": MessageRecord}
+    # pronotepy : `Discussion.messages` envoie `ListeMessages` à chaque lecture.
+    DEFERRED = frozenset({"messages"})
+
+
+class InformationRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "title", "author", "content", "creation_date", "read", "category")
+
+
+class PeriodRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "name", "start", "end")
+
+
+class GradeRecord(CompactRecord):
+    __slots__ = FIELDS = (
+        "id", "grade", "out_of", "default_out_of", "date", "subject", "average", "max", "min",
+        "coefficient", "comment", "is_bonus", "is_optionnal", "is_out_of_20",
+    )
+    NESTED = {"subject": SubjectRecord}
+
+
+class AverageRecord(CompactRecord):
+    __slots__ = FIELDS = ("student", "class_average", "max", "min", "out_of", "default_out_of", "subject", "background_color")
+    NESTED = {"subject": SubjectRecord}
+
+
+class AbsenceRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "from_date", "to_date", "justified", "hours", "days", "reasons")
+
+
+class DelayRecord(CompactRecord):
+    __slots__ = FIELDS = ("id", "date", "minutes", "justified", "justification", "reasons")
+
+
+class LessonContentRecord(CompactRecord):
+    __slots__ = FIELDS = ("title", "description", "category", "files")
+    NESTED = {"files": AttachmentRecord}
+
+
+class ClientInfoRecord(CompactRecord):
+    __slots__ = FIELDS = ("name", "establishment", "class_name")
+
+
+_RECORD_TYPES: dict[str, type] = {
+    "get_lessons": LessonRecord,
+    "get_homework": HomeworkRecord,
+    "get_discussions": DiscussionRecord,
+    "get_informations": InformationRecord,
+    "get_periods": PeriodRecord,
+    "get_period_grades": GradeRecord,
+    "get_period_averages": AverageRecord,
+    "get_period_absences": AbsenceRecord,
+    "get_period_delays": DelayRecord,
+}
+
+
+# Servis par les routes via `read_normalized` : on garde directement la forme normalisée.
+_NORMALIZED_RESULTS = frozenset({"get_menus", "get_lesson_content"})
+
+
+def compact_result(method: str, value: Any) -> Any:
+    """Résultat d'une méthode de l'adapter sous forme d'enregistrements compacts."""
+    if method == "read_normalized":
+        # (résultat, forme normalisée) : seule la forme normalisée, déjà calculée, est gardée.
+        return None, value[1]
+    if method in _NORMALIZED_RESULTS:
+        return _normalize_value(value)
+    record_type = _RECORD_TYPES.get(method)
+    if record_type is None or not isinstance(value, (list, tuple)):
+        return value
+    return [record_type.from_object(v) for v in value]
+
+
+def approximate_size(value: Any, depth: int = 0) -> int:
+    """Taille mémoire approchée (octets) d'une valeur et de ce qu'elle contient."""
+    size = sys.getsizeof(value, 64)
+    if depth >= 8 or isinstance(value, (str, bytes, int, float, bool, datetime.date)) or value is None:
+        return size
+    if isinstance(value, CompactRecord):
+        return size + sum(approximate_size(getattr(value, n), depth + 1) for n in _set_slots(value))
+    if isinstance(value, dict):
+        return size + sum(approximate_size(k, depth + 1) + approximate_size(v, depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(approximate_size(v, depth + 1) for v in value)
+    attributes = getattr(value, "__dict__", None)
+    if isinstance(attributes, dict):
+        return size + approximate_size(attributes, depth + 1)
+    return size
+
+
+class RecordStore:
+    """Cache LRU borné en nombre d'entrées et en octets (taille approchée)."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Any, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def reconfigure(self, max_entries: int, max_bytes: int) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def put(self, key: Any, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        size = approximate_size(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _key, (_value, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
 # ─── Backend Adapter (V2 spike foundation) ────────────────────────────────────
 class AdapterError(Exception):
     """Erreur remontée par la couche d'adaptation backend."""
 
 
+class AdapterTimeoutError(AdapterError):
+    """L'appel upstream a dépassé son délai.
+
+    `pending` est l'appel abandonné qui tourne encore, s'il y en a un : sa
+    place d'ordonnancement n'est rendue qu'à sa fin.
+    """
+
+    def __init__(self, message: str = "", pending: Optional[Future] = None) -> None:
+        super().__init__(message)
+        self.pending = pending
+
+
+class CircuitOpenError(AdapterError):
+    """Le disjoncteur upstream est ouvert : appel refusé sans contacter Pronote."""
+
+
+# Pronote injoignable (et aucune réponse connue à servir) : à distinguer d'une donnée vide.
+# OSError couvre les erreurs réseau de requests (ConnectionError, Timeout…) après retries.
+UPSTREAM_UNAVAILABLE = (CircuitOpenError, AdapterTimeoutError, OSError)
+
+
 class PronoteBackendAdapter:
     """Contrat minimal d'un backend Pronote.
 
@@ -66,6 +1161,11 @@ class PronoteBackendAdapter:
     def get_client(self) -> Any:
         raise NotImplementedError
 
+    @property
+    def session_lock(self) -> Any:
+        """Verrou (context manager) à tenir pour toucher aux objets de la session upstream."""
+        return contextlib.nullcontext()
+
     def get_lessons(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
         raise NotImplementedError
 
@@ -75,6 +1175,19 @@ class PronoteBackendAdapter:
     def get_periods(self) -> list[Any]:
         raise NotImplementedError
 
+    def get_period_grades(self, period: Any) -> list[Any]:
+        """Notes d'une période renvoyée par `get_periods` (lecture upstream paresseuse)."""
+        raise NotImplementedError
+
+    def get_period_averages(self, period: Any) -> list[Any]:
+        raise NotImplementedError
+
+    def get_period_absences(self, period: Any) -> list[Any]:
+        raise NotImplementedError
+
+    def get_period_delays(self, period: Any) -> list[Any]:
+        raise NotImplementedError
+
     def get_discussions(self) -> list[Any]:
         raise NotImplementedError
 
@@ -90,6 +1203,9 @@ class PronoteBackendAdapter:
     def get_recipients(self) -> list[Any]:
         raise NotImplementedError
 
+    def search_recipients(self, query: str, limit: int = 50) -> list[Any]:
+        return RecipientDirectory().load(self.get_recipients()).search(query, limit)
+
     def create_discussion(self, recipient_ids: list[str], subject: str, content: str) -> Any:
         raise NotImplementedError
 
@@ -108,54 +1224,159 @@ class PronoteBackendAdapter:
     def get_menus(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
         raise NotImplementedError
 
+    def read_normalized(self, method: str, *args: Any) -> Tuple[Any, Any]:
+        """`(résultat, forme normalisée)` d'une lecture servie normalisée (menus, contenu de cours).
+
+        La normalisation lit les objets pronotepy : elle est faite ici, une
+        seule fois, sous le verrou de session. Les enveloppes font passer
+        l'appel par leur `_invoke` (ordonnanceur, délai, cache de secours).
+        """
+        if method not in _NORMALIZED_RESULTS:
+            raise AdapterError(f"Lecture non normalisée: {method}")
+        value = getattr(self, method)(*args)
+        with self.session_lock:
+            return value, _normalize_value(value)
+
     def export_ical(self, date_from: Optional[datetime.date], date_to: Optional[datetime.date]) -> str:
         raise NotImplementedError
 
+    def download_attachment(self, url: str) -> Any:
+        """Réponse HTTP en streaming (`iter_content`, `headers`, `close`) pour une pièce jointe."""
+        raise NotImplementedError
+
+    def get_counters(self, days: int = 7) -> dict[str, int]:
+        """Non lus et devoirs à faire d'ici `days` jours (implémentation naïve : tout recharger)."""
+        today = datetime.date.today()
+        counters = BadgeCounters()
+        counters.observe_discussions(self.get_discussions())
+        counters.observe_informations(self.get_informations())
+        counters.observe_homework(today, today + datetime.timedelta(days=days), self.get_homework(today, today + datetime.timedelta(days=days)))
+        return counters.counts(today, today + datetime.timedelta(days=days))
+
+
+def _serialized(method: Callable) -> Callable:
+    """Un seul appel à la fois par session pronotepy.
+
+    Le client pronotepy numérote et chiffre ses requêtes avec un compteur
+    partagé, sans verrou : deux appels simultanés sur la même session le
+    désynchronisent. Les appels de comptes différents restent parallèles.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self: "PronotepySyncAdapter", *args: Any, **kwargs: Any) -> Any:
+        with self._session_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class PronotepySyncAdapter(PronoteBackendAdapter):
     """Implémentation actuelle basée sur pronotepy synchrone."""
 
     def __init__(self) -> None:
         self._client: Optional[pronotepy.Client] = None
+        self._session_lock = threading.RLock()
+        self._recipients = RecipientDirectory()
+        self._counters = BadgeCounters()
 
     def login(self, pronote_url: str, username: str, password: str) -> bool:
+        self._counters.clear()
         self._client = pronotepy.Client(pronote_url, username=username, password=password)
+        _upstream_http_pool.attach(self._client)
         return bool(self._client and self._client.logged_in)
 
     def logout(self) -> None:
         self._client = None
+        self._counters.clear()
 
     def is_logged_in(self) -> bool:
         return bool(self._client and self._client.logged_in)
 
+    @property
+    def session_lock(self) -> Any:
+        return self._session_lock
+
     def get_client(self) -> Any:
         if not self.is_logged_in():
             raise AdapterError("Non connecté")
+        # pronotepy recrée sa session lors d'un refresh : on ré-attache le pool.
+        _upstream_http_pool.attach(self._client)
         return self._client
 
+    @_serialized
     def get_lessons(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
         client = self.get_client()
         return list(client.lessons(date_from, date_to))
 
+    @_serialized
     def get_homework(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
         client = self.get_client()
-        return list(client.homework(date_from, date_to))
+        homework = list(client.homework(date_from, date_to))
+        self._counters.observe_homework(date_from, date_to, homework)
+        return homework
 
+    @_serialized
     def get_periods(self) -> list[Any]:
         client = self.get_client()
         return list(client.periods)
 
-    def get_discussions(self) -> list[Any]:
+    @_serialized
+    def get_period_grades(self, period: Any) -> list[Any]:
+        self.get_client()
+        return list(period.grades)
+
+    @_serialized
+    def get_period_averages(self, period: Any) -> list[Any]:
+        self.get_client()
+        return list(period.averages)
+
+    @_serialized
+    def get_period_absences(self, period: Any) -> list[Any]:
+        self.get_client()
+        return list(period.absences)
+
+    @_serialized
+    def get_period_delays(self, period: Any) -> list[Any]:
+        self.get_client()
+        return list(period.delays)
+
+    @_serialized
+    def _discussions(self) -> list[Any]:
+        """Discussions pronotepy brutes (actions, compteurs), sans lire leurs messages."""
         client = self.get_client()
-        return list(client.discussions())
+        discussions = list(client.discussions())
+        self._counters.observe_discussions(discussions)
+        return discussions
+
+    @_serialized
+    def get_discussions(self) -> list[Any]:
+        # Une requête par discussion pour ses messages : faite une seule fois ici, sous le
+        # verrou de session et dans la place de l'appel. Sérialiseurs et caches relisent la liste.
+        return [DiscussionRecord.loaded(d) for d in self._discussions()]
 
+    @_serialized
     def get_informations(self) -> list[Any]:
         client = self.get_client()
-        return list(client.information_and_surveys())
+        informations = list(client.information_and_surveys())
+        self._counters.observe_informations(informations)
+        return informations
+
+    def get_counters(self, days: int = 7) -> dict[str, int]:
+        # Seuls les index périmés déclenchent un appel upstream.
+        today = datetime.date.today()
+        horizon = today + datetime.timedelta(days=days)
+        if self._counters.expired("discussions"):
+            self._discussions()
+        if self._counters.expired("informations"):
+            self.get_informations()
+        if not self._counters.homework_covered(today, horizon):
+            self.get_homework(today, horizon)
+        return self._counters.counts(today, horizon)
 
     def _find_by_id(self, items: list[Any], item_id: str) -> Any:
         return next((obj for obj in items if str(getattr(obj, "id", "")) == str(item_id)), None)
 
+    @_serialized
     def set_homework_done(self, homework_id: str, done: bool) -> bool:
         target_date = datetime.date.today()
         homeworks = self.get_homework(target_date - datetime.timedelta(days=45), target_date + datetime.timedelta(days=90))
@@ -163,8 +1384,10 @@ class PronotepySyncAdapter(PronoteBackendAdapter):
         if not homework or not hasattr(homework, "set_done"):
             return False
         homework.set_done(bool(done))
+        self._counters.set_homework_done(str(homework_id), bool(done))
         return True
 
+    @_serialized
     def get_lesson_content(self, lesson_id: str, date_from: datetime.date, date_to: datetime.date) -> Any:
         lessons = self.get_lessons(date_from, date_to)
         lesson = self._find_by_id(lessons, lesson_id)
@@ -177,56 +1400,92 @@ class PronotepySyncAdapter(PronoteBackendAdapter):
                 return None
         return None
 
-    def get_recipients(self) -> list[Any]:
+    @_serialized
+    def _recipient_directory(self, refresh: bool = False) -> RecipientDirectory:
+        """Annuaire du client courant, rechargé après TTL, changement de client ou à la demande."""
         client = self.get_client()
-        if not hasattr(client, "get_recipients"):
-            return []
-        return list(client.get_recipients())
+        directory = self._recipients
+        if refresh or directory.owner is not client or directory.expired():
+            recipients = list(client.get_recipients()) if hasattr(client, "get_recipients") else []
+            directory.load(recipients, owner=client)
+        return directory
+
+    def get_recipients(self) -> list[Any]:
+        return self._recipient_directory().all()
+
+    def search_recipients(self, query: str, limit: int = 50) -> list[Any]:
+        return self._recipient_directory().search(query, limit)
 
+    @_serialized
+    def download_attachment(self, url: str) -> Any:
+        client = self.get_client()
+        # Session pronotepy uniquement : ses cookies authentifient l'URL et elle porte le pool partagé.
+        session = getattr(getattr(client, "communication", None), "session", None)
+        if session is None:
+            raise AdapterError("Session Pronote indisponible pour le téléchargement")
+        # Délai explicite : le relais des morceaux se poursuit après l'échéance de la résilience,
+        # une lecture bloquée doit donc échouer d'elle-même.
+        settings = _upstream_http_pool.settings
+        response = session.get(url, stream=True, timeout=(settings["connect_timeout"], settings["read_timeout"]))
+        response.raise_for_status()
+        return response
+
+    @_serialized
     def create_discussion(self, recipient_ids: list[str], subject: str, content: str) -> Any:
         client = self.get_client()
         if not hasattr(client, "new_discussion"):
             raise AdapterError("Création de discussion non supportée")
-        recipients = self.get_recipients()
-        selected = [r for r in recipients if str(getattr(r, "id", "")) in {str(i) for i in recipient_ids}]
+        selected, missing = self._recipient_directory().resolve(recipient_ids)
+        if missing:
+            # Annuaire possiblement périmé (nouvel arrivant) : un seul rechargement.
+            selected, missing = self._recipient_directory(refresh=True).resolve(recipient_ids)
         if not selected:
             raise AdapterError("Aucun destinataire valide")
         return client.new_discussion(selected, subject, content)
 
+    @_serialized
     def reply_discussion(self, discussion_id: str, content: str) -> bool:
-        discussion = self._find_by_id(self.get_discussions(), discussion_id)
+        discussion = self._find_by_id(self._discussions(), discussion_id)
         if not discussion or not hasattr(discussion, "reply"):
             return False
         discussion.reply(content)
         return True
 
+    @_serialized
     def mark_discussion(self, discussion_id: str, mark_as: str) -> bool:
-        discussion = self._find_by_id(self.get_discussions(), discussion_id)
+        discussion = self._find_by_id(self._discussions(), discussion_id)
         if not discussion or not hasattr(discussion, "mark_as"):
             return False
         discussion.mark_as(mark_as)
+        self._counters.set_discussion_unread(str(discussion_id), mark_as == "unread")
         return True
 
+    @_serialized
     def delete_discussion(self, discussion_id: str) -> bool:
-        discussion = self._find_by_id(self.get_discussions(), discussion_id)
+        discussion = self._find_by_id(self._discussions(), discussion_id)
         if not discussion or not hasattr(discussion, "delete"):
             return False
         discussion.delete()
+        self._counters.drop_discussion(str(discussion_id))
         return True
 
+    @_serialized
     def mark_information_read(self, information_id: str) -> bool:
         info = self._find_by_id(self.get_informations(), information_id)
         if not info or not hasattr(info, "mark_as_read"):
             return False
         info.mark_as_read()
+        self._counters.set_information_read(str(information_id))
         return True
 
+    @_serialized
     def get_menus(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
         client = self.get_client()
         if not hasattr(client, "menus"):
             return []
         return list(client.menus(date_from, date_to))
 
+    @_serialized
     def export_ical(self, date_from: Optional[datetime.date], date_to: Optional[datetime.date]) -> str:
         client = self.get_client()
         if not hasattr(client, "export_ical"):
@@ -242,18 +1501,78 @@ class PronotepySyncAdapter(PronoteBackendAdapter):
         return str(payload)
 
 
+class ClientProbeCache:
+    """Mémorise, par (pronote_url, username), la classe client qui a réussi.
+
+    Le fichier est stocké à côté de config.json. Seule une empreinte du couple
+    url/identifiant est persistée, jamais l'identifiant en clair.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[dict[str, str]] = None
+
+    @staticmethod
+    def key(pronote_url: str, username: str) -> str:
+        raw = f"{str(pronote_url).strip().lower()}\n{str(username).strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self) -> dict[str, str]:
+        if self._entries is None:
+            entries: dict[str, str] = {}
+            try:
+                if os.path.exists(self._path):
+                    with open(self._path) as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        entries = {str(k): str(v) for k, v in data.items()}
+            except Exception:
+                pass
+            self._entries = entries
+        return self._entries
+
+    def get(self, pronote_url: str, username: str) -> Optional[str]:
+        with self._lock:
+            return self._load().get(self.key(pronote_url, username))
+
+    def remember(self, pronote_url: str, username: str, candidate_name: str) -> None:
+        with self._lock:
+            entries = self._load()
+            key = self.key(pronote_url, username)
+            if entries.get(key) == candidate_name:
+                return
+            entries[key] = candidate_name
+            try:
+                _atomic_write_json(self._path, entries)
+            except Exception:
+                # Best effort : /etc/pronote-desktop peut être en lecture seule.
+                pass
+
+
+def _client_probe_path() -> str:
+    return os.environ.get(
+        "PRONOTE_CLIENT_PROBE_PATH",
+        os.path.join(os.path.dirname(CONFIG_PATH), "client-probe.json"),
+    )
+
+
 class PronotepyRefonteAdapter(PronotepySyncAdapter):
     """Spike adapter pour préparer une refonte pronotepy sans casser l'existant.
 
     La connexion tente d'abord `TeacherClient` (si disponible), puis bascule
     automatiquement sur `Client` pour rester compatible avec les versions
-    historiques de la librairie.
+    historiques de la librairie. La classe qui a réussi est mémorisée par
+    compte afin d'être essayée en premier à la connexion suivante.
     """
 
     def __init__(self) -> None:
         super().__init__()
         raw_preference = os.environ.get("PRONOTE_REFRONTE_PREFER_TEACHER_CLIENT", "1").strip().lower()
         self._prefer_teacher_client = raw_preference not in ("0", "false", "no", "off")
+        raw_race = os.environ.get("PRONOTE_REFRONTE_RACE_CLIENTS", "0").strip().lower()
+        self._race_candidates = raw_race in ("1", "true", "yes", "on")
+        self._probe_cache = ClientProbeCache(_client_probe_path())
         self._client_kind = "none"
 
     def _build_client_candidates(self) -> List[Tuple[str, Any]]:
@@ -277,12 +1596,62 @@ class PronotepyRefonteAdapter(PronotepySyncAdapter):
             deduplicated.append((name, cls))
         return deduplicated
 
+    def _order_candidates(self, pronote_url: str, username: str) -> Tuple[List[Tuple[str, Any]], bool]:
+        """Place en tête le candidat mémorisé; indique si un candidat était connu."""
+        candidates = self._build_client_candidates()
+        remembered = self._probe_cache.get(pronote_url, username)
+        if remembered is None:
+            return candidates, False
+        preferred = [c for c in candidates if c[0] == remembered]
+        if not preferred:
+            return candidates, False
+        return preferred + [c for c in candidates if c[0] != remembered], True
+
+    def _race_login(
+        self, candidates: List[Tuple[str, Any]], pronote_url: str, username: str, password: str
+    ) -> Tuple[Optional[Tuple[str, Any]], Optional[Exception]]:
+        """Lance les candidats en parallèle et retient le premier connecté."""
+        last_error: Optional[Exception] = None
+        executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="pronote-login")
+        try:
+            pending = {
+                executor.submit(cls, pronote_url, username=username, password=password): name
+                for name, cls in candidates
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        candidate_client = future.result()
+                    except Exception as exc:
+                        last_error = exc
+                        continue
+                    if bool(getattr(candidate_client, "logged_in", False)):
+                        return (name, candidate_client), last_error
+            return None, last_error
+        finally:
+            # Les handshakes perdants se terminent en arrière-plan et sont ignorés.
+            executor.shutdown(wait=False)
+
     def login(self, pronote_url: str, username: str, password: str) -> bool:
         last_error: Optional[Exception] = None
         self._client = None
         self._client_kind = "none"
+        self._counters.clear()
+
+        candidates, known = self._order_candidates(pronote_url, username)
+        if self._race_candidates and not known and len(candidates) > 1:
+            winner, last_error = self._race_login(candidates, pronote_url, username, password)
+            if winner is not None:
+                self._client_kind, self._client = winner
+                self._probe_cache.remember(pronote_url, username, self._client_kind)
+                _upstream_http_pool.attach(self._client)
+                return True
+            self._client_kind = candidates[-1][0]
+            candidates = []
 
-        for candidate_name, candidate_cls in self._build_client_candidates():
+        for candidate_name, candidate_cls in candidates:
             self._client_kind = candidate_name
             try:
                 candidate_client = candidate_cls(pronote_url, username=username, password=password)
@@ -293,6 +1662,8 @@ class PronotepyRefonteAdapter(PronotepySyncAdapter):
             if bool(getattr(candidate_client, "logged_in", False)):
                 self._client = candidate_client
                 self._client_kind = candidate_name
+                self._probe_cache.remember(pronote_url, username, candidate_name)
+                _upstream_http_pool.attach(candidate_client)
                 return True
 
         if last_error is not None:
@@ -300,297 +1671,4211 @@ class PronotepyRefonteAdapter(PronotepySyncAdapter):
         return False
 
 
-def build_backend_adapter() -> PronoteBackendAdapter:
-    """Factory de backend.
+class _DelegatingAdapter(PronoteBackendAdapter):
+    """Base des adapters « enveloppes » : chaque méthode du contrat passe par `_invoke`."""
 
-    Le nom est piloté par PRONOTE_BACKEND_ADAPTER pour faciliter les spikes.
-    Valeurs supportées:
-    - pronotepy-refonte (défaut)
-    - pronotepy-sync
-    """
-    adapter_name = os.environ.get("PRONOTE_BACKEND_ADAPTER", "pronotepy-refonte").strip().lower()
-    if adapter_name in ("", "pronotepy-sync"):
-        return PronotepySyncAdapter()
-    if adapter_name in ("pronotepy-refonte", "refonte-pronotepy"):
-        return PronotepyRefonteAdapter()
-    raise RuntimeError(f"Backend adapter non supporté: {adapter_name}")
+    def __init__(self, inner: PronoteBackendAdapter) -> None:
+        self._inner = inner
 
+    @property
+    def inner(self) -> PronoteBackendAdapter:
+        return self._inner
 
-_adapter = build_backend_adapter()
+    def _invoke(self, method: str, *args: Any) -> Any:
+        return getattr(self._inner, method)(*args)
 
-def client_to_dict(client: pronotepy.Client) -> dict:
-    return {
-        "name": client.info.name if client.info else "Professeur",
-        "establishment": client.info.establishment if client.info else "",
-        "class_name": getattr(client.info, 'class_name', None),
-        "profile_picture_url": None,
-    }
+    def login(self, pronote_url: str, username: str, password: str) -> bool:
+        return self._invoke("login", pronote_url, username, password)
 
-def lesson_to_dict(l: pronotepy.Lesson) -> dict:
-    group_names = []
-    if hasattr(l, 'group_names') and isinstance(l.group_names, list):
-        group_names = [str(g) for g in l.group_names if g]
-    teacher_names = []
-    if hasattr(l, 'teacher_names') and isinstance(l.teacher_names, list):
-        teacher_names = [str(t) for t in l.teacher_names if t]
-    classrooms = []
-    if hasattr(l, 'classrooms') and isinstance(l.classrooms, list):
-        classrooms = [str(c) for c in l.classrooms if c]
+    def logout(self) -> None:
+        self._inner.logout()
 
-    return {
-        "id": str(l.id) if hasattr(l, 'id') else str(id(l)),
-        "subject": {"id": l.subject.id if l.subject else "", "name": l.subject.name if l.subject else "Cours", "groups": l.subject.groups if l.subject else False} if l.subject else None,
-        "teacher_name": l.teacher_name if hasattr(l, 'teacher_name') else None,
-        "classroom": l.classroom if hasattr(l, 'classroom') else None,
-        "start": l.start.isoformat(),
-        "end": l.end.isoformat(),
-        "is_cancelled": l.canceled if hasattr(l, 'canceled') else False,
-        "is_outing": l.outing if hasattr(l, 'outing') else False,
-        "is_detention": l.detention if hasattr(l, 'detention') else False,
-        "is_exempted": l.exempted if hasattr(l, 'exempted') else False,
-        "background_color": l.background_color if hasattr(l, 'background_color') else None,
-        "status": l.status if hasattr(l, 'status') else None,
-        "group_name": l.group_name if hasattr(l, 'group_name') else None,
-        "group_names": group_names,
-        "teacher_names": teacher_names,
-        "classrooms": classrooms,
-        "memo": l.memo if hasattr(l, 'memo') else None,
-    }
+    def is_logged_in(self) -> bool:
+        return self._inner.is_logged_in()
 
-def homework_to_dict(h: pronotepy.Homework) -> dict:
-    return {
-        "id": str(h.id) if hasattr(h, 'id') else str(id(h)),
-        "subject": {"id": h.subject.id if h.subject else "", "name": h.subject.name if h.subject else "Matière", "groups": False} if h.subject else {"id": "", "name": "Matière", "groups": False},
-        "description": h.description if hasattr(h, 'description') else "",
-        "done": h.done if hasattr(h, 'done') else False,
-        "date": h.date.isoformat() if hasattr(h, 'date') and h.date else datetime.date.today().isoformat(),
-        "files": [],
-    }
+    def get_client(self) -> Any:
+        return self._inner.get_client()
+
+    @property
+    def session_lock(self) -> Any:
+        return getattr(self._inner, "session_lock", None) or contextlib.nullcontext()
+
+    def get_lessons(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
+        return self._invoke("get_lessons", date_from, date_to)
+
+    def get_homework(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
+        return self._invoke("get_homework", date_from, date_to)
+
+    def get_periods(self) -> list[Any]:
+        return self._invoke("get_periods")
+
+    def get_period_grades(self, period: Any) -> list[Any]:
+        return self._invoke("get_period_grades", period)
+
+    def get_period_averages(self, period: Any) -> list[Any]:
+        return self._invoke("get_period_averages", period)
+
+    def get_period_absences(self, period: Any) -> list[Any]:
+        return self._invoke("get_period_absences", period)
+
+    def get_period_delays(self, period: Any) -> list[Any]:
+        return self._invoke("get_period_delays", period)
+
+    def get_discussions(self) -> list[Any]:
+        return self._invoke("get_discussions")
+
+    def get_informations(self) -> list[Any]:
+        return self._invoke("get_informations")
+
+    def set_homework_done(self, homework_id: str, done: bool) -> bool:
+        return self._invoke("set_homework_done", homework_id, done)
+
+    def get_lesson_content(self, lesson_id: str, date_from: datetime.date, date_to: datetime.date) -> Any:
+        return self._invoke("get_lesson_content", lesson_id, date_from, date_to)
+
+    def get_recipients(self) -> list[Any]:
+        return self._invoke("get_recipients")
+
+    def search_recipients(self, query: str, limit: int = 50) -> list[Any]:
+        return self._invoke("search_recipients", query, limit)
+
+    def create_discussion(self, recipient_ids: list[str], subject: str, content: str) -> Any:
+        return self._invoke("create_discussion", recipient_ids, subject, content)
+
+    def reply_discussion(self, discussion_id: str, content: str) -> bool:
+        return self._invoke("reply_discussion", discussion_id, content)
+
+    def mark_discussion(self, discussion_id: str, mark_as: str) -> bool:
+        return self._invoke("mark_discussion", discussion_id, mark_as)
+
+    def delete_discussion(self, discussion_id: str) -> bool:
+        return self._invoke("delete_discussion", discussion_id)
+
+    def mark_information_read(self, information_id: str) -> bool:
+        return self._invoke("mark_information_read", information_id)
+
+    def get_menus(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
+        return self._invoke("get_menus", date_from, date_to)
+
+    def read_normalized(self, method: str, *args: Any) -> Tuple[Any, Any]:
+        return self._invoke("read_normalized", method, *args)
+
+    def export_ical(self, date_from: Optional[datetime.date], date_to: Optional[datetime.date]) -> str:
+        return self._invoke("export_ical", date_from, date_to)
+
+    def download_attachment(self, url: str) -> Any:
+        return self._invoke("download_attachment", url)
+
+    def get_counters(self, days: int = 7) -> dict[str, int]:
+        return self._invoke("get_counters", days)
+
+
+# Lectures portant sur une période de `get_periods` (argument unique : la période).
+PERIOD_READS = frozenset({"get_period_grades", "get_period_averages", "get_period_absences", "get_period_delays"})
+
+READ_METHODS = frozenset({
+    "get_lessons", "get_homework", "get_periods", "get_discussions", "get_informations",
+    "get_lesson_content", "get_recipients", "search_recipients", "get_menus", "export_ical",
+    "download_attachment", "get_counters", "read_normalized",
+}) | PERIOD_READS
+
+RESILIENCE_DEFAULTS: dict[str, Any] = {
+    "enabled": True,
+    "max_workers": 8,
+    "read_deadline": 15.0,
+    "mutation_deadline": 20.0,
+    "login_deadline": 45.0,
+    "read_retries": 2,
+    "retry_base_delay": 0.25,
+    "retry_max_delay": 2.0,
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+    "stale_cache_entries": 64,
+    "stale_cache_bytes": 16 * 1024 * 1024,
+}
+
+# Délais par défaut de certaines méthodes, surchargés par `resilience.deadlines`.
+DEFAULT_DEADLINES: dict[str, float] = {
+    # Une requête par discussion pour charger ses messages.
+    "get_discussions": 45.0,
+}
+
+
+def _resilience_settings(config: dict) -> dict[str, Any]:
+    """Section `resilience` de config.json (+ `deadlines` par méthode)."""
+    section = config.get("resilience")
+    settings = _merge_settings(RESILIENCE_DEFAULTS, section)
+    deadlines: dict[str, float] = dict(DEFAULT_DEADLINES)
+    raw_deadlines = section.get("deadlines") if isinstance(section, dict) else None
+    if isinstance(raw_deadlines, dict):
+        for method, value in raw_deadlines.items():
+            try:
+                deadlines[str(method)] = float(value)
+            except (TypeError, ValueError):
+                pass
+    settings["deadlines"] = deadlines
+    return settings
+
+
+class CircuitBreaker:
+    """Disjoncteur classique closed → open → half_open."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._last_error = ""
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = "half_open"
+                self._trial_in_flight = False
+            if self._state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Appel d'essai terminé sans verdict (erreur logique) : un autre appel pourra essayer."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = f"{type(error).__name__}: {error}"[:200]
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self._state == "open":
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_in": retry_in,
+                "last_error": self._last_error or None,
+            }
+
+
+class ResilientBackendAdapter(_DelegatingAdapter):
+    """Délais par méthode, retries bornés (lectures) et disjoncteur upstream.
+
+    Les appels partent sur un pool de threads borné : un Pronote lent libère
+    le thread Flask à l'échéance au lieu de le bloquer. Disjoncteur ouvert,
+    les lectures servent la dernière réponse connue pour les mêmes arguments
+    ou échouent immédiatement. Cette réponse est compactée et mesurée par un
+    thread dédié, hors du chemin de la requête.
+    """
+
+    # Flux binaires : ni réutilisables ni à retenir en mémoire.
+    NOT_REMEMBERED = frozenset({"download_attachment"})
+
+    def __init__(self, inner: PronoteBackendAdapter, settings: Optional[dict[str, Any]] = None) -> None:
+        super().__init__(inner)
+        self._settings = dict(settings or _resilience_settings({}))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(self._settings["max_workers"])),
+            thread_name_prefix="pronote-upstream",
+        )
+        self._breaker = CircuitBreaker(self._settings["failure_threshold"], self._settings["reset_timeout"])
+        self._stale_lock = threading.Lock()
+        self._stale = RecordStore(int(self._settings["stale_cache_entries"]), int(self._settings["stale_cache_bytes"]))
+        self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pronote-compact")
+        self._last_compaction: Optional[Future] = None
+        self._stale_generation = 0
+        self._stale_hits = 0
+        self._timeouts = 0
+
+    def _deadline_for(self, method: str) -> float:
+        if method in self._settings["deadlines"]:
+            return self._settings["deadlines"][method]
+        if method == "login":
+            return self._settings["login_deadline"]
+        if method in READ_METHODS:
+            return self._settings["read_deadline"]
+        return self._settings["mutation_deadline"]
+
+    def _call_with_deadline(self, method: str, args: tuple, timeout: float) -> Any:
+        future = self._executor.submit(_profiler.wrap(getattr(self._inner, method)), *args)
+        try:
+            return future.result(timeout=max(0.0, timeout))
+        except FutureTimeoutError:
+            future.cancel()
+            self._timeouts += 1
+            raise AdapterTimeoutError(f"Délai dépassé pour {method} ({timeout:.1f}s)", pending=future) from None
+
+    def _remember(self, key: tuple, value: Any) -> None:
+        # Enregistrements compacts : le cache ne retient pas les objets pronotepy.
+        with self._stale_lock:
+            self._last_compaction = self._compactor.submit(self._store_stale, self._stale_generation, key, value)
+
+    def _store_stale(self, generation: int, key: tuple, value: Any) -> None:
+        try:
+            # Seuls des attributs déjà chargés sont copiés (champs DEFERRED exclus) ; le verrou
+            # évite de les lire pendant qu'un appel de la même session les met à jour.
+            with self.session_lock:
+                record = compact_result(key[0], value)
+            with self._stale_lock:
+                if generation != self._stale_generation:
+                    return
+            self._stale.put(key, record)
+        except Exception:
+            traceback.print_exc()
+
+    def _clear_stale(self) -> None:
+        with self._stale_lock:
+            self._stale_generation += 1
+        self._stale.clear()
+
+    def settle(self, timeout: float = 1.0) -> None:
+        """Attend la fin des compactions en cours (au plus `timeout` secondes)."""
+        with self._stale_lock:
+            pending = self._last_compaction
+        if pending is not None:
+            wait([pending], timeout=timeout)
+
+    def _stale_value(self, key: tuple) -> Tuple[bool, Any]:
+        self.settle()
+        found, value = self._stale.get(key)
+        if found:
+            with self._stale_lock:
+                self._stale_hits += 1
+        return found, value
+
+    def _invoke(self, method: str, *args: Any) -> Any:
+        if method == "login":
+            logged = self._call_with_deadline(method, args, self._deadline_for(method))
+            if logged:
+                self._breaker.record_success()
+                self._clear_stale()
+            return logged
+
+        is_read = method in READ_METHODS
+        # Les périodes pronotepy changent d'instance à chaque get_periods : clé sur leur identité.
+        key = (method, (period_key(args[0]),)) if method in PERIOD_READS else (method, args)
+        if not self._breaker.allow():
+            if is_read:
+                found, value = self._stale_value(key)
+                if found:
+                    return value
+            raise CircuitOpenError("Serveur Pronote indisponible (disjoncteur ouvert)")
+
+        deadline = time.monotonic() + self._deadline_for(method)
+        attempts = 1 + (max(0, int(self._settings["read_retries"])) if is_read else 0)
+        for attempt in range(attempts):
+            try:
+                value = self._call_with_deadline(method, args, deadline - time.monotonic())
+            except AdapterError as exc:
+                if not isinstance(exc, AdapterTimeoutError):
+                    # Erreur logique (non connecté, non supporté…) : pas une panne upstream,
+                    # mais l'éventuel essai half_open doit être libéré.
+                    self._breaker.release_trial()
+                    raise
+                self._breaker.record_failure(exc)
+                raise
+            except Exception as exc:
+                if attempt + 1 >= attempts:
+                    self._breaker.record_failure(exc)
+                    raise
+                # Backoff exponentiel avec « full jitter », borné par l'échéance globale.
+                ceiling = min(self._settings["retry_max_delay"], self._settings["retry_base_delay"] * (2 ** attempt))
+                pause = random.uniform(0, ceiling)
+                if time.monotonic() + pause >= deadline:
+                    self._breaker.record_failure(exc)
+                    raise
+                time.sleep(pause)
+                continue
+            self._breaker.record_success()
+            if is_read and method not in self.NOT_REMEMBERED:
+                self._remember(key, value)
+            return value
+        raise AdapterError(f"Appel {method} impossible")
+
+    def logout(self) -> None:
+        super().logout()
+        self._clear_stale()
+
+    def reconfigure(self, settings: dict[str, Any]) -> None:
+        """Nouveaux délais/retries/seuils; la taille du pool reste celle du démarrage."""
+        self._settings = dict(settings)
+        self._breaker.failure_threshold = max(1, int(settings["failure_threshold"]))
+        self._breaker.reset_timeout = float(settings["reset_timeout"])
+        self._stale.reconfigure(int(settings["stale_cache_entries"]), int(settings["stale_cache_bytes"]))
+
+    def health_snapshot(self) -> dict[str, Any]:
+        with self._stale_lock:
+            stale_hits = self._stale_hits
+        stale = self._stale.stats()
+        return {
+            "breaker": self._breaker.snapshot(),
+            "timeouts": self._timeouts,
+            "stale_entries": stale["entries"],
+            "stale_bytes": stale["bytes"],
+            "stale_hits": stale_hits,
+        }
+
+    def memory_snapshot(self) -> dict[str, Any]:
+        return {"stale_records": self._stale.stats()}
+
+
+# ─── Ordonnancement upstream (priorités, budget par hôte Pronote) ────────────
+SCHEDULER_DEFAULTS: dict[str, Any] = {
+    "enabled": True,
+    "max_concurrent": 4,
+    "reserved_interactive": 1,
+    "rate": 8.0,
+    "burst": 12,
+    "queue_timeout": 30.0,
+}
+
+# Classes de priorité, de la plus urgente à la moins urgente.
+PRIORITIES = ("interactive", "mutation", "prefetch", "background")
+PRIORITY_HEADER = "X-Pronote-Priority"
+
+_priority_context = threading.local()
+
+
+def _scheduler_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `scheduler` de config.json avec les défauts."""
+    return _merge_settings(SCHEDULER_DEFAULTS, config.get("scheduler"))
+
+
+@contextlib.contextmanager
+def upstream_priority(name: str):
+    """Classe de priorité des appels upstream faits par ce thread dans le bloc."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Priorité inconnue: {name}")
+    previous = getattr(_priority_context, "name", None)
+    _priority_context.name = name
+    try:
+        yield
+    finally:
+        _priority_context.name = previous
+
+
+def current_priority(method: str) -> str:
+    """Priorité explicite du thread, sinon `interactive` (lecture) ou `mutation` (écriture)."""
+    explicit = getattr(_priority_context, "name", None)
+    if explicit is not None:
+        return explicit
+    return "interactive" if method in READ_METHODS or method == "login" else "mutation"
+
+
+class _HostLane:
+    """File d'attente, seau de jetons et appels en cours d'un hôte Pronote."""
+
+    def __init__(self, burst: float) -> None:
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.waiters: list[tuple[int, int]] = []
+
+
+class UpstreamScheduler:
+    """Point de passage unique des appels pronotepy : priorité, débit et concurrence.
+
+    Par hôte Pronote, un seau de jetons (`rate` par seconde, `burst` au plus)
+    et un nombre borné d'appels simultanés. Les appels en attente sont servis
+    par priorité puis par ordre d'arrivée ; `reserved_interactive` places
+    restent réservées aux clics de l'utilisateur (et aux écritures), qu'une
+    synchronisation de fond ne peut donc jamais occuper.
+    """
+
+    def __init__(self, settings: dict[str, Any], clock: Callable[[], float] = time.monotonic) -> None:
+        self.settings = dict(settings)
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._lanes: dict[str, _HostLane] = {}
+        self._seq = 0
+        self._stats = {
+            name: {"calls": 0, "queued": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0, "waits": deque(maxlen=256)}
+            for name in PRIORITIES
+        }
+
+    def reconfigure(self, settings: dict[str, Any]) -> None:
+        with self._cond:
+            self.settings = dict(settings)
+            self._cond.notify_all()
+
+    def _lane(self, host: str) -> _HostLane:
+        lane = self._lanes.get(host)
+        if lane is None:
+            lane = self._lanes[host] = _HostLane(self.settings["burst"])
+        return lane
+
+    def _refill(self, lane: _HostLane) -> None:
+        now = self._clock()
+        burst = max(1.0, float(self.settings["burst"]))
+        lane.tokens = min(burst, lane.tokens + (now - lane.refilled_at) * max(0.0, float(self.settings["rate"])))
+        lane.refilled_at = now
+
+    def _slots_for(self, rank: int) -> int:
+        limit = max(1, int(self.settings["max_concurrent"]))
+        if rank <= PRIORITIES.index("mutation"):
+            return limit
+        return max(1, limit - max(0, int(self.settings["reserved_interactive"])))
+
+    def acquire(self, host: str, priority: str) -> float:
+        """Attend son tour ; renvoie le temps passé en file (s)."""
+        rank = PRIORITIES.index(priority)
+        stats = self._stats[priority]
+        started = self._clock()
+        deadline = started + float(self.settings["queue_timeout"])
+        with self._cond:
+            lane = self._lane(host)
+            self._seq += 1
+            entry = (rank, self._seq)
+            heapq.heappush(lane.waiters, entry)
+            stats["queued"] += 1
+            try:
+                while True:
+                    self._refill(lane)
+                    pause = None
+                    if lane.waiters[0] == entry and lane.in_flight < self._slots_for(rank):
+                        if lane.tokens >= 1.0:
+                            heapq.heappop(lane.waiters)
+                            lane.tokens -= 1.0
+                            lane.in_flight += 1
+                            break
+                        rate = float(self.settings["rate"])
+                        pause = (1.0 - lane.tokens) / rate if rate > 0 else None
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        lane.waiters.remove(entry)
+                        heapq.heapify(lane.waiters)
+                        self._cond.notify_all()
+                        stats["timeouts"] += 1
+                        raise AdapterTimeoutError(
+                            f"File upstream saturée ({priority}, {self.settings['queue_timeout']:.0f}s)"
+                        )
+                    self._cond.wait(min(remaining, pause) if pause is not None else remaining)
+            finally:
+                stats["queued"] -= 1
+            waited = self._clock() - started
+            stats["calls"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+            stats["waits"].append(waited)
+            # La tête de file a changé : le suivant peut être servi.
+            self._cond.notify_all()
+        return waited
+
+    def release(self, host: str) -> None:
+        with self._cond:
+            lane = self._lane(host)
+            lane.in_flight = max(0, lane.in_flight - 1)
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, host: str, priority: str):
+        self.acquire(host, priority)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            classes = {}
+            for name, data in self._stats.items():
+                waits = sorted(data["waits"])
+                classes[name] = {
+                    "calls": data["calls"],
+                    "queued": data["queued"],
+                    "timeouts": data["timeouts"],
+                    "wait_avg_ms": round(data["wait_total"] / data["calls"] * 1000, 1) if data["calls"] else 0.0,
+                    "wait_p95_ms": round(waits[int(len(waits) * 0.95) - 1 if len(waits) > 1 else 0] * 1000, 1) if waits else 0.0,
+                    "wait_max_ms": round(data["wait_max"] * 1000, 1),
+                }
+            hosts = {}
+            for host, lane in self._lanes.items():
+                self._refill(lane)
+                hosts[host or "-"] = {
+                    "in_flight": lane.in_flight,
+                    "waiting": len(lane.waiters),
+                    "tokens": round(lane.tokens, 2),
+                }
+            return {"classes": classes, "hosts": hosts}
+
+
+_upstream_scheduler = UpstreamScheduler(_scheduler_settings(CONFIG))
+
+
+class ScheduledAdapter(_DelegatingAdapter):
+    """Fait passer chaque appel du contrat par l'ordonnanceur upstream partagé.
+
+    Placé au-dessus de la résilience : l'attente en file ne consomme pas le
+    délai de l'appel, et les retries restent dans la place obtenue.
+    """
+
+    def __init__(self, inner: PronoteBackendAdapter, scheduler: UpstreamScheduler) -> None:
+        super().__init__(inner)
+        self._scheduler = scheduler
+        self._host = ""
+
+    def __getattr__(self, name: str) -> Any:
+        # reconfigure, health_snapshot, memory_snapshot… de la couche enveloppée.
+        if name.startswith("__") or name == "_inner":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+    @staticmethod
+    def host_of(pronote_url: str) -> str:
+        return urlsplit(pronote_url).netloc.lower()
+
+    def _invoke(self, method: str, *args: Any) -> Any:
+        host = self.host_of(args[0]) if method == "login" else self._host
+        self._scheduler.acquire(host, current_priority(method))
+        release = functools.partial(self._scheduler.release, host)
+        try:
+            value = super()._invoke(method, *args)
+        except AdapterTimeoutError as exc:
+            if exc.pending is not None and not exc.pending.done():
+                # Délai dépassé mais le worker interroge encore Pronote : la place reste prise.
+                exc.pending.add_done_callback(lambda _future: release())
+            else:
+                release()
+            raise
+        except BaseException:
+            release()
+            raise
+        if method == "download_attachment":
+            # Le téléchargement continue pendant le relais des morceaux : place rendue à la fermeture.
+            return _ScheduledStream(value, release)
+        release()
+        if method == "login" and value:
+            self._host = host
+        return value
+
+
+class _ScheduledStream:
+    """Réponse en streaming qui rend sa place d'ordonnancement à la fermeture."""
+
+    def __init__(self, response: Any, release: Callable[[], None]) -> None:
+        self._response = response
+        self._release: Optional[Callable[[], None]] = release
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name in ("_response", "_release", "_lock"):
+            raise AttributeError(name)
+        return getattr(self._response, name)
+
+    def close(self) -> None:
+        with self._lock:
+            release, self._release = self._release, None
+        try:
+            self._response.close()
+        finally:
+            if release is not None:
+                release()
+
+
+def _with_scheduling(adapter: PronoteBackendAdapter, config: dict) -> PronoteBackendAdapter:
+    """Enveloppe l'adapter dans l'ordonnanceur upstream (désactivable via config.json)."""
+    if not _scheduler_settings(config)["enabled"]:
+        return adapter
+    return ScheduledAdapter(adapter, _upstream_scheduler)
+
+
+@app.before_request
+def _priority_before_request() -> None:
+    # Le client ne peut que se déclasser (polling, préchargement), jamais passer devant.
+    name = request.headers.get(PRIORITY_HEADER, "").strip().lower()
+    _priority_context.name = name if name in ("prefetch", "background") else None
+
+
+@app.teardown_request
+def _priority_teardown(error: Optional[BaseException]) -> None:
+    _priority_context.name = None
+
+
+# ─── Enregistrement / rejeu des appels backend ────────────────────────────────
+_SNAPSHOT_MAX_DEPTH = 6
+
+
+def _declared_fields(value: Any) -> list[str]:
+    """Attributs d'instance (`__dict__`, `__slots__`) : les propriétés de classe ne sont pas lues."""
+    names = list(getattr(value, "__dict__", None) or ())
+    for cls in type(value).__mro__:
+        slots = getattr(cls, "__slots__", ())
+        names.extend((slots,) if isinstance(slots, str) else slots)
+    return list(dict.fromkeys(names))
+
+
+def _snapshot(value: Any, depth: int = 0, path: Optional[set] = None, record_type: Optional[type] = None) -> Any:
+    """Photographie JSON d'un résultat pronotepy.
+
+    Avec `record_type`, seuls ses champs (ceux que lisent les sérialiseurs)
+    sont évalués ; sinon seuls les attributs d'instance. Une propriété
+    paresseuse (ex: `period.grades`) n'est donc jamais déclenchée par
+    l'enregistrement.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return {"__type__": "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"__type__": "date", "value": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"__type__": "time", "value": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__type__": "bytes", "value": base64.b64encode(value).decode("ascii")}
+    if depth >= _SNAPSHOT_MAX_DEPTH:
+        return str(value)
+    path = path if path is not None else set()
+    marker = id(value)
+    if marker in path:
+        # Référence circulaire (ex: grade.period.grades) : coupée au rejeu.
+        return None
+    path.add(marker)
+    try:
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return [_snapshot(v, depth + 1, path, record_type) for v in value]
+        if isinstance(value, dict):
+            return {"__type__": "dict", "items": {str(k): _snapshot(v, depth + 1, path) for k, v in value.items()}}
+        if record_type is not None:
+            names, nested = list(record_type.FIELDS), record_type.NESTED
+        else:
+            names, nested = _declared_fields(value), {}
+        attrs: dict[str, Any] = {}
+        for name in names:
+            if name.startswith("_"):
+                continue
+            try:
+                attr = getattr(value, name)
+            except Exception:
+                continue
+            if callable(attr):
+                continue
+            attrs[name] = _snapshot(attr, depth + 1, path, nested.get(name))
+        return {"__type__": "object", "class": type(value).__name__, "attrs": attrs}
+    finally:
+        path.discard(marker)
+
+
+class ReplayObject(types.SimpleNamespace):
+    """Objet rejoué : attributs restaurés, mutations sans effet upstream."""
+
+    def set_done(self, done: bool) -> None:
+        self.done = bool(done)
+
+    def reply(self, content: str) -> None:
+        return None
+
+    def mark_as(self, mark_as: str) -> None:
+        self.unread = mark_as == "unread"
+
+    def delete(self) -> None:
+        return None
+
+    def mark_as_read(self) -> None:
+        self.read = True
+
+
+def _restore(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_restore(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    kind = value.get("__type__")
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(value["value"])
+    if kind == "date":
+        return datetime.date.fromisoformat(value["value"])
+    if kind == "time":
+        return datetime.time.fromisoformat(value["value"])
+    if kind == "bytes":
+        return base64.b64decode(value["value"])
+    if kind == "dict":
+        return {k: _restore(v) for k, v in value.get("items", {}).items()}
+    if kind == "object":
+        return ReplayObject(**{k: _restore(v) for k, v in value.get("attrs", {}).items()})
+    return {k: _restore(v) for k, v in value.items()}
+
+
+class FixtureStore:
+    """Fixtures sur disque : `<racine>/<méthode>/<empreinte des arguments>.json`."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    @staticmethod
+    def args_key(args: tuple) -> str:
+        raw = json.dumps(_snapshot(list(args)), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def _path(self, method: str, args: tuple) -> str:
+        return os.path.join(self.root, method, f"{self.args_key(args)}.json")
+
+    def save(self, method: str, args: tuple, elapsed: float, *, result: Any = None, error: Optional[str] = None) -> None:
+        entry: dict[str, Any] = {
+            "method": method,
+            "args": _snapshot(list(args)),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        if error is not None:
+            entry["error"] = error
+        else:
+            entry["result"] = result
+        _atomic_write_json(self._path(method, args), entry)
+
+    def save_blob(self, method: str, args: tuple, elapsed: float, data: bytes, headers: dict[str, str]) -> None:
+        """Contenu binaire (pièce jointe) à côté de sa fixture JSON."""
+        path = os.path.join(self.root, method, f"{self.args_key(args)}.bin")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".bin", dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.save(method, args, elapsed, result={"headers": headers, "size": len(data)})
+
+    def load_blob(self, method: str, args: tuple) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.root, method, f"{self.args_key(args)}.bin"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def load(self, method: str, args: tuple, fallback_latest: bool = False) -> Optional[dict[str, Any]]:
+        """Fixture exacte, sinon (sur demande) la plus récente de la même méthode."""
+        candidates = [self._path(method, args)]
+        if fallback_latest:
+            directory = os.path.join(self.root, method)
+            try:
+                others = [os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".json")]
+            except OSError:
+                others = []
+            candidates.extend(sorted(others, key=lambda p: os.path.getmtime(p), reverse=True))
+        for candidate in candidates:
+            try:
+                with open(candidate) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+        return None
+
+
+class RecordingAdapter(_DelegatingAdapter):
+    """Enregistre le résultat sérialisé de chaque appel de l'adapter enveloppé."""
+
+    def __init__(self, inner: PronoteBackendAdapter, store: FixtureStore) -> None:
+        super().__init__(inner)
+        self._store = store
+
+    # La lecture sous-jacente (get_menus…) est enregistrée telle quelle, donc rejouable.
+    read_normalized = PronoteBackendAdapter.read_normalized
+
+    def _record(self, method: str, args: tuple, started: float, **outcome: Any) -> None:
+        try:
+            self._store.save(method, args, time.perf_counter() - started, **outcome)
+        except Exception:
+            traceback.print_exc()
+
+    def _record_blob(self, args: tuple, started: float, response: Any, data: bytes) -> None:
+        headers = {"Content-Type": str(getattr(response, "headers", {}).get("Content-Type", "") or "")}
+        try:
+            self._store.save_blob("download_attachment", args, time.perf_counter() - started, data, headers)
+        except Exception:
+            traceback.print_exc()
+
+    def _invoke(self, method: str, *args: Any) -> Any:
+        if method == "download_attachment":
+            # Flux binaire : le contenu est figé à côté de la fixture une fois lu jusqu'au bout.
+            started = time.perf_counter()
+            response = super()._invoke(method, *args)
+            return _RecordedStream(response, functools.partial(self._record_blob, args, started, response))
+        # Jamais de mot de passe dans les fixtures ; une période est repérée par son identité.
+        if method == "login":
+            recorded_args = args[:2]
+        elif method in PERIOD_READS:
+            recorded_args = (period_to_dict(args[0]),)
+        else:
+            recorded_args = args
+        started = time.perf_counter()
+        try:
+            result = super()._invoke(method, *args)
+        except Exception as exc:
+            self._record(method, recorded_args, started, error=f"{type(exc).__name__}: {exc}")
+            raise
+        if method == "login":
+            info = getattr(self._inner.get_client(), "info", None) if result else None
+            self._record(
+                method, recorded_args, started,
+                result={"logged_in": bool(result), "info": _snapshot(info, record_type=ClientInfoRecord)},
+            )
+        else:
+            self._record(method, recorded_args, started, result=_snapshot(result, record_type=_SNAPSHOT_TYPES.get(method)))
+        return result
+
+
+# Champs enregistrés par méthode : ceux des enregistrements compacts, lus par les sérialiseurs.
+_SNAPSHOT_TYPES: dict[str, type] = dict(_RECORD_TYPES, get_lesson_content=LessonContentRecord)
+
+
+class _RecordedStream:
+    """Flux de pièce jointe dont le contenu, s'il est lu jusqu'au bout, est aussi enregistré."""
+
+    MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, response: Any, on_complete: Callable[[bytes], None]) -> None:
+        self._response = response
+        self._on_complete = on_complete
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name in ("_response", "_on_complete"):
+            raise AttributeError(name)
+        return getattr(self._response, name)
+
+    def iter_content(self, chunk_size: int = 1, **kwargs: Any):
+        buffer: Optional[bytearray] = bytearray()
+        for chunk in self._response.iter_content(chunk_size=chunk_size, **kwargs):
+            if buffer is not None:
+                buffer.extend(chunk)
+                if len(buffer) > self.MAX_BYTES:
+                    buffer = None
+            yield chunk
+        if buffer is not None:
+            self._on_complete(bytes(buffer))
+
+
+class ReplayStream:
+    """Réponse en streaming rejouée depuis le contenu enregistré."""
+
+    def __init__(self, data: bytes, headers: dict[str, str]) -> None:
+        self._data = data
+        self.headers = dict(headers)
+
+    def iter_content(self, chunk_size: int = 1, **kwargs: Any):
+        for offset in range(0, len(self._data), max(1, int(chunk_size))):
+            yield self._data[offset:offset + chunk_size]
+
+    def raise_for_status(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
+class FixtureMissError(AdapterError):
+    """Aucune fixture enregistrée pour cet appel et ces arguments."""
+
+
+_MISSING = object()
+
+
+class ReplayAdapter(PronoteBackendAdapter):
+    """Sert les fixtures enregistrées par RecordingAdapter, sans aucun accès réseau.
+
+    `latency_scale` rejoue la latence mesurée (1.0 = identique, 0 = aucune).
+    Une lecture sans fixture pour ses arguments échoue (`FixtureMissError`) ;
+    `fallback_latest` sert à la place la plus récente de la méthode. Les
+    écritures sans fixture réussissent sans effet.
+    """
+
+    def __init__(self, store: FixtureStore, latency_scale: float = 0.0, fallback_latest: bool = False) -> None:
+        self._store = store
+        self._latency_scale = max(0.0, latency_scale)
+        self._fallback_latest = fallback_latest
+        self._client: Any = None
+
+    def _replay(self, method: str, *args: Any, default: Any = _MISSING) -> Any:
+        entry = self._store.load(method, args, fallback_latest=self._fallback_latest)
+        if entry is None:
+            if default is _MISSING:
+                raise FixtureMissError(f"Rejeu: aucune fixture pour {method} ({self._store.args_key(args)})")
+            return default
+        if self._latency_scale:
+            time.sleep(float(entry.get("elapsed_ms", 0)) / 1000.0 * self._latency_scale)
+        if "error" in entry:
+            raise AdapterError(f"Rejeu: {entry['error']}")
+        return _restore(entry.get("result"))
+
+    def login(self, pronote_url: str, username: str, password: str) -> bool:
+        outcome = self._replay("login", pronote_url, username) or {"logged_in": True, "info": None}
+        if not outcome.get("logged_in"):
+            return False
+        info = outcome.get("info") or ReplayObject(name="Compte rejoué", establishment="", class_name=None)
+        self._client = ReplayObject(info=info, logged_in=True)
+        return True
+
+    def logout(self) -> None:
+        self._client = None
+
+    def is_logged_in(self) -> bool:
+        return self._client is not None
+
+    def get_client(self) -> Any:
+        if self._client is None:
+            raise AdapterError("Non connecté")
+        return self._client
+
+    def get_lessons(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
+        return self._replay("get_lessons", date_from, date_to)
+
+    def get_homework(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
+        return self._replay("get_homework", date_from, date_to)
+
+    def get_periods(self) -> list[Any]:
+        return self._replay("get_periods")
+
+    def get_period_grades(self, period: Any) -> list[Any]:
+        return self._replay("get_period_grades", period_to_dict(period))
+
+    def get_period_averages(self, period: Any) -> list[Any]:
+        return self._replay("get_period_averages", period_to_dict(period))
+
+    def get_period_absences(self, period: Any) -> list[Any]:
+        return self._replay("get_period_absences", period_to_dict(period))
+
+    def get_period_delays(self, period: Any) -> list[Any]:
+        return self._replay("get_period_delays", period_to_dict(period))
+
+    def get_discussions(self) -> list[Any]:
+        return self._replay("get_discussions")
+
+    def get_informations(self) -> list[Any]:
+        return self._replay("get_informations")
+
+    def set_homework_done(self, homework_id: str, done: bool) -> bool:
+        return bool(self._replay("set_homework_done", homework_id, done, default=True))
+
+    def get_lesson_content(self, lesson_id: str, date_from: datetime.date, date_to: datetime.date) -> Any:
+        return self._replay("get_lesson_content", lesson_id, date_from, date_to)
+
+    def get_recipients(self) -> list[Any]:
+        return self._replay("get_recipients")
+
+    def create_discussion(self, recipient_ids: list[str], subject: str, content: str) -> Any:
+        return self._replay("create_discussion", recipient_ids, subject, content)
+
+    def reply_discussion(self, discussion_id: str, content: str) -> bool:
+        return bool(self._replay("reply_discussion", discussion_id, content, default=True))
+
+    def mark_discussion(self, discussion_id: str, mark_as: str) -> bool:
+        return bool(self._replay("mark_discussion", discussion_id, mark_as, default=True))
+
+    def delete_discussion(self, discussion_id: str) -> bool:
+        return bool(self._replay("delete_discussion", discussion_id, default=True))
+
+    def mark_information_read(self, information_id: str) -> bool:
+        return bool(self._replay("mark_information_read", information_id, default=True))
+
+    def get_menus(self, date_from: datetime.date, date_to: datetime.date) -> list[Any]:
+        return self._replay("get_menus", date_from, date_to)
+
+    def export_ical(self, date_from: Optional[datetime.date], date_to: Optional[datetime.date]) -> str:
+        return str(self._replay("export_ical", date_from, date_to))
+
+    def download_attachment(self, url: str) -> Any:
+        entry = self._replay("download_attachment", url)
+        data = self._store.load_blob("download_attachment", (url,))
+        if data is None:
+            raise FixtureMissError("Rejeu: contenu de la pièce jointe non enregistré")
+        return ReplayStream(data, (entry or {}).get("headers") or {})
+
+
+def _fixtures_dir() -> str:
+    return os.environ.get("PRONOTE_FIXTURES_DIR", os.path.join(DATA_DIR, "fixtures"))
+
+
+class WarmAdapter(_DelegatingAdapter):
+    """Sert les lectures depuis la dernière synchronisation d'arrière-plan du compte.
+
+    `warm()` charge en une fois emploi du temps et devoirs sur une fenêtre de
+    dates, messages et informations (enregistrements compacts). Une lecture
+    dont la plage est couverte par cette fenêtre, tant qu'elle a moins de
+    `ttl` secondes, est filtrée localement au lieu d'appeler Pronote : un
+    compte réactivé s'affiche sans chargement à froid. Toute écriture vide la
+    synchronisation.
+    """
+
+    # Méthode → attribut daté servant à filtrer la fenêtre synchronisée.
+    WINDOWED = {"get_lessons": "start", "get_homework": "date"}
+    WHOLE = frozenset({"get_discussions", "get_informations"})
+
+    def __init__(self, inner: PronoteBackendAdapter, ttl: float = 300.0) -> None:
+        super().__init__(inner)
+        self.ttl = ttl
+        self._warm_lock = threading.Lock()
+        self._warm: dict[str, tuple[float, Optional[tuple[datetime.date, datetime.date]], list[Any]]] = {}
+        self.warm_hits = 0
+
+    def __getattr__(self, name: str) -> Any:
+        # reconfigure, health_snapshot, memory_snapshot… de la couche enveloppée.
+        if name.startswith("__") or name == "_inner":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+    def warm(self, date_from: datetime.date, date_to: datetime.date) -> dict[str, int]:
+        """Synchronise les données clés du compte ; renvoie ses compteurs de badges.
+
+        Les lectures passent par la pile enveloppée (ordonnanceur, délais,
+        verrou de session) ; la compaction ne copie que des attributs déjà
+        chargés, sous le verrou de session pour ne pas croiser un appel du
+        compte réactivé entre-temps.
+        """
+        results = {
+            "get_lessons": self._inner.get_lessons(date_from, date_to),
+            "get_homework": self._inner.get_homework(date_from, date_to),
+            "get_discussions": self._inner.get_discussions(),
+            "get_informations": self._inner.get_informations(),
+        }
+        with self.session_lock:
+            lessons, homework, discussions, informations = (compact_result(m, v) for m, v in results.items())
+        now = time.monotonic()
+        with self._warm_lock:
+            self._warm = {
+                "get_lessons": (now, (date_from, date_to), lessons),
+                "get_homework": (now, (date_from, date_to), homework),
+                "get_discussions": (now, None, discussions),
+                "get_informations": (now, None, informations),
+            }
+        counters = BadgeCounters()
+        counters.observe_discussions(discussions)
+        counters.observe_informations(informations)
+        today = datetime.date.today()
+        counters.observe_homework(date_from, date_to, homework)
+        return counters.counts(today, today + datetime.timedelta(days=7))
+
+    def invalidate(self) -> None:
+        with self._warm_lock:
+            self._warm = {}
+
+    def _warm_value(self, method: str, args: tuple) -> Tuple[bool, Any]:
+        with self._warm_lock:
+            entry = self._warm.get(method)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return False, None
+        _loaded_at, window, items = entry
+        if method in self.WHOLE:
+            return True, list(items)
+        date_from, date_to = args
+        if window is None or not (window[0] <= date_from and date_to <= window[1]):
+            return False, None
+        attribute = self.WINDOWED[method]
+        selected = []
+        for item in items:
+            value = getattr(item, attribute, None)
+            day = value.date() if isinstance(value, datetime.datetime) else value
+            if isinstance(day, datetime.date) and date_from <= day <= date_to:
+                selected.append(item)
+        return True, selected
+
+    def _invoke(self, method: str, *args: Any) -> Any:
+        if method in self.WINDOWED or method in self.WHOLE:
+            found, value = self._warm_value(method, args)
+            if found:
+                self.warm_hits += 1
+                return value
+        elif method not in READ_METHODS:
+            self.invalidate()
+        return super()._invoke(method, *args)
+
+    def logout(self) -> None:
+        self.invalidate()
+        super().logout()
+
+
+def build_backend_adapter() -> PronoteBackendAdapter:
+    """Factory de backend.
+
+    Le nom est piloté par PRONOTE_BACKEND_ADAPTER pour faciliter les spikes.
+    Valeurs supportées:
+    - pronotepy-refonte (défaut)
+    - pronotepy-sync
+    - replay (fixtures de PRONOTE_FIXTURES_DIR, latence × PRONOTE_REPLAY_LATENCY,
+      PRONOTE_REPLAY_FALLBACK=1 pour rejouer la fixture la plus récente en l'absence d'exacte)
+
+    PRONOTE_BACKEND_RECORD=1 enregistre les appels de l'adapter choisi dans
+    PRONOTE_FIXTURES_DIR.
+    """
+    adapter_name = os.environ.get("PRONOTE_BACKEND_ADAPTER", "pronotepy-refonte").strip().lower()
+    adapter: PronoteBackendAdapter
+    if adapter_name in ("", "pronotepy-sync"):
+        adapter = PronotepySyncAdapter()
+    elif adapter_name in ("pronotepy-refonte", "refonte-pronotepy"):
+        adapter = PronotepyRefonteAdapter()
+    elif adapter_name == "replay":
+        try:
+            latency_scale = float(os.environ.get("PRONOTE_REPLAY_LATENCY", "0") or 0)
+        except ValueError:
+            latency_scale = 0.0
+        fallback = os.environ.get("PRONOTE_REPLAY_FALLBACK", "0").strip().lower() in ("1", "true", "yes", "on")
+        return ReplayAdapter(FixtureStore(_fixtures_dir()), latency_scale, fallback)
+    else:
+        raise RuntimeError(f"Backend adapter non supporté: {adapter_name}")
+    if os.environ.get("PRONOTE_BACKEND_RECORD", "0").strip().lower() in ("1", "true", "yes", "on"):
+        adapter = RecordingAdapter(adapter, FixtureStore(_fixtures_dir()))
+    return adapter
+
+
+def _with_resilience(adapter: PronoteBackendAdapter, config: dict) -> PronoteBackendAdapter:
+    """Enveloppe l'adapter dans la politique de résilience (désactivable via config.json)."""
+    settings = _resilience_settings(config)
+    if not settings["enabled"]:
+        return adapter
+    return ResilientBackendAdapter(adapter, settings)
+
+
+with _startup.phase("adapter"):
+    _adapter = _with_scheduling(_with_resilience(build_backend_adapter(), CONFIG), CONFIG)
+
+
+# ─── Comptes multiples (/api/accounts) ────────────────────────────────────────
+ACCOUNTS_DEFAULTS: dict[str, Any] = {
+    "max_accounts": 6,
+    "sync_interval": 600.0,
+    "sync_workers": 2,
+    "warm_ttl": 300.0,
+    "sync_days_before": 30,
+    "sync_days_after": 60,
+}
+
+
+def _accounts_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `accounts` de config.json avec les défauts."""
+    return _merge_settings(ACCOUNTS_DEFAULTS, config.get("accounts"))
+
+
+class Account:
+    """Un compte connecté : son adapter (et donc sa session pronotepy) reste vivant."""
+
+    def __init__(self, account_id: str, pronote_url: str, username: str, adapter: WarmAdapter) -> None:
+        self.id = account_id
+        self.pronote_url = pronote_url
+        self.username = username
+        self.adapter = adapter
+        self.client_info: dict[str, Any] = {}
+        self.counters: Optional[dict[str, int]] = None
+        self.last_sync: Optional[float] = None
+        self.last_used = time.time()
+        self.sync_error: Optional[str] = None
+        self.syncing = False
+
+    @property
+    def search_key(self) -> str:
+        return ClientProbeCache.key(self.pronote_url, self.username)
+
+    def to_dict(self, active: bool) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "pronote_url": self.pronote_url,
+            "username": self.username,
+            "client_info": self.client_info,
+            "active": active,
+            "logged_in": self.adapter.is_logged_in(),
+            "counters": self.counters,
+            "last_sync": datetime.datetime.fromtimestamp(self.last_sync).isoformat(timespec="seconds") if self.last_sync else None,
+            "sync_error": self.sync_error,
+        }
+
+
+class AccountRegistry:
+    """Comptes connectés simultanément ; les inactifs sont synchronisés en arrière-plan.
+
+    Les synchronisations passent par un pool commun de `sync_workers` threads :
+    quel que soit le nombre de comptes, au plus ce nombre d'appels Pronote
+    d'arrière-plan tournent en parallèle.
+    """
+
+    def __init__(self, settings: dict[str, Any], autostart: bool = True) -> None:
+        self.settings = settings
+        self._autostart = autostart
+        self._lock = threading.Lock()
+        self._accounts: OrderedDict[str, Account] = OrderedDict()
+        self.active_id: Optional[str] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wakeup = threading.Event()
+        self._scheduler: Optional[threading.Thread] = None
+
+    @staticmethod
+    def account_id(pronote_url: str, username: str) -> str:
+        return ClientProbeCache.key(pronote_url, username)[:16]
+
+    def reconfigure(self, settings: dict[str, Any]) -> None:
+        self.settings = settings
+        with self._lock:
+            for account in self._accounts.values():
+                account.adapter.ttl = float(settings["warm_ttl"])
+        self._wakeup.set()
+
+    def get(self, account_id: str) -> Optional[Account]:
+        with self._lock:
+            return self._accounts.get(account_id)
+
+    def find(self, adapter: Any) -> Optional[Account]:
+        with self._lock:
+            return next((a for a in self._accounts.values() if a.adapter is adapter), None)
+
+    def accounts(self) -> list[Account]:
+        with self._lock:
+            return list(self._accounts.values())
+
+    def register(self, account_id: str, pronote_url: str, username: str, adapter: Any) -> Account:
+        if not isinstance(adapter, WarmAdapter):
+            adapter = WarmAdapter(adapter, float(self.settings["warm_ttl"]))
+        account = Account(account_id, pronote_url, username, adapter)
+        evicted: list[Account] = []
+        with self._lock:
+            previous = self._accounts.pop(account_id, None)
+            if previous is not None and previous.adapter is not adapter:
+                evicted.append(previous)
+            self._accounts[account_id] = account
+            while len(self._accounts) > max(1, int(self.settings["max_accounts"])):
+                oldest = min(
+                    (a for a in self._accounts.values() if a.id not in (account_id, self.active_id)),
+                    key=lambda a: a.last_used,
+                    default=None,
+                )
+                if oldest is None:
+                    break
+                evicted.append(self._accounts.pop(oldest.id))
+        for stale in evicted:
+            with contextlib.suppress(Exception):
+                stale.adapter.logout()
+        return account
+
+    def activate(self, account_id: str) -> Account:
+        with self._lock:
+            account = self._accounts[account_id]
+            account.last_used = time.time()
+            self.active_id = account_id
+        if self._autostart:
+            self.start()
+        self._wakeup.set()
+        return account
+
+    def remove(self, account_id: str) -> Optional[Account]:
+        with self._lock:
+            account = self._accounts.pop(account_id, None)
+            if self.active_id == account_id:
+                self.active_id = None
+        if account is not None:
+            with contextlib.suppress(Exception):
+                account.adapter.logout()
+        return account
+
+    def _sync_window(self) -> tuple[datetime.date, datetime.date]:
+        today = datetime.date.today()
+        return (
+            today - datetime.timedelta(days=int(self.settings["sync_days_before"])),
+            today + datetime.timedelta(days=int(self.settings["sync_days_after"])),
+        )
+
+    def sync(self, account: Account) -> None:
+        """Synchronise un compte (appelé dans le pool commun)."""
+        try:
+            if not account.adapter.is_logged_in():
+                account.sync_error = "Session expirée"
+                return
+            with upstream_priority("background"):
+                account.counters = account.adapter.warm(*self._sync_window())
+            account.last_sync = time.time()
+            account.sync_error = None
+        except Exception as exc:
+            account.sync_error = f"{type(exc).__name__}: {exc}"
+        finally:
+            account.syncing = False
+
+    def due(self) -> list[Account]:
+        """Comptes inactifs dont la dernière synchronisation a plus de `sync_interval`."""
+        now = time.time()
+        interval = float(self.settings["sync_interval"])
+        with self._lock:
+            return [
+                a for a in self._accounts.values()
+                if a.id != self.active_id and not a.syncing and (a.last_sync is None or now - a.last_sync >= interval)
+            ]
+
+    def sync_due(self, wait: bool = False) -> int:
+        accounts = self.due()
+        if not accounts:
+            return 0
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(self.settings["sync_workers"])),
+                    thread_name_prefix="pronote-account-sync",
+                )
+            executor = self._executor
+        futures = []
+        for account in accounts:
+            account.syncing = True
+            futures.append(executor.submit(self.sync, account))
+        if wait:
+            for future in futures:
+                future.result()
+        return len(futures)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._scheduler is not None:
+                return
+            self._scheduler = threading.Thread(target=self._loop, name="pronote-accounts", daemon=True)
+        self._scheduler.start()
+
+    def _loop(self) -> None:
+        while True:
+            self._wakeup.wait(timeout=min(60.0, max(1.0, float(self.settings["sync_interval"]) / 4)))
+            self._wakeup.clear()
+            try:
+                self.sync_due()
+            except Exception:
+                traceback.print_exc()
+
+
+_accounts = AccountRegistry(_accounts_settings(CONFIG))
+
+
+def _new_account_adapter() -> PronoteBackendAdapter:
+    config = config_manager.get()
+    return _with_scheduling(_with_resilience(build_backend_adapter(), config), config)
+
+
+def _activate_account(account: Account) -> None:
+    """Bascule les routes sur le compte : caches de session vidés, index de recherche du compte."""
+    global _adapter
+    _reset_session_state()
+    _adapter = _accounts.activate(account.id).adapter
+    _search_index.open(account.search_key)
+
+
+@config_manager.subscribe
+def _apply_server_tuning(previous: dict, current: dict) -> None:
+    """Applique à chaud les réglages upstream/résilience modifiés dans config.json."""
+    _upstream_http_pool.reconfigure(_upstream_http_settings(current))
+    _accounts.reconfigure(_accounts_settings(current))
+    _upstream_scheduler.reconfigure(_scheduler_settings(current))
+    adapters = [_adapter] + [a.adapter for a in _accounts.accounts() if a.adapter is not _adapter]
+    for adapter in adapters:
+        reconfigure = getattr(adapter, "reconfigure", None)
+        if callable(reconfigure):
+            reconfigure(_resilience_settings(current))
+
+def client_to_dict(client: pronotepy.Client) -> dict:
+    return {
+        "name": client.info.name if client.info else "Professeur",
+        "establishment": client.info.establishment if client.info else "",
+        "class_name": getattr(client.info, 'class_name', None),
+        "profile_picture_url": None,
+    }
+
+def lesson_to_dict(l: pronotepy.Lesson) -> dict:
+    group_names = []
+    if hasattr(l, 'group_names') and isinstance(l.group_names, list):
+        group_names = [str(g) for g in l.group_names if g]
+    teacher_names = []
+    if hasattr(l, 'teacher_names') and isinstance(l.teacher_names, list):
+        teacher_names = [str(t) for t in l.teacher_names if t]
+    classrooms = []
+    if hasattr(l, 'classrooms') and isinstance(l.classrooms, list):
+        classrooms = [str(c) for c in l.classrooms if c]
+
+    return {
+        "id": str(l.id) if hasattr(l, 'id') else str(id(l)),
+        "subject": {"id": l.subject.id if l.subject else "", "name": l.subject.name if l.subject else "Cours", "groups": l.subject.groups if l.subject else False} if l.subject else None,
+        "teacher_name": l.teacher_name if hasattr(l, 'teacher_name') else None,
+        "classroom": l.classroom if hasattr(l, 'classroom') else None,
+        "start": l.start.isoformat(),
+        "end": l.end.isoformat(),
+        "is_cancelled": l.canceled if hasattr(l, 'canceled') else False,
+        "is_outing": l.outing if hasattr(l, 'outing') else False,
+        "is_detention": l.detention if hasattr(l, 'detention') else False,
+        "is_exempted": l.exempted if hasattr(l, 'exempted') else False,
+        "background_color": l.background_color if hasattr(l, 'background_color') else None,
+        "status": l.status if hasattr(l, 'status') else None,
+        "group_name": l.group_name if hasattr(l, 'group_name') else None,
+        "group_names": group_names,
+        "teacher_names": teacher_names,
+        "classrooms": classrooms,
+        "memo": l.memo if hasattr(l, 'memo') else None,
+    }
+
+def homework_to_dict(h: pronotepy.Homework) -> dict:
+    return {
+        "id": str(h.id) if hasattr(h, 'id') else str(id(h)),
+        "subject": {"id": h.subject.id if h.subject else "", "name": h.subject.name if h.subject else "Matière", "groups": False} if h.subject else {"id": "", "name": "Matière", "groups": False},
+        "description": h.description if hasattr(h, 'description') else "",
+        "done": h.done if hasattr(h, 'done') else False,
+        "date": h.date.isoformat() if hasattr(h, 'date') and h.date else datetime.date.today().isoformat(),
+        "files": _attachments_of(h),
+    }
+
+def grade_to_dict(g: pronotepy.Grade, period_dict: dict) -> dict:
+    return {
+        "id": str(g.id) if hasattr(g, 'id') else str(id(g)),
+        "grade": str(g.grade) if hasattr(g, 'grade') else "—",
+        "out_of": str(g.out_of) if hasattr(g, 'out_of') else "20",
+        "default_out_of": str(g.default_out_of) if hasattr(g, 'default_out_of') else "20",
+        "date": g.date.isoformat() if hasattr(g, 'date') and g.date else datetime.date.today().isoformat(),
+        "subject": {"id": g.subject.id if g.subject else "", "name": g.subject.name if g.subject else "Matière", "groups": False} if g.subject else {"id": "", "name": "Matière", "groups": False},
+        "period": period_dict,
+        "average": str(g.average) if hasattr(g, 'average') else "",
+        "max": str(g.max) if hasattr(g, 'max') else "",
+        "min": str(g.min) if hasattr(g, 'min') else "",
+        "coefficient": str(g.coefficient) if hasattr(g, 'coefficient') else "1",
+        "comment": str(g.comment) if hasattr(g, 'comment') else "",
+        "is_bonus": bool(g.is_bonus) if hasattr(g, 'is_bonus') else False,
+        "is_optionnal": bool(g.is_optionnal) if hasattr(g, 'is_optionnal') else False,
+        "is_out_of_20": bool(g.is_out_of_20) if hasattr(g, 'is_out_of_20') else True,
+    }
+
+def average_to_dict(a: pronotepy.Average) -> dict:
+    return {
+        "student": str(a.student) if hasattr(a, 'student') else "—",
+        "class_average": str(a.class_average) if hasattr(a, 'class_average') else "—",
+        "max": str(a.max) if hasattr(a, 'max') else "—",
+        "min": str(a.min) if hasattr(a, 'min') else "—",
+        "out_of": str(a.out_of) if hasattr(a, 'out_of') else "20",
+        "default_out_of": str(a.default_out_of) if hasattr(a, 'default_out_of') else "20",
+        "subject": {"id": a.subject.id if a.subject else "", "name": a.subject.name if a.subject else "Matière", "groups": False} if a.subject else {"id": "", "name": "Matière", "groups": False},
+        "background_color": str(a.background_color) if hasattr(a, 'background_color') else "#4a90d9",
+    }
+
+def absence_to_dict(a: Any) -> dict:
+    return {
+        "id": str(a.id) if hasattr(a, 'id') else str(id(a)),
+        "from_date": a.from_date.isoformat() if hasattr(a, 'from_date') and a.from_date else "",
+        "to_date": a.to_date.isoformat() if hasattr(a, 'to_date') and a.to_date else "",
+        "justified": bool(a.justified) if hasattr(a, 'justified') else False,
+        "hours": str(a.hours) if hasattr(a, 'hours') else "0",
+        "days": int(a.days) if hasattr(a, 'days') else 0,
+        "reasons": list(a.reasons) if hasattr(a, 'reasons') else [],
+    }
+
+def delay_to_dict(d: Any) -> dict:
+    return {
+        "id": str(d.id) if hasattr(d, 'id') else str(id(d)),
+        "date": d.date.isoformat() if hasattr(d, 'date') and d.date else "",
+        "minutes": int(d.minutes) if hasattr(d, 'minutes') else 0,
+        "justified": bool(d.justified) if hasattr(d, 'justified') else False,
+        "justification": str(d.justification) if hasattr(d, 'justification') else "",
+        "reasons": list(d.reasons) if hasattr(d, 'reasons') else [],
+    }
+
+def period_to_dict(p: pronotepy.Period) -> dict:
+    return {
+        "id": str(p.id),
+        "name": str(p.name),
+        "start": p.start.isoformat() if hasattr(p, 'start') and p.start else "",
+        "end": p.end.isoformat() if hasattr(p, 'end') and p.end else "",
+    }
+
+def period_key(p: Any) -> tuple[str, str, str, str]:
+    """Identité stable d'une période (id + nom + bornes), quel que soit l'objet qui la porte."""
+    p_dict = period_to_dict(p)
+    return (p_dict["id"], p_dict["name"], p_dict["start"], p_dict["end"])
+
+def discussion_to_dict(d) -> dict:
+    messages = []
+    try:
+        for m in d.messages:
+            messages.append({
+                "id": str(m.id) if hasattr(m, 'id') else str(id(m)),
+                "author": str(getattr(m, 'author', None)) if getattr(m, 'author', None) else "Inconnu",
+                "content": str(getattr(m, 'content', None)) if getattr(m, 'content', None) else "",
+                "date": m.date.isoformat() if hasattr(m, 'date') and m.date else "",
+                "seen": bool(m.seen) if hasattr(m, 'seen') else False,
+            })
+    except Exception:
+        pass
+
+    subject = getattr(d, 'subject', None)
+    creator = getattr(d, 'creator', None)
+    date_value = getattr(d, 'date', None)
+
+    return {
+        "id": str(d.id) if hasattr(d, 'id') else str(id(d)),
+        "subject": str(subject) if subject else "Sans objet",
+        "creator": str(creator) if creator else "Inconnu",
+        "unread": bool(d.unread) if hasattr(d, 'unread') else False,
+        "date": date_value.isoformat() if date_value else "",
+        "messages": messages,
+        "participants": [],
+    }
+
+def info_to_dict(i) -> dict:
+    return {
+        "id": str(i.id) if hasattr(i, 'id') else str(id(i)),
+        "title": str(i.title) if hasattr(i, 'title') else "Information",
+        "author": str(i.author) if hasattr(i, 'author') and i.author else "Administration",
+        "content": str(i.content) if hasattr(i, 'content') and i.content else "",
+        "date": i.creation_date.isoformat() if hasattr(i, 'creation_date') and i.creation_date else "",
+        "read": bool(i.read) if hasattr(i, 'read') else False,
+        "category": str(i.category) if hasattr(i, 'category') and i.category else "Général",
+    }
+
+
+# Garde-fous du normaliseur : au-delà, la valeur est remplacée par un marqueur.
+_NORMALIZE_MAX_DEPTH = 64
+_NORMALIZE_MAX_NODES = 250_000
+_NORMALIZE_CYCLE = "[cycle]"
+_NORMALIZE_TRUNCATED = "[…]"
+
+_SCALAR, _DATE, _SEQUENCE, _MAPPING, _TO_DICT, _OTHER = range(6)
+# Type → traitement, résolu une fois par type au lieu d'une chaîne d'isinstance par nœud.
+_normalize_kinds: dict[type, int] = {}
+
+
+def _normalize_kind(value_type: type) -> int:
+    kind = _normalize_kinds.get(value_type)
+    if kind is None:
+        if value_type is type(None) or issubclass(value_type, (bool, int, float, str)):
+            kind = _SCALAR
+        elif issubclass(value_type, datetime.date):
+            kind = _DATE
+        elif issubclass(value_type, (list, tuple)):
+            kind = _SEQUENCE
+        elif issubclass(value_type, dict):
+            kind = _MAPPING
+        elif callable(getattr(value_type, "to_dict", None)):
+            kind = _TO_DICT
+        else:
+            kind = _OTHER
+        _normalize_kinds[value_type] = kind
+    return kind
+
+
+def _normalize_value(value: Any) -> Any:
+    """Convertit une valeur pronotepy quelconque en données JSON.
+
+    Parcours itératif (pile explicite) : pas de récursion Python quelle que
+    soit la profondeur. Un objet déjà converti (même identité) est réutilisé
+    tel quel, et un objet qui se contient lui-même devient `[cycle]`. Au-delà
+    de `_NORMALIZE_MAX_DEPTH` niveaux ou de `_NORMALIZE_MAX_NODES` conteneurs,
+    la valeur devient `[…]`, ce qui arrête aussi les cycles de listes ou de
+    dictionnaires. Les résultats peuvent donc partager des sous-objets : ne
+    modifier que le premier niveau.
+    """
+    kinds = _normalize_kinds
+    kind = kinds.get(type(value))
+    if kind is None:
+        kind = _normalize_kind(type(value))
+    if kind == _SCALAR:
+        return value
+    if kind == _DATE:
+        return value.isoformat()
+
+    root: list[Any] = [None]
+    # id(objet) → conversion ; objets en cours de parcours (détection de cycle).
+    memo: dict[int, Any] = {}
+    active: set[int] = set()
+    # Les objets restent vivants pendant le parcours : leurs id() ne sont pas réattribués.
+    keep: list[Any] = []
+    nodes = 0
+    # (valeur, profondeur, conteneur cible, clé dans la cible, id de l'objet dont elle est le to_dict())
+    stack: list[tuple[Any, int, Any, Any, Optional[int]]] = [(value, 0, root, 0, None)]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        item, depth, target, slot, alias = pop()
+        if target is None:
+            active.discard(item)
+            continue
+        kind = kinds.get(type(item))
+        if kind is None:
+            kind = _normalize_kind(type(item))
+
+        if kind >= _TO_DICT:
+            key = id(item)
+            if key in active:
+                target[slot] = _NORMALIZE_CYCLE
+                continue
+            if key in memo:
+                target[slot] = memo[key]
+                continue
+            keep.append(item)
+            to_dict = getattr(item, "to_dict", None)
+            try:
+                converted = to_dict() if callable(to_dict) else None
+                failed = not callable(to_dict)
+            except Exception:
+                converted, failed = None, True
+            if failed:
+                out = memo[key] = str(item)
+                target[slot] = out
+                continue
+            # L'objet reste « actif » tant que le résultat de to_dict() est parcouru.
+            active.add(key)
+            push((key, 0, None, 0, None))
+            item, alias = converted, key
+            kind = kinds.get(type(item))
+            if kind is None:
+                kind = _normalize_kind(type(item))
+            if kind >= _TO_DICT:
+                push((item, depth, target, slot, alias))
+                continue
+
+        if kind == _SCALAR or kind == _DATE:
+            out = item if kind == _SCALAR else item.isoformat()
+            target[slot] = out
+            if alias is not None:
+                memo[alias] = out
+            continue
+
+        nodes += 1
+        if depth >= _NORMALIZE_MAX_DEPTH or nodes > _NORMALIZE_MAX_NODES:
+            target[slot] = _NORMALIZE_TRUNCATED
+            continue
+        if kind == _SEQUENCE:
+            out = [None] * len(item)
+            target[slot] = out
+            # Empilés à rebours : les éléments sont traités dans l'ordre naturel.
+            for index in range(len(item) - 1, -1, -1):
+                child = item[index]
+                child_kind = kinds.get(type(child))
+                if child_kind == _SCALAR:
+                    out[index] = child
+                elif child_kind == _DATE:
+                    out[index] = child.isoformat()
+                else:
+                    push((child, depth + 1, out, index, None))
+        else:
+            out = {}
+            target[slot] = out
+            for child_key, child in item.items():
+                child_key = child_key if type(child_key) is str else str(child_key)
+                child_kind = kinds.get(type(child))
+                if child_kind == _SCALAR:
+                    out[child_key] = child
+                elif child_kind == _DATE:
+                    out[child_key] = child.isoformat()
+                else:
+                    out[child_key] = None  # réserve l'ordre des clés
+                    push((child, depth + 1, out, child_key, None))
+        if alias is not None:
+            memo[alias] = out
+    return root[0]
+
+
+def recipient_to_dict(recipient: Any) -> dict:
+    identity = getattr(recipient, "identity", None)
+    return {
+        "id": str(getattr(recipient, "id", "")),
+        "name": str(identity.name) if identity and hasattr(identity, "name") else str(getattr(recipient, "name", "Destinataire")),
+        "kind": str(getattr(recipient, "kind", getattr(recipient, "type", "unknown"))),
+    }
+
+
+def menu_to_dict(menu: Any) -> dict:
+    payload = _normalize_value(menu)
+    if isinstance(payload, dict):
+        return payload
+    return {"value": payload}
+
+
+def menus_to_dicts(menus: list[Any]) -> list[dict]:
+    """Normalise toute une plage de menus en un parcours (sous-objets communs convertis une fois)."""
+    return menu_rows(_normalize_value(menus if isinstance(menus, list) else list(menus)))
+
+
+def menu_rows(payload: list[Any]) -> list[dict]:
+    """Lignes de `/api/menus` à partir de la forme normalisée d'une plage de menus."""
+    return [m if isinstance(m, dict) else {"value": m} for m in payload or []]
+
+
+def get_selected_period(
+    period_id: Optional[str],
+    period_name: Optional[str] = None,
+    period_start: Optional[str] = None,
+    period_end: Optional[str] = None,
+) -> Any:
+    periods = _adapter.get_periods()
+    if not periods:
+        return None
+
+    target_id = str(period_id).strip() if period_id is not None else ""
+    target_name = str(period_name).strip().lower() if period_name else ""
+    target_start = str(period_start).strip() if period_start else ""
+    target_end = str(period_end).strip() if period_end else ""
+
+    def period_id_value(period: Any) -> str:
+        return str(getattr(period, "id", "")).strip()
+
+    def period_name_value(period: Any) -> str:
+        return str(getattr(period, "name", "")).strip().lower()
+
+    def period_start_value(period: Any) -> str:
+        start = getattr(period, "start", None)
+        if start is None:
+            return ""
+        if hasattr(start, "isoformat"):
+            try:
+                return str(start.isoformat())
+            except Exception:
+                return str(start)
+        return str(start)
+
+    def period_end_value(period: Any) -> str:
+        end = getattr(period, "end", None)
+        if end is None:
+            return ""
+        if hasattr(end, "isoformat"):
+            try:
+                return str(end.isoformat())
+            except Exception:
+                return str(end)
+        return str(end)
+
+    candidates = periods
+    if target_id:
+        by_id = [p for p in periods if period_id_value(p) == target_id]
+        if len(by_id) == 1:
+            return by_id[0]
+        if by_id:
+            candidates = by_id
+
+    if target_name:
+        by_name = [p for p in candidates if period_name_value(p) == target_name]
+        if len(by_name) == 1:
+            return by_name[0]
+        if by_name:
+            candidates = by_name
+
+    if target_start or target_end:
+        by_dates = [
+            p for p in candidates
+            if (not target_start or period_start_value(p) == target_start)
+            and (not target_end or period_end_value(p) == target_end)
+        ]
+        if len(by_dates) == 1:
+            return by_dates[0]
+        if by_dates:
+            candidates = by_dates
+
+    return candidates[0] if candidates else periods[0]
+
+
+# ─── Format colonnaire (?format=columnar, MessagePack via Accept) ────────────
+COLUMNAR_VERSION = 1
+_MSGPACK_MIMETYPES = ("application/x-msgpack", "application/msgpack")
+# Valeurs répétées d'une ligne à l'autre, remplacées par un index dans `tables`.
+TIMETABLE_INTERNED = ("subject", "teacher_name", "classroom", "group_name", "background_color")
+GRADES_INTERNED = ("subject", "period")
+
+
+def _intern_key(value: Any) -> Any:
+    if isinstance(value, dict):
+        marker = tuple(value.items())
+        try:
+            hash(marker)
+            return marker
+        except TypeError:
+            pass
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str)
+    return value
+
+
+def rows_to_columnar(rows: list[dict], interned: tuple = ()) -> dict[str, Any]:
+    """Lignes homogènes → une liste par colonne, valeurs répétées internées.
+
+    Les clés de `interned` contiennent des index dans `tables[clé]`.
+    """
+    keys = list(rows[0]) if rows else []
+    columns: dict[str, list] = {}
+    tables: dict[str, list] = {}
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        if key in interned:
+            table: list = []
+            positions: dict[Any, int] = {}
+            indexes = []
+            for value in values:
+                marker = (type(value).__name__, _intern_key(value))
+                position = positions.get(marker)
+                if position is None:
+                    position = positions[marker] = len(table)
+                    table.append(value)
+                indexes.append(position)
+            tables[key] = table
+            values = indexes
+        columns[key] = values
+    return {"format": "columnar", "version": COLUMNAR_VERSION, "count": len(rows), "columns": columns, "tables": tables}
+
+
+def columnar_to_rows(payload: dict[str, Any]) -> list[dict]:
+    """Inverse de rows_to_columnar (tests, outils)."""
+    columns = payload.get("columns", {})
+    tables = payload.get("tables", {})
+    resolved = {key: ([tables[key][i] for i in values] if key in tables else values) for key, values in columns.items()}
+    return [{key: resolved[key][i] for key in resolved} for i in range(int(payload.get("count", 0)))]
+
+
+def _msgpack_packb(payload: Any) -> Optional[bytes]:
+    try:
+        import msgpack  # dépendance optionnelle
+    except ImportError:
+        return None
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def _rows_response(rows: list[dict], interned: tuple = ()) -> Response:
+    """JSON par défaut ; colonnaire si `?format=columnar` ou si le client accepte MessagePack."""
+    best = request.accept_mimetypes.best_match(("application/json",) + _MSGPACK_MIMETYPES)
+    wants_msgpack = best in _MSGPACK_MIMETYPES
+    if not wants_msgpack and request.args.get("format", "").lower() != "columnar":
+        response = jsonify(rows)
+    else:
+        payload = rows_to_columnar(rows, interned)
+        packed = _msgpack_packb(payload) if wants_msgpack else None
+        response = Response(packed, mimetype=best) if packed is not None else jsonify(payload)
+    response.vary.add("Accept")
+    return response
+
+
+# ─── État lié à la session (vidé à la connexion / déconnexion) ──────────────
+_session_reset_hooks: list[Callable[[], None]] = []
+
+
+def on_session_reset(callback: Callable[[], None]) -> Callable[[], None]:
+    """Enregistre un cache à vider quand le compte connecté change."""
+    _session_reset_hooks.append(callback)
+    return callback
+
+
+def _reset_session_state() -> None:
+    for callback in list(_session_reset_hooks):
+        try:
+            callback()
+        except Exception:
+            traceback.print_exc()
+
+
+# ─── Statistiques de notes (/api/grades/stats) ───────────────────────────────
+GRADE_HISTOGRAM_BINS = tuple(range(0, 21, 2))
+GRADE_STATS_TTL = 300.0
+
+
+def _parse_grade_number(value: Any) -> Optional[float]:
+    """"15,5" → 15.5 ; "Abs", "Disp", "" … → None."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace(",", ".").replace(" ", "")
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return number if number == number else None  # NaN
+
+
+def _grade_columns(grades: list) -> dict[str, list]:
+    """Une passe sur les objets pronotepy → colonnes numériques (notes ramenées sur 20)."""
+    subject_ids: list[str] = []
+    subjects: dict[str, dict] = {}
+    values: list[Optional[float]] = []
+    coefficients: list[float] = []
+    bonus: list[bool] = []
+    optional: list[bool] = []
+    statuses: list[Optional[str]] = []
+    for g in grades:
+        subject = getattr(g, "subject", None)
+        subject_id = str(getattr(subject, "id", "") or "") if subject else ""
+        if subject_id not in subjects:
+            subjects[subject_id] = {
+                "id": subject_id,
+                "name": str(getattr(subject, "name", "") or "Matière") if subject else "Matière",
+            }
+        raw = getattr(g, "grade", None)
+        value = _parse_grade_number(raw)
+        out_of = _parse_grade_number(getattr(g, "out_of", None)) or 20.0
+        coefficient = _parse_grade_number(getattr(g, "coefficient", None))
+        subject_ids.append(subject_id)
+        values.append(value / out_of * 20.0 if value is not None and out_of > 0 else None)
+        coefficients.append(coefficient if coefficient is not None and coefficient >= 0 else 1.0)
+        bonus.append(bool(getattr(g, "is_bonus", False)))
+        optional.append(bool(getattr(g, "is_optionnal", False)))
+        statuses.append(None if value is not None else (str(raw).strip() or "—"))
+    return {
+        "subject_ids": subject_ids,
+        "subjects": subjects,
+        "values": values,
+        "coefficients": coefficients,
+        "bonus": bonus,
+        "optional": optional,
+        "statuses": statuses,
+    }
+
+
+def _weighted_average(values: list[float], coefficients: list[float], bonus: list[bool], optional: list[bool]) -> Optional[float]:
+    """Moyenne pondérée sur 20, règles Pronote.
+
+    Bonus : seuls les points au-dessus de 10 s'ajoutent, sans compter au
+    dénominateur. Facultative : retenue uniquement si elle fait monter la
+    moyenne (essayées de la meilleure à la moins bonne).
+    """
+    numerator = sum(v * c for v, c, b, o in zip(values, coefficients, bonus, optional) if not b and not o)
+    denominator = sum(c for c, b, o in zip(coefficients, bonus, optional) if not b and not o)
+    bonus_points = sum(max(0.0, v - 10.0) * c for v, c, b in zip(values, coefficients, bonus) if b)
+    for value, coefficient in sorted(
+        ((v, c) for v, c, b, o in zip(values, coefficients, bonus, optional) if o and not b), reverse=True
+    ):
+        if denominator <= 0 or value > numerator / denominator:
+            numerator += value * coefficient
+            denominator += coefficient
+    if denominator <= 0:
+        return None
+    return min(20.0, (numerator + bonus_points) / denominator)
+
+
+def compute_grade_stats(grades: list) -> dict[str, Any]:
+    columns = _grade_columns(grades)
+    values = columns["values"]
+    graded = [i for i, v in enumerate(values) if v is not None]
+    by_subject: dict[str, list[int]] = {}
+    for i in graded:
+        by_subject.setdefault(columns["subject_ids"][i], []).append(i)
+
+    subjects = []
+    for subject_id, indexes in by_subject.items():
+        subject_values = [values[i] for i in indexes]
+        average = _weighted_average(
+            subject_values,
+            [columns["coefficients"][i] for i in indexes],
+            [columns["bonus"][i] for i in indexes],
+            [columns["optional"][i] for i in indexes],
+        )
+        subjects.append({
+            "subject": columns["subjects"][subject_id],
+            "average": round(average, 2) if average is not None else None,
+            "count": len(indexes),
+            "min": round(min(subject_values), 2),
+            "max": round(max(subject_values), 2),
+            "coefficient_total": round(sum(columns["coefficients"][i] for i in indexes), 2),
+        })
+    subjects.sort(key=lambda s: s["subject"]["name"].lower())
+
+    # Moyenne générale : moyenne des moyennes de matière (coefficients de matière inconnus).
+    subject_averages = [s["average"] for s in subjects if s["average"] is not None]
+    counts = [0] * (len(GRADE_HISTOGRAM_BINS) - 1)
+    for i in graded:
+        counts[min(len(counts) - 1, max(0, int(values[i] // 2)))] += 1
+    excluded: dict[str, int] = {}
+    for status in columns["statuses"]:
+        if status is not None:
+            excluded[status] = excluded.get(status, 0) + 1
+    return {
+        "count": len(values),
+        "graded": len(graded),
+        "excluded": excluded,
+        "overall_average": round(sum(subject_averages) / len(subject_averages), 2) if subject_averages else None,
+        "subjects": subjects,
+        "histogram": {"bins": list(GRADE_HISTOGRAM_BINS), "counts": counts},
+    }
+
+
+class GradeStatsCache:
+    """Statistiques par période (id + nom + bornes), valables GRADE_STATS_TTL secondes."""
+
+    def __init__(self, ttl: float = GRADE_STATS_TTL) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, dict[str, Any]]] = {}
+
+    def get_or_compute(self, adapter: PronoteBackendAdapter, period: Any) -> dict[str, Any]:
+        key = period_key(period)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        stats = {"period": period_to_dict(period), **compute_grade_stats(list(adapter.get_period_grades(period)))}
+        with self._lock:
+            self._entries[key] = (now, stats)
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_grade_stats_cache = GradeStatsCache()
+on_session_reset(_grade_stats_cache.clear)
+
+
+# ─── Recherche plein texte (/api/search) ─────────────────────────────────────
+_SEARCH_STOPWORDS = frozenset(
+    "au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me meme mes moi mon ne nos "
+    "notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous est sont "
+    "ete etre avoir a l d j m n s t c y".split()
+)
+
+
+def search_tokens(text: str) -> list[str]:
+    return [t for t in _WORD_RE.findall(_fold(text or "")) if len(t) > 1 and t not in _SEARCH_STOPWORDS]
+
+
+class SearchIndex:
+    """Index inversé incrémental (messages, informations, devoirs), persisté par compte.
+
+    Un document n'est réindexé que si son texte change ; le dernier terme
+    d'une requête est traité comme un préfixe (saisie en cours). Un
+    rechargement retire les documents qui n'y figurent plus (messages
+    supprimés, devoirs retirés de la plage). Sur disque, seuls les termes et
+    leurs fréquences sont gardés, jamais le texte : un document rechargé
+    depuis le disque est trouvé, mais sans titre ni extrait tant que sa
+    source n'a pas été relue.
+    """
+
+    SAVE_INTERVAL = 5.0
+    SNIPPET_CHARS = 160
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._path: Optional[str] = None
+        self._docs: dict[str, dict[str, Any]] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._lengths: dict[str, int] = {}
+        self._sorted_terms: Optional[list[str]] = None
+        self._dirty = False
+        self._saved_at = 0.0
+
+    # ─── Cycle de vie ─────────────────────────────────────────────────────────
+    def open(self, account_key: str) -> None:
+        """Charge l'index persisté du compte (remplace l'index courant)."""
+        path = os.path.join(self.directory, f"{account_key[:32]}.json")
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+            documents = stored.get("documents", {}) if isinstance(stored, dict) else {}
+            version = stored.get("version", 1) if isinstance(stored, dict) else 1
+        except (OSError, ValueError):
+            documents, version = {}, 2
+        with self._lock:
+            self._reset()
+            self._path = path
+            for doc_id, doc in documents.items():
+                if isinstance(doc, dict):
+                    self._add(doc_id, self._restored(doc))
+            # Ancien format (texte en clair) : réécrit tout de suite sans le texte.
+            self._dirty = version < 2
+            self.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._reset()
+            self._path = None
+
+    def _reset(self) -> None:
+        self._docs.clear()
+        self._postings.clear()
+        self._lengths.clear()
+        self._sorted_terms = None
+
+    def flush(self, force: bool = True) -> None:
+        with self._lock:
+            if not self._dirty or self._path is None:
+                return
+            if not force and time.monotonic() - self._saved_at < self.SAVE_INTERVAL:
+                return
+            payload = {
+                "version": 2,
+                "documents": {
+                    doc_id: {"kind": doc["kind"], "ref_id": doc["ref_id"], "date": doc["date"], "terms": doc["terms"]}
+                    for doc_id, doc in self._docs.items()
+                },
+            }
+            try:
+                _atomic_write_json(self._path, payload)
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            except OSError:
+                traceback.print_exc()
+
+    # ─── Indexation ───────────────────────────────────────────────────────────
+    @staticmethod
+    def _restored(doc: dict[str, Any]) -> dict[str, Any]:
+        """Document relu du disque : métadonnées et termes (le format 1 gardait aussi le texte)."""
+        restored = {
+            "kind": str(doc.get("kind", "")),
+            "ref_id": str(doc.get("ref_id", "")),
+            "title": "",
+            "text": "",
+            "date": str(doc.get("date", "")),
+        }
+        terms = doc.get("terms")
+        if isinstance(terms, dict):
+            restored["terms"] = {str(t): int(n) for t, n in terms.items()}
+        else:
+            restored["terms"] = dict(Counter(search_tokens(str(doc.get("title", "")) + " " + str(doc.get("text", "")))))
+        return restored
+
+    def _remove(self, doc_id: str) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._sorted_terms = None
+        self._lengths.pop(doc_id, None)
+
+    def _add(self, doc_id: str, doc: dict[str, Any]) -> None:
+        # Termes calculés une fois : retrait et sauvegarde relisent les mêmes.
+        terms = doc.get("terms")
+        if terms is None:
+            terms = doc["terms"] = dict(Counter(search_tokens(doc.get("title", "") + " " + doc.get("text", ""))))
+        self._docs[doc_id] = doc
+        self._lengths[doc_id] = sum(terms.values())
+        for term, count in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted_terms = None
+            postings[doc_id] = count
+
+    def _prune(self, kind: str, keep: set[str], date_from: str = "", date_to: str = "") -> None:
+        """Retire les documents `kind` absents d'un rechargement (limité à une plage de dates si donnée)."""
+        with self._lock:
+            stale = [
+                doc_id for doc_id, doc in self._docs.items()
+                if doc["kind"] == kind and doc_id not in keep
+                and (not date_from or date_from <= doc["date"][:10] <= date_to)
+            ]
+            for doc_id in stale:
+                self._remove(doc_id)
+            if stale:
+                self._dirty = True
+
+    def upsert(self, kind: str, ref_id: str, doc_key: str, title: str, text: str, date: str = "") -> bool:
+        doc_id = f"{kind}:{doc_key}"
+        doc = {"kind": kind, "ref_id": ref_id, "title": title or "", "text": text or "", "date": date or ""}
+        with self._lock:
+            current = self._docs.get(doc_id)
+            if current is not None and all(current.get(k) == v for k, v in doc.items()):
+                return False
+            self._remove(doc_id)
+            self._add(doc_id, doc)
+            self._dirty = True
+            return True
+
+    def index_discussions(self, discussions: list[dict]) -> None:
+        """Liste complète des discussions : les messages absents sont retirés."""
+        seen = set()
+        for d in discussions:
+            for m in d.get("messages", []):
+                doc_key = f"{d['id']}:{m['id']}"
+                seen.add(f"message:{doc_key}")
+                self.upsert(
+                    "message", d["id"], doc_key, d.get("subject", ""),
+                    f"{m.get('author', '')} — {m.get('content', '')}", m.get("date", ""),
+                )
+        self._prune("message", seen)
+        self.flush(force=False)
+
+    def index_informations(self, informations: list[dict]) -> None:
+        """Liste complète des informations : celles qui ont disparu sont retirées."""
+        for i in informations:
+            self.upsert("information", i["id"], i["id"], i.get("title", ""), f"{i.get('author', '')} — {i.get('content', '')}", i.get("date", ""))
+        self._prune("information", {f"information:{i['id']}" for i in informations})
+        self.flush(force=False)
+
+    def index_homework(self, homework: list[dict], date_from: datetime.date, date_to: datetime.date) -> None:
+        """Devoirs de [date_from, date_to] : ceux de la plage qui n'y sont plus sont retirés."""
+        for h in homework:
+            subject = (h.get("subject") or {}).get("name", "")
+            self.upsert("homework", h["id"], h["id"], subject, h.get("description", ""), h.get("date", ""))
+        self._prune("homework", {f"homework:{h['id']}" for h in homework}, date_from.isoformat(), date_to.isoformat())
+        self.flush(force=False)
+
+    # ─── Requêtes ─────────────────────────────────────────────────────────────
+    def _expand(self, term: str) -> list[str]:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        start = bisect.bisect_left(terms, term)
+        matches = []
+        for candidate in terms[start:start + 200]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def _snippet(self, text: str, terms: list[str]) -> tuple[str, list[list[int]]]:
+        spans = [
+            (m.start(), m.end()) for m in _WORD_RE.finditer(text)
+            if any(_fold(m.group()).startswith(t) for t in terms)
+        ]
+        if not spans:
+            return text[: self.SNIPPET_CHARS], []
+        start = max(0, spans[0][0] - self.SNIPPET_CHARS // 3)
+        if start:
+            space = text.rfind(" ", 0, start)
+            start = space + 1 if space >= 0 and start - space < 20 else start
+        end = min(len(text), start + self.SNIPPET_CHARS)
+        prefix = "…" if start else ""
+        snippet = prefix + text[start:end] + ("…" if end < len(text) else "")
+        offset = len(prefix) - start
+        highlights = [[s + offset, e + offset] for s, e in spans if s >= start and e <= end]
+        return snippet, highlights
+
+    def search(self, query: str, limit: int = 20, kinds: Optional[set] = None) -> dict[str, Any]:
+        """Tous les termes doivent correspondre (le dernier en préfixe) ; score BM25."""
+        terms = search_tokens(query)
+        if not terms:
+            return {"total": 0, "results": []}
+        with self._lock:
+            groups = [[t] if t in self._postings else [] for t in terms[:-1]]
+            groups.append(self._expand(terms[-1]))
+            if any(not g for g in groups):
+                return {"total": 0, "results": []}
+            count = len(self._docs) or 1
+            average_length = (sum(self._lengths.values()) / count) or 1.0
+            scores: Optional[dict[str, float]] = None
+            for group in groups:
+                group_scores: dict[str, float] = {}
+                for term in group:
+                    postings = self._postings[term]
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        norm = tf + 1.2 * (0.25 + 0.75 * self._lengths[doc_id] / average_length)
+                        group_scores[doc_id] = group_scores.get(doc_id, 0.0) + idf * tf * 2.2 / norm
+                scores = group_scores if scores is None else {d: s + group_scores[d] for d, s in scores.items() if d in group_scores}
+            ranked = [
+                (doc_id, score) for doc_id, score in (scores or {}).items()
+                if kinds is None or self._docs[doc_id]["kind"] in kinds
+            ]
+            # À score égal, le plus récent d'abord (tri stable).
+            ranked.sort(key=lambda item: self._docs[item[0]]["date"], reverse=True)
+            ranked.sort(key=lambda item: item[1], reverse=True)
+            matched_terms = [t for g in groups for t in g]
+            results = []
+            for doc_id, score in ranked[: max(1, limit)]:
+                doc = self._docs[doc_id]
+                snippet, highlights = self._snippet(doc["text"], matched_terms)
+                results.append({
+                    "id": doc_id,
+                    "kind": doc["kind"],
+                    "ref_id": doc["ref_id"],
+                    "title": doc["title"],
+                    "date": doc["date"],
+                    "snippet": snippet,
+                    "highlights": highlights,
+                    "score": round(score, 4),
+                })
+            return {"total": len(ranked), "results": results}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"documents": len(self._docs), "terms": len(self._postings), "persisted": self._path is not None}
+
+
+_search_index = SearchIndex(os.path.join(DATA_DIR, "search"))
+on_session_reset(_search_index.close)
+
+
+# ─── Créneaux libres (/api/timetable/free-slots) ─────────────────────────────
+FREE_SLOTS_MAX_DAYS = 62
+_ALL_LESSONS = ("all", "*")
+
+
+class TimetableIntervalIndex:
+    """Occupation par enseignant, salle et groupe, alimentée par les semaines chargées.
+
+    Chaque ressource garde des intervalles fusionnés triés (débuts / fins) :
+    « libre entre A et B ? » est une recherche dichotomique. Les jours déjà
+    chargés sont remplacés lors d'un nouveau chargement (annulations, ajouts).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._covered: set[datetime.date] = set()
+        # (type, clé) → {"name": libellé, "days": {jour: [(début, fin)]}}
+        self._resources: dict[tuple[str, str], dict[str, Any]] = {}
+        self._day_resources: dict[datetime.date, set[tuple[str, str]]] = {}
+        self._merged: dict[tuple[str, str], tuple[list[datetime.datetime], list[datetime.datetime]]] = {}
+
+    @staticmethod
+    def resource_key(kind: str, name: str) -> tuple[str, str]:
+        return (kind, " ".join(_WORD_RE.findall(_fold(str(name)))))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._covered.clear()
+            self._resources.clear()
+            self._day_resources.clear()
+            self._merged.clear()
+
+    @staticmethod
+    def _lesson_resources(lesson: dict) -> list[tuple[str, str]]:
+        resources = [_ALL_LESSONS]
+        for kind, many, single in (
+            ("teacher", "teacher_names", "teacher_name"),
+            ("room", "classrooms", "classroom"),
+            ("group", "group_names", "group_name"),
+        ):
+            names = [n for n in (lesson.get(many) or []) if n] or ([lesson[single]] if lesson.get(single) else [])
+            resources.extend((kind, str(n)) for n in names)
+        return resources
+
+    def ingest(self, date_from: datetime.date, date_to: datetime.date, lessons: list[dict]) -> None:
+        """Remplace l'occupation des jours [date_from, date_to] par `lessons` (cours annulés exclus)."""
+        by_day: dict[datetime.date, list[tuple[datetime.datetime, datetime.datetime, list]]] = {}
+        for lesson in lessons:
+            if lesson.get("is_cancelled"):
+                continue
+            try:
+                start = datetime.datetime.fromisoformat(str(lesson["start"]))
+                end = datetime.datetime.fromisoformat(str(lesson["end"]))
+            except (KeyError, ValueError):
+                continue
+            if end > start:
+                by_day.setdefault(start.date(), []).append((start, end, self._lesson_resources(lesson)))
+        with self._lock:
+            day = date_from
+            while day <= date_to:
+                for key in self._day_resources.pop(day, set()):
+                    self._resources[key]["days"].pop(day, None)
+                    self._merged.pop(key, None)
+                for start, end, resources in by_day.get(day, []):
+                    for kind, name in resources:
+                        key = (kind, "*") if (kind, name) == _ALL_LESSONS else self.resource_key(kind, name)
+                        entry = self._resources.setdefault(key, {"name": name, "days": {}})
+                        entry["days"].setdefault(day, []).append((start, end))
+                        self._day_resources.setdefault(day, set()).add(key)
+                        self._merged.pop(key, None)
+                self._covered.add(day)
+                day += datetime.timedelta(days=1)
+
+    def missing_ranges(self, date_from: datetime.date, date_to: datetime.date) -> list[tuple[datetime.date, datetime.date]]:
+        ranges: list[tuple[datetime.date, datetime.date]] = []
+        with self._lock:
+            day = date_from
+            while day <= date_to:
+                if day not in self._covered:
+                    if ranges and ranges[-1][1] == day - datetime.timedelta(days=1):
+                        ranges[-1] = (ranges[-1][0], day)
+                    else:
+                        ranges.append((day, day))
+                day += datetime.timedelta(days=1)
+        return ranges
+
+    def _intervals(self, key: tuple[str, str]) -> tuple[list[datetime.datetime], list[datetime.datetime]]:
+        merged = self._merged.get(key)
+        if merged is not None:
+            return merged
+        entry = self._resources.get(key)
+        raw = sorted(i for day in (entry["days"].values() if entry else ()) for i in day)
+        starts: list[datetime.datetime] = []
+        ends: list[datetime.datetime] = []
+        for start, end in raw:
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._merged[key] = (starts, ends)
+        return starts, ends
+
+    def is_free(self, key: tuple[str, str], start: datetime.datetime, end: datetime.datetime) -> bool:
+        with self._lock:
+            starts, ends = self._intervals(key)
+            # Seul le dernier intervalle commençant avant `end` peut chevaucher [start, end).
+            position = bisect.bisect_left(starts, end) - 1
+            return position < 0 or ends[position] <= start
+
+    def free_slots(
+        self,
+        key: tuple[str, str],
+        date_from: datetime.date,
+        date_to: datetime.date,
+        min_minutes: int,
+        day_start: datetime.time,
+        day_end: datetime.time,
+        weekdays: frozenset,
+    ) -> list[dict[str, Any]]:
+        slots = []
+        minimum = datetime.timedelta(minutes=max(1, min_minutes))
+        with self._lock:
+            starts, ends = self._intervals(key)
+            day = date_from
+            while day <= date_to:
+                if day.weekday() in weekdays:
+                    cursor = datetime.datetime.combine(day, day_start)
+                    closing = datetime.datetime.combine(day, day_end)
+                    position = bisect.bisect_right(ends, cursor)
+                    while cursor < closing:
+                        busy_start = starts[position] if position < len(starts) else closing
+                        gap_end = min(busy_start, closing)
+                        if gap_end - cursor >= minimum:
+                            slots.append({
+                                "start": cursor.isoformat(),
+                                "end": gap_end.isoformat(),
+                                "minutes": int((gap_end - cursor).total_seconds() // 60),
+                            })
+                        if position >= len(starts) or busy_start >= closing:
+                            break
+                        cursor = max(cursor, ends[position])
+                        position += 1
+                day += datetime.timedelta(days=1)
+        return slots
+
+    def rooms(self) -> list[tuple[tuple[str, str], str]]:
+        with self._lock:
+            return sorted(((k, v["name"]) for k, v in self._resources.items() if k[0] == "room"), key=lambda r: r[1])
+
+    def free_rooms(self, start: datetime.datetime, end: datetime.datetime) -> tuple[list[str], list[str]]:
+        free, busy = [], []
+        for key, name in self.rooms():
+            (free if self.is_free(key, start, end) else busy).append(name)
+        return free, busy
+
+
+_timetable_index = TimetableIntervalIndex()
+on_session_reset(_timetable_index.clear)
+
+
+def _ensure_timetable_coverage(date_from: datetime.date, date_to: datetime.date) -> None:
+    """Charge (par plages contiguës) les jours encore absents de l'index."""
+    for start, end in _timetable_index.missing_ranges(date_from, date_to):
+        lessons = _adapter.get_lessons(start, end)
+        _timetable_index.ingest(start, end, [lesson_to_dict(l) for l in lessons])
+
+
+# ─── Pièces jointes (/api/files/<id>) ─────────────────────────────────────────
+FILE_CACHE_DEFAULTS: dict[str, Any] = {
+    "max_bytes": 512 * 1024 * 1024,
+    "chunk_size": 64 * 1024,
+}
+
+
+def _file_cache_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `file_cache` de config.json avec les défauts."""
+    return _merge_settings(FILE_CACHE_DEFAULTS, config.get("file_cache"))
+
+
+class AttachmentRegistry:
+    """Id de proxy → pièce jointe pronotepy (URL signée valable pour la session)."""
+
+    MAX_ENTRIES = 5000
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    @staticmethod
+    def proxy_id(attachment: Any) -> str:
+        native_id = getattr(attachment, "id", None)
+        seed = f"{native_id}\n{getattr(attachment, 'name', '')}" if native_id else str(getattr(attachment, "url", ""))
+        return hashlib.sha1(seed.encode("utf-8")).hexdigest()[:24]
+
+    def register(self, attachment: Any) -> dict[str, Any]:
+        proxy_id = self.proxy_id(attachment)
+        url = str(getattr(attachment, "url", "") or "")
+        kind = 0 if getattr(attachment, "type", 1) == 0 else 1
+        entry = {"id": proxy_id, "name": str(getattr(attachment, "name", "") or "fichier"), "url": url, "type": kind}
+        with self._lock:
+            self._entries[proxy_id] = entry
+            self._entries.move_to_end(proxy_id)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, proxy_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(proxy_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class FileCache:
+    """Stockage disque adressé par contenu (sha256), borné en taille, éviction LRU.
+
+    Plusieurs ids de proxy peuvent pointer vers le même contenu ; l'index
+    (`index.json`) survit aux redémarrages.
+    """
+
+    def __init__(self, root: str, settings: dict[str, Any]) -> None:
+        self.root = root
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(root, "index.json")
+        self._keys: dict[str, str] = {}
+        self._blobs: dict[str, dict[str, Any]] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def reconfigure(self, settings: dict[str, Any]) -> None:
+        self.settings = settings
+        with self._lock:
+            self._evict()
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._index_path) as f:
+                stored = json.load(f)
+            self._keys = {str(k): str(v) for k, v in stored.get("keys", {}).items()}
+            self._blobs = {
+                str(d): b for d, b in stored.get("blobs", {}).items()
+                if isinstance(b, dict) and os.path.exists(self._blob_path(str(d)))
+            }
+            self._keys = {k: d for k, d in self._keys.items() if d in self._blobs}
+        except (OSError, ValueError, AttributeError):
+            self._keys, self._blobs = {}, {}
+
+    def _save(self) -> None:
+        try:
+            _atomic_write_json(self._index_path, {"version": 1, "keys": self._keys, "blobs": self._blobs})
+        except OSError:
+            traceback.print_exc()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def lookup(self, key: str) -> Optional[tuple[str, dict[str, Any]]]:
+        with self._lock:
+            self._load()
+            digest = self._keys.get(key)
+            blob = self._blobs.get(digest) if digest else None
+            if blob is None or not os.path.exists(self._blob_path(digest)):
+                self.misses += 1
+                return None
+            blob["last_access"] = time.time()
+            self.hits += 1
+            return self._blob_path(digest), dict(blob)
+
+    def store(self, key: str, temp_path: str, digest: str, size: int, name: str, mimetype: str) -> str:
+        """Range le fichier téléchargé `temp_path` sous son empreinte et applique la borne de taille."""
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            self._load()
+            if os.path.exists(path):
+                os.unlink(temp_path)
+            else:
+                os.replace(temp_path, path)
+            self._blobs[digest] = {"size": size, "name": name, "mimetype": mimetype, "last_access": time.time()}
+            self._keys[key] = digest
+            self._evict(keep=digest)
+            self._save()
+        return path
+
+    def temp_file(self) -> tuple[int, str]:
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkstemp(prefix=".download-", dir=self.root)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        limit = int(self.settings["max_bytes"])
+        total = sum(int(b.get("size", 0)) for b in self._blobs.values())
+        for digest, _blob in sorted(self._blobs.items(), key=lambda item: item[1].get("last_access", 0)):
+            if total <= limit:
+                break
+            if digest == keep:
+                continue
+            total -= int(self._blobs.pop(digest).get("size", 0))
+            with contextlib.suppress(OSError):
+                os.unlink(self._blob_path(digest))
+        self._keys = {k: d for k, d in self._keys.items() if d in self._blobs}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._load()
+            return {
+                "entries": len(self._blobs),
+                "bytes": sum(int(b.get("size", 0)) for b in self._blobs.values()),
+                "max_bytes": int(self.settings["max_bytes"]),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_attachments = AttachmentRegistry()
+on_session_reset(_attachments.clear)
+_file_cache = FileCache(os.path.join(CACHE_DIR, "files"), _file_cache_settings(CONFIG))
+
+
+@config_manager.subscribe
+def _apply_file_cache_tuning(previous: dict, current: dict) -> None:
+    _file_cache.reconfigure(_file_cache_settings(current))
+
+
+def attachment_to_dict(attachment: Any) -> dict[str, Any]:
+    """Lien (type 0) tel quel ; fichier (type 1) servi via le proxy /api/files/<id>."""
+    entry = _attachments.register(attachment)
+    url = entry["url"] if entry["type"] == 0 else f"/api/files/{entry['id']}"
+    return {"id": entry["id"], "name": entry["name"], "url": url, "type": entry["type"]}
+
+
+def _attachments_of(obj: Any) -> list[dict[str, Any]]:
+    try:
+        files = getattr(obj, "files", None) or []
+        return [attachment_to_dict(f) for f in files]
+    except Exception:
+        return []
+
+
+def _download_to_cache(entry: dict[str, Any], upstream: Any):
+    """Générateur : relaie les morceaux au client tout en les écrivant dans le cache."""
+    chunk_size = int(_file_cache.settings["chunk_size"])
+    fd, temp_path = _file_cache.temp_file()
+    digest = hashlib.sha256()
+    size = 0
+    completed = False
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in upstream.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+        completed = True
+    finally:
+        upstream.close()
+        if completed:
+            mimetype = str(upstream.headers.get("Content-Type", "") or "").split(";")[0] or _guess_mimetype(entry["name"])
+            _file_cache.store(entry["id"], temp_path, digest.hexdigest(), size, entry["name"], mimetype)
+        else:
+            with contextlib.suppress(OSError):
+                os.unlink(temp_path)
+
+
+def _read_cached_file(path: str, start: int, stop: int):
+    """Générateur : le fichier n'est ouvert qu'à la première lecture et refermé en fin de plage."""
+    chunk_size = int(_file_cache.settings["chunk_size"])
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+# Pièce jointe d'une session authentifiée : jamais resservie par un cache partagé,
+# et le navigateur revalide (ETag) pour que le contrôle d'appartenance s'applique.
+ATTACHMENT_CACHE_CONTROL = "private, no-cache"
+
+
+def _cached_file_response(path: str, mimetype: str, name: str) -> Response:
+    """Copie en cache servie avec ETag, Last-Modified et Range, sans descripteur ouvert d'avance."""
+    size = os.path.getsize(path)
+    response = Response(b"", mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(name)}"
+    response.set_etag(os.path.basename(path))
+    response.last_modified = os.path.getmtime(path)
+    response.headers["Cache-Control"] = ATTACHMENT_CACHE_CONTROL
+    response.content_length = size
+    response.make_conditional(request, accept_ranges=True, complete_length=size)
+    if response.status_code == 206:
+        response.response = _read_cached_file(path, response.content_range.start, response.content_range.stop)
+    elif response.status_code == 200:
+        response.response = _read_cached_file(path, 0, size)
+    return response
+
+
+def _guess_mimetype(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+# ─── Abonnement iCal (/api/export/ical/feed/<jeton>.ics) ─────────────────────
+ICAL_DEFAULTS: dict[str, Any] = {
+    "weeks_before": 4,
+    "weeks_after": 16,
+    "refresh_seconds": 900.0,
+}
+
+ICAL_SUBSCRIPTIONS_PATH = os.path.join(DATA_DIR, "ical-subscriptions.json")
+
+
+def _ical_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `ical` de config.json avec les défauts."""
+    return _merge_settings(ICAL_DEFAULTS, config.get("ical"))
+
+
+def _ical_text(value: Any) -> str:
+    """Échappement des valeurs TEXT (RFC 5545 §3.3.11)."""
+    text = str(value or "")
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _ical_fold(line: str) -> str:
+    """Replie une ligne de contenu à 75 octets (RFC 5545 §3.1)."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > (75 if not parts else 74):
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ical_datetime(value: str) -> str:
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        return moment.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    # Heure locale de l'établissement (« floating time »), comme dans Pronote.
+    return moment.strftime("%Y%m%dT%H%M%S")
+
+
+def lesson_to_vevent(row: dict, stamp: str) -> str:
+    """VEVENT d'un cours déjà sérialisé par `lesson_to_dict`."""
+    subject = (row.get("subject") or {}).get("name") or "Cours"
+    teachers = row.get("teacher_names") or ([row["teacher_name"]] if row.get("teacher_name") else [])
+    rooms = row.get("classrooms") or ([row["classroom"]] if row.get("classroom") else [])
+    description = [f"Enseignant : {', '.join(teachers)}"] if teachers else []
+    if row.get("status"):
+        description.append(str(row["status"]))
+    if row.get("memo"):
+        description.append(str(row["memo"]))
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{_ical_text(row['id'])}-{_ical_datetime(row['start'])}@pronote-desktop",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_ical_datetime(row['start'])}",
+        f"DTEND:{_ical_datetime(row['end'])}",
+        f"SUMMARY:{_ical_text(subject)}",
+    ]
+    if rooms:
+        lines.append(f"LOCATION:{_ical_text(', '.join(rooms))}")
+    if description:
+        lines.append(f"DESCRIPTION:{_ical_text(chr(10).join(description))}")
+    if row.get("is_cancelled"):
+        lines.append("STATUS:CANCELLED")
+    lines.append("END:VEVENT")
+    return "".join(_ical_fold(line) for line in lines)
+
+
+class WeeklyCalendar:
+    """Calendrier d'un compte assemblé à partir de fragments VEVENT par semaine.
+
+    Chaque semaine garde l'empreinte de ses cours sérialisés : après un
+    rechargement, seules les semaines dont l'empreinte a changé sont
+    régénérées. L'ETag (empreintes de toutes les semaines) et la date de
+    dernière modification ne bougent donc que si un cours a changé.
+    """
+
+    HEADER = "".join(_ical_fold(line) for line in (
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Pronote Desktop//Emploi du temps//FR",
+        "CALSCALE:GREGORIAN", "METHOD:PUBLISH", "X-WR-CALNAME:Pronote",
+    ))
+    FOOTER = "END:VCALENDAR\r\n"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # lundi → (empreinte, fragment, date de génération)
+        self._weeks: dict[datetime.date, tuple[str, str, float]] = {}
+        self._fetched_at: Optional[float] = None
+        self._window: Optional[tuple[datetime.date, datetime.date]] = None
+        self._rendered: Optional[tuple[str, str, float]] = None
+        self.rebuilds = 0
+
+    def stale(self, window: tuple[datetime.date, datetime.date], refresh_seconds: float) -> bool:
+        with self._lock:
+            return (
+                self._fetched_at is None
+                or self._window != window
+                or time.monotonic() - self._fetched_at >= refresh_seconds
+            )
+
+    def update(self, window: tuple[datetime.date, datetime.date], lessons: list[Any]) -> None:
+        """Regroupe les cours par semaine et régénère les semaines modifiées."""
+        by_week: dict[datetime.date, list[dict]] = {}
+        monday = window[0]
+        while monday <= window[1]:
+            by_week[monday] = []
+            monday += datetime.timedelta(days=7)
+        for lesson in lessons:
+            row = lesson_to_dict(lesson)
+            day = datetime.datetime.fromisoformat(row["start"]).date()
+            week = day - datetime.timedelta(days=day.weekday())
+            if week in by_week:
+                by_week[week].append(row)
+        now = time.time()
+        stamp = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        with self._lock:
+            weeks: dict[datetime.date, tuple[str, str, float]] = {}
+            for week, rows in by_week.items():
+                rows.sort(key=lambda r: (r["start"], r["id"]))
+                fingerprint = hashlib.sha1(
+                    json.dumps(rows, sort_keys=True, default=str).encode("utf-8")
+                ).hexdigest()
+                previous = self._weeks.get(week)
+                if previous is not None and previous[0] == fingerprint:
+                    weeks[week] = previous
+                    continue
+                weeks[week] = (fingerprint, "".join(lesson_to_vevent(r, stamp) for r in rows), now)
+                self.rebuilds += 1
+            if weeks.keys() != self._weeks.keys() or any(weeks[w] is not self._weeks.get(w) for w in weeks):
+                self._rendered = None
+            self._weeks = weeks
+            self._window = window
+            self._fetched_at = time.monotonic()
+
+    def render(self) -> Optional[tuple[str, str, float]]:
+        """(corps, ETag, date de dernière modification) ou None si jamais chargé."""
+        with self._lock:
+            if self._rendered is None and self._fetched_at is not None:
+                ordered = sorted(self._weeks.items())
+                body = self.HEADER + "".join(fragment for _week, (_fp, fragment, _at) in ordered) + self.FOOTER
+                etag = hashlib.sha1("|".join(fp for _week, (fp, _f, _at) in ordered).encode("ascii")).hexdigest()
+                modified = max((at for _week, (_fp, _f, at) in ordered), default=time.time())
+                self._rendered = (body, etag, modified)
+            return self._rendered
+
+
+class IcalSubscriptions:
+    """Jetons d'abonnement (persistés) et calendriers par compte.
+
+    Le fichier ne contient que l'empreinte de chaque jeton et la clé
+    (empreinte url/identifiant) du compte : l'URL n'est montrée qu'à la
+    création, et un jeton révoqué ou remplacé cesse aussitôt de fonctionner.
+    """
+
+    def __init__(self, path: str, settings: dict[str, Any]) -> None:
+        self._path = path
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._tokens: Optional[dict[str, dict[str, str]]] = None
+        self._calendars: dict[str, WeeklyCalendar] = {}
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        if self._tokens is None:
+            tokens: dict[str, dict[str, str]] = {}
+            try:
+                if os.path.exists(self._path):
+                    with open(self._path) as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        tokens = {str(k): dict(v) for k, v in data.items() if isinstance(v, dict)}
+            except Exception:
+                pass
+            self._tokens = tokens
+        return self._tokens
+
+    def create(self, account_key: str) -> str:
+        """Nouveau jeton pour le compte (l'ancien est révoqué)."""
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            tokens = {d: e for d, e in self._load().items() if e.get("account") != account_key}
+            tokens[self._digest(token)] = {
+                "account": account_key,
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            self._tokens = tokens
+            _atomic_write_json(self._path, tokens)
+        return token
+
+    def revoke(self, account_key: str) -> bool:
+        with self._lock:
+            tokens = self._load()
+            kept = {d: e for d, e in tokens.items() if e.get("account") != account_key}
+            if len(kept) == len(tokens):
+                return False
+            self._tokens = kept
+            _atomic_write_json(self._path, kept)
+            self._calendars.pop(account_key, None)
+            return True
+
+    def status(self, account_key: str) -> Optional[dict[str, str]]:
+        with self._lock:
+            return next((dict(e) for e in self._load().values() if e.get("account") == account_key), None)
+
+    def resolve(self, token: str) -> Optional[str]:
+        with self._lock:
+            entry = self._load().get(self._digest(token))
+            return entry.get("account") if entry else None
+
+    def calendar(self, account_key: str) -> WeeklyCalendar:
+        with self._lock:
+            calendar = self._calendars.get(account_key)
+            if calendar is None:
+                calendar = self._calendars[account_key] = WeeklyCalendar()
+            return calendar
+
+    def window(self) -> tuple[datetime.date, datetime.date]:
+        today = datetime.date.today()
+        monday = today - datetime.timedelta(days=today.weekday())
+        return (
+            monday - datetime.timedelta(weeks=int(self.settings["weeks_before"])),
+            monday + datetime.timedelta(weeks=int(self.settings["weeks_after"]), days=6),
+        )
+
+
+_ical_subscriptions = IcalSubscriptions(ICAL_SUBSCRIPTIONS_PATH, _ical_settings(CONFIG))
+
+
+@config_manager.subscribe
+def _apply_ical_tuning(previous: dict, current: dict) -> None:
+    _ical_subscriptions.settings = _ical_settings(current)
+
+
+def _adapter_for_account(account_key: str) -> Optional[PronoteBackendAdapter]:
+    """Adapter connecté du compte (actif ou synchronisé en arrière-plan)."""
+    for account in _accounts.accounts():
+        if account.search_key == account_key and account.adapter.is_logged_in():
+            return account.adapter
+    return None
+
+
+# ─── Export complet (/api/export/archive) ─────────────────────────────────────
+ARCHIVE_DEFAULTS: dict[str, Any] = {
+    "workers": 4,
+    "max_jobs": 20,
+    "task_timeout": 120.0,
+}
+
+ARCHIVE_SECTIONS = (
+    "grades", "averages", "absences", "delays", "timetable", "homework", "discussions", "informations",
+)
+# Sections par période : (adapter, période, période sérialisée) → lignes.
+_PERIOD_SECTIONS = {
+    "grades": lambda adapter, p, pd: [grade_to_dict(g, pd) for g in adapter.get_period_grades(p)],
+    "averages": lambda adapter, p, pd: [average_to_dict(a) for a in adapter.get_period_averages(p)],
+    "absences": lambda adapter, p, pd: [absence_to_dict(a) for a in adapter.get_period_absences(p)],
+    "delays": lambda adapter, p, pd: [delay_to_dict(d) for d in adapter.get_period_delays(p)],
+}
+
+
+def _archive_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `archive` de config.json avec les défauts."""
+    return _merge_settings(ARCHIVE_DEFAULTS, config.get("archive"))
+
+
+def _as_day(value: Any) -> Optional[datetime.date]:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value if isinstance(value, datetime.date) else None
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", _fold(str(text))).strip("-") or "periode"
+
+
+class ArchiveTask:
+    """Une unité de l'export : une section pour une période, une semaine ou tout le compte."""
+
+    __slots__ = ("section", "name", "meta", "fetch")
+
+    def __init__(self, section: str, name: str, meta: dict[str, Any], fetch: Callable[[], Any]) -> None:
+        self.section = section
+        self.name = name
+        self.meta = meta
+        self.fetch = fetch
+
+
+def archive_tasks(
+    adapter: PronoteBackendAdapter,
+    sections: list[str],
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+) -> tuple[list[dict], list[ArchiveTask]]:
+    """Périodes sérialisées et liste des tâches à exécuter (rien n'est encore chargé)."""
+    periods = list(adapter.get_periods())
+    period_dicts = [period_to_dict(p) for p in periods]
+    tasks: list[ArchiveTask] = []
+    for period, pd in zip(periods, period_dicts):
+        folder = f"periodes/{_slug(pd['name'])}-{_slug(pd['id'])}"
+        for section, build in _PERIOD_SECTIONS.items():
+            if section in sections:
+                tasks.append(ArchiveTask(
+                    section, f"{folder}/{section}.json", {"period": pd},
+                    functools.partial(build, adapter, period, pd),
+                ))
+
+    starts = [d for d in (_as_day(getattr(p, "start", None)) for p in periods) if d]
+    ends = [d for d in (_as_day(getattr(p, "end", None)) for p in periods) if d]
+    today = datetime.date.today()
+    first = date_from or (min(starts) if starts else today)
+    last = date_to or (max(ends) if ends else first + datetime.timedelta(days=6))
+    monday = first - datetime.timedelta(days=first.weekday())
+    while monday <= last:
+        sunday = monday + datetime.timedelta(days=6)
+        year, week, _ = monday.isocalendar()
+        meta = {"week": f"{year}-W{week:02d}", "from": monday.isoformat(), "to": sunday.isoformat()}
+        if "timetable" in sections:
+            tasks.append(ArchiveTask(
+                "timetable", f"emploi-du-temps/{meta['week']}.json", meta,
+                lambda a=monday, b=sunday: [lesson_to_dict(l) for l in adapter.get_lessons(a, b)],
+            ))
+        if "homework" in sections:
+            tasks.append(ArchiveTask(
+                "homework", f"devoirs/{meta['week']}.json", meta,
+                lambda a=monday, b=sunday: [homework_to_dict(h) for h in adapter.get_homework(a, b)],
+            ))
+        monday += datetime.timedelta(days=7)
+
+    if "discussions" in sections:
+        tasks.append(ArchiveTask(
+            "discussions", "discussions.json", {},
+            lambda: [discussion_to_dict(d) for d in adapter.get_discussions()],
+        ))
+    if "informations" in sections:
+        tasks.append(ArchiveTask(
+            "informations", "informations.json", {},
+            lambda: [info_to_dict(i) for i in adapter.get_informations()],
+        ))
+    return period_dicts, tasks
+
+
+class ArchiveJob:
+    """Avancement d'un export, consultable pendant le flux via son id."""
+
+    def __init__(self, job_id: str, fmt: str, total: int) -> None:
+        self.id = job_id
+        self.format = fmt
+        self.total = total
+        self.done = 0
+        self.errors: list[dict[str, str]] = []
+        self.state = "running"
+        self.started = time.time()
+        self.finished: Optional[float] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "format": self.format,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "errors": list(self.errors),
+            "elapsed": round((self.finished or time.time()) - self.started, 2),
+        }
+
+
+class ArchiveExporter:
+    """Exécute les tâches d'export sur un pool borné et rend les résultats au fil de l'eau.
+
+    Au plus `2 × workers` tâches sont soumises à la fois : les résultats sont
+    sérialisés et envoyés dès qu'ils arrivent, la mémoire ne dépend donc pas
+    de la taille de l'archive. Les appels passent par l'adapter en priorité
+    `prefetch` dans l'ordonnanceur upstream : un export ne ralentit pas la
+    navigation. Une tâche sans résultat `task_timeout` secondes après sa
+    soumission est comptée en erreur et l'export continue.
+    """
+
+    def __init__(self, settings: dict[str, Any]) -> None:
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, ArchiveJob] = OrderedDict()
+
+    def create_job(self, fmt: str, total: int) -> ArchiveJob:
+        job = ArchiveJob(secrets.token_hex(8), fmt, total)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > max(1, int(self.settings["max_jobs"])):
+                self._jobs.popitem(last=False)
+        return job
+
+    def job(self, job_id: str) -> Optional[ArchiveJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    @staticmethod
+    def _run(task: ArchiveTask) -> Any:
+        with upstream_priority("prefetch"):
+            return task.fetch()
+
+    def results(self, job: ArchiveJob, tasks: list[ArchiveTask]):
+        """Génère (tâche, données, erreur) dans l'ordre d'achèvement."""
+        workers = max(1, int(self.settings["workers"]))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pronote-archive")
+        task_timeout = float(self.settings["task_timeout"])
+        pending_tasks = iter(tasks)
+        in_flight: dict[Any, tuple[ArchiveTask, float]] = {}
+        try:
+            while True:
+                while len(in_flight) < 2 * workers:
+                    task = next(pending_tasks, None)
+                    if task is None:
+                        break
+                    in_flight[executor.submit(self._run, task)] = (task, time.monotonic() + task_timeout)
+                if not in_flight:
+                    break
+                first_deadline = min(deadline for _task, deadline in in_flight.values())
+                done, _ = wait(in_flight, timeout=max(0.0, first_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                overdue = [f for f, (_task, deadline) in in_flight.items() if f not in done and deadline <= now]
+                for future in list(done) + overdue:
+                    task, _deadline = in_flight.pop(future)
+                    if future in done:
+                        try:
+                            data, error = future.result(), None
+                        except Exception as exc:
+                            data, error = None, f"{type(exc).__name__}: {exc}"
+                    else:
+                        future.cancel()
+                        data, error = None, f"Délai dépassé ({task_timeout:.0f}s)"
+                    if error is not None:
+                        job.errors.append({"section": task.section, "name": task.name, "error": error})
+                    job.done += 1
+                    yield task, data, error
+            job.state = "done"
+        except GeneratorExit:
+            # Client parti : on n'attend pas les tâches restantes.
+            job.state = "cancelled"
+            raise
+        finally:
+            job.finished = time.time()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def ndjson(self, job: ArchiveJob, periods: list[dict], tasks: list[ArchiveTask]):
+        yield json.dumps({"type": "periods", "data": periods}, ensure_ascii=False) + "\n"
+        for task, data, error in self.results(job, tasks):
+            record: dict[str, Any] = {"type": "error" if error else "record", "section": task.section, **task.meta}
+            if error:
+                record["error"] = error
+            else:
+                record["data"] = data
+            yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            yield json.dumps({"type": "progress", "done": job.done, "total": job.total}) + "\n"
+        yield json.dumps({"type": "end", **job.to_dict()}) + "\n"
+
+    def zip(self, job: ArchiveJob, periods: list[dict], tasks: list[ArchiveTask]):
+        sink = _ZipChunkSink()
+        # Flux non positionnable : zipfile écrit des descripteurs de données après chaque fichier.
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("periodes.json", json.dumps(periods, ensure_ascii=False, indent=1))
+            yield sink.drain()
+            for task, data, error in self.results(job, tasks):
+                if error is None:
+                    archive.writestr(task.name, json.dumps(data, ensure_ascii=False, indent=1, default=str))
+                    yield sink.drain()
+            archive.writestr("manifest.json", json.dumps(job.to_dict(), ensure_ascii=False, indent=1))
+        yield sink.drain()
+
+
+class _ZipChunkSink:
+    """Fichier en écriture seule pour zipfile : les octets écrits sont rendus par morceaux."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
+_archive_exporter = ArchiveExporter(_archive_settings(CONFIG))
+
+
+@config_manager.subscribe
+def _apply_archive_tuning(previous: dict, current: dict) -> None:
+    _archive_exporter.settings = _archive_settings(current)
+
+
+# ─── Historique multi-périodes (/api/history) ─────────────────────────────────
+HISTORY_DEFAULTS: dict[str, Any] = {
+    "workers": 4,
+    "open_ttl": 300.0,
+    "timeout": 60.0,
+}
+HISTORY_RESOURCES = ("grades", "averages", "absences", "delays")
+
+
+def _history_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `history` de config.json avec les défauts."""
+    return _merge_settings(HISTORY_DEFAULTS, config.get("history"))
+
+
+def period_is_closed(period: Any, today: Optional[datetime.date] = None) -> bool:
+    """Période terminée : sa date de fin est passée, ses données ne bougent plus."""
+    end = _as_day(getattr(period, "end", None))
+    return end is not None and end < (today or datetime.date.today())
+
+
+class PeriodHistoryCache:
+    """Ressources sérialisées par (ressource, période).
+
+    Une période close est gardée jusqu'à la fin de la session ; une période en
+    cours l'est `open_ttl` secondes.
+    """
+
+    def __init__(self, open_ttl: float) -> None:
+        self.open_ttl = open_ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, tuple[float, bool, list[dict]]] = {}
+        self.hits = 0
+
+    @staticmethod
+    def key(resource: str, p_dict: dict) -> tuple:
+        return (resource, p_dict["id"], p_dict["name"], p_dict["start"], p_dict["end"])
+
+    def get(self, key: tuple) -> Optional[list[dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, closed, rows = entry
+            if not closed and time.monotonic() - stored_at >= self.open_ttl:
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return rows
+
+    def put(self, key: tuple, rows: list[dict], closed: bool) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), closed, rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits}
+
+
+class PeriodHistory:
+    """Charge plusieurs ressources pour toutes les périodes sur un pool borné.
+
+    Les lectures passent par l'adapter en priorité `prefetch` (délais,
+    disjoncteur, ordonnanceur, une requête à la fois par session) ; la
+    réponse part au plus tard après `timeout` secondes, les ressources en
+    retard étant signalées en erreur.
+    """
+
+    def __init__(self, settings: dict[str, Any]) -> None:
+        self.settings = settings
+        self.cache = PeriodHistoryCache(float(settings["open_ttl"]))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def reconfigure(self, settings: dict[str, Any]) -> None:
+        """Nouvelle durée pour les périodes en cours ; la taille du pool reste celle du démarrage."""
+        self.settings = settings
+        self.cache.open_ttl = float(settings["open_ttl"])
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(self.settings["workers"])),
+                    thread_name_prefix="pronote-history",
+                )
+            return self._executor
+
+    @staticmethod
+    def _fetch(resource: str, adapter: PronoteBackendAdapter, period: Any, p_dict: dict) -> list[dict]:
+        with upstream_priority("prefetch"):
+            return _PERIOD_SECTIONS[resource](adapter, period, p_dict)
+
+    def load(self, adapter: PronoteBackendAdapter, periods: list[Any], resources: list[str]) -> dict[str, Any]:
+        today = datetime.date.today()
+        results: dict[str, dict[str, Any]] = {}
+        order: list[str] = []
+        futures = {}
+        for period in periods:
+            p_dict = period_to_dict(period)
+            closed = period_is_closed(period, today)
+            entry = results.setdefault(p_dict["id"], {"period": p_dict, "closed": closed, "cached": [], "errors": {}})
+            if p_dict["id"] not in order:
+                order.append(p_dict["id"])
+            for resource in resources:
+                key = self.cache.key(resource, p_dict)
+                rows = self.cache.get(key)
+                if rows is not None:
+                    entry[resource] = rows
+                    entry["cached"].append(resource)
+                    continue
+                future = self._pool().submit(self._fetch, resource, adapter, period, p_dict)
+                futures[future] = (entry, resource, key, closed)
+        deadline = time.monotonic() + float(self.settings["timeout"])
+        for future, (entry, resource, key, closed) in futures.items():
+            try:
+                rows = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                entry[resource] = []
+                entry["errors"][resource] = f"Délai dépassé ({float(self.settings['timeout']):.0f}s)"
+                continue
+            except Exception as exc:
+                entry[resource] = []
+                entry["errors"][resource] = f"{type(exc).__name__}: {exc}"
+                continue
+            entry[resource] = rows
+            self.cache.put(key, rows, closed)
+        return {"order": order, "periods": results}
+
+
+_period_history = PeriodHistory(_history_settings(CONFIG))
+on_session_reset(_period_history.cache.clear)
+
+
+@config_manager.subscribe
+def _apply_history_tuning(previous: dict, current: dict) -> None:
+    _period_history.reconfigure(_history_settings(current))
+
+
+# ─── Notifications desktop (file + dispatcher en arrière-plan) ───────────────
+NOTIFICATIONS_DEFAULTS: dict[str, Any] = {
+    "coalesce_ms": 750,
+    "coalesce_threshold": 3,
+    "max_per_minute": 12,
+    "dedupe_seconds": 60.0,
+    "queue_size": 200,
+}
+_URGENCY_LEVELS = {"low": 0, "normal": 1, "critical": 2}
+
+
+def _notifications_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `notifications` de config.json avec les défauts."""
+    return _merge_settings(NOTIFICATIONS_DEFAULTS, config.get("notifications"))
+
+
+class MemoryNotificationSink:
+    """Garde les notifications en mémoire (tests, environnements sans bureau)."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self.sent: list[dict[str, Any]] = []
+
+    def send(self, title: str, body: str, urgency: str) -> bool:
+        self.sent.append({"title": title, "body": body, "urgency": urgency})
+        return True
+
+
+class NotifySendNotificationSink:
+    """Repli historique : un processus `notify-send` par notification."""
+
+    name = "notify-send"
+
+    def send(self, title: str, body: str, urgency: str) -> bool:
+        try:
+            result = subprocess.run(
+                ['notify-send', '-a', 'Pronote Desktop', '-u', urgency, '--', title, body],
+                capture_output=True, timeout=5
+            )
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return result.returncode == 0
 
-def grade_to_dict(g: pronotepy.Grade, period_dict: dict) -> dict:
-    return {
-        "id": str(g.id) if hasattr(g, 'id') else str(id(g)),
-        "grade": str(g.grade) if hasattr(g, 'grade') else "—",
-        "out_of": str(g.out_of) if hasattr(g, 'out_of') else "20",
-        "default_out_of": str(g.default_out_of) if hasattr(g, 'default_out_of') else "20",
-        "date": g.date.isoformat() if hasattr(g, 'date') and g.date else datetime.date.today().isoformat(),
-        "subject": {"id": g.subject.id if g.subject else "", "name": g.subject.name if g.subject else "Matière", "groups": False} if g.subject else {"id": "", "name": "Matière", "groups": False},
-        "period": period_dict,
-        "average": str(g.average) if hasattr(g, 'average') else "",
-        "max": str(g.max) if hasattr(g, 'max') else "",
-        "min": str(g.min) if hasattr(g, 'min') else "",
-        "coefficient": str(g.coefficient) if hasattr(g, 'coefficient') else "1",
-        "comment": str(g.comment) if hasattr(g, 'comment') else "",
-        "is_bonus": bool(g.is_bonus) if hasattr(g, 'is_bonus') else False,
-        "is_optionnal": bool(g.is_optionnal) if hasattr(g, 'is_optionnal') else False,
-        "is_out_of_20": bool(g.is_out_of_20) if hasattr(g, 'is_out_of_20') else True,
-    }
 
-def average_to_dict(a: pronotepy.Average) -> dict:
-    return {
-        "student": str(a.student) if hasattr(a, 'student') else "—",
-        "class_average": str(a.class_average) if hasattr(a, 'class_average') else "—",
-        "max": str(a.max) if hasattr(a, 'max') else "—",
-        "min": str(a.min) if hasattr(a, 'min') else "—",
-        "out_of": str(a.out_of) if hasattr(a, 'out_of') else "20",
-        "default_out_of": str(a.default_out_of) if hasattr(a, 'default_out_of') else "20",
-        "subject": {"id": a.subject.id if a.subject else "", "name": a.subject.name if a.subject else "Matière", "groups": False} if a.subject else {"id": "", "name": "Matière", "groups": False},
-        "background_color": str(a.background_color) if hasattr(a, 'background_color') else "#4a90d9",
-    }
+class DBusNotificationSink:
+    """Connexion D-Bus de session persistante vers org.freedesktop.Notifications (jeepney)."""
 
-def period_to_dict(p: pronotepy.Period) -> dict:
-    return {
-        "id": str(p.id),
-        "name": str(p.name),
-        "start": p.start.isoformat() if hasattr(p, 'start') and p.start else "",
-        "end": p.end.isoformat() if hasattr(p, 'end') and p.end else "",
-    }
+    name = "dbus"
 
-def discussion_to_dict(d) -> dict:
-    messages = []
-    try:
-        for m in d.messages:
-            messages.append({
-                "id": str(m.id) if hasattr(m, 'id') else str(id(m)),
-                "author": str(getattr(m, 'author', None)) if getattr(m, 'author', None) else "Inconnu",
-                "content": str(getattr(m, 'content', None)) if getattr(m, 'content', None) else "",
-                "date": m.date.isoformat() if hasattr(m, 'date') and m.date else "",
-                "seen": bool(m.seen) if hasattr(m, 'seen') else False,
-            })
-    except Exception:
-        pass
+    def __init__(self) -> None:
+        from jeepney import DBusAddress, MessageType, new_method_call  # dépendance optionnelle
+        from jeepney.io.blocking import open_dbus_connection
+
+        self._new_method_call = new_method_call
+        self._method_return = MessageType.method_return
+        self._address = DBusAddress(
+            "/org/freedesktop/Notifications",
+            bus_name="org.freedesktop.Notifications",
+            interface="org.freedesktop.Notifications",
+        )
+        self._connection = open_dbus_connection(bus="SESSION")
 
-    subject = getattr(d, 'subject', None)
-    creator = getattr(d, 'creator', None)
-    date_value = getattr(d, 'date', None)
+    def send(self, title: str, body: str, urgency: str) -> bool:
+        message = self._new_method_call(
+            self._address, "Notify", "susssasa{sv}i",
+            ("Pronote Desktop", 0, "", title, body, [], {"urgency": ("y", _URGENCY_LEVELS[urgency])}, -1),
+        )
+        reply = self._connection.send_and_get_reply(message, timeout=2)
+        return reply.header.message_type == self._method_return
 
-    return {
-        "id": str(d.id) if hasattr(d, 'id') else str(id(d)),
-        "subject": str(subject) if subject else "Sans objet",
-        "creator": str(creator) if creator else "Inconnu",
-        "unread": bool(d.unread) if hasattr(d, 'unread') else False,
-        "date": date_value.isoformat() if date_value else "",
-        "messages": messages,
-        "participants": [],
-    }
 
-def info_to_dict(i) -> dict:
-    return {
-        "id": str(i.id) if hasattr(i, 'id') else str(id(i)),
-        "title": str(i.title) if hasattr(i, 'title') else "Information",
-        "author": str(i.author) if hasattr(i, 'author') and i.author else "Administration",
-        "content": str(i.content) if hasattr(i, 'content') and i.content else "",
-        "date": i.creation_date.isoformat() if hasattr(i, 'creation_date') and i.creation_date else "",
-        "read": bool(i.read) if hasattr(i, 'read') else False,
-        "category": str(i.category) if hasattr(i, 'category') and i.category else "Général",
-    }
+def _build_notification_sink() -> Any:
+    """`PRONOTE_NOTIFY_SINK=dbus|notify-send|memory` ; par défaut D-Bus si possible, sinon notify-send."""
+    choice = os.environ.get("PRONOTE_NOTIFY_SINK", "auto").strip().lower()
+    if choice == "memory":
+        return MemoryNotificationSink()
+    if choice in ("auto", "dbus"):
+        try:
+            return DBusNotificationSink()
+        except Exception:
+            if choice == "dbus":
+                traceback.print_exc()
+    return NotifySendNotificationSink()
 
 
-def _normalize_value(value: Any) -> Any:
-    if value is None or isinstance(value, (bool, int, float, str)):
-        return value
-    if isinstance(value, (datetime.date, datetime.datetime)):
-        return value.isoformat()
-    if isinstance(value, (list, tuple)):
-        return [_normalize_value(v) for v in value]
-    if isinstance(value, dict):
-        return {str(k): _normalize_value(v) for k, v in value.items()}
-    if hasattr(value, "to_dict"):
+class NotificationDispatcher:
+    """File de notifications livrée par un thread dédié.
+
+    Les soumissions d'une même rafale (fenêtre `coalesce_ms`) sont regroupées :
+    au-delà de `coalesce_threshold`, ou quand le seau de jetons
+    (`max_per_minute`) ne suffit plus, une seule notification de synthèse est
+    envoyée. Une clé (`key`) remplace la notification encore en file portant
+    la même clé et écarte un doublon livré depuis moins de `dedupe_seconds`.
+    """
+
+    MAX_STATUSES = 500
+
+    def __init__(
+        self,
+        sink_factory: Callable[[], Any],
+        settings: dict[str, Any],
+        clock: Callable[[], float] = time.monotonic,
+        autostart: bool = True,
+    ) -> None:
+        self._sink_factory = sink_factory
+        self._sink: Any = None
+        self.settings = settings
+        self._clock = clock
+        self._autostart = autostart
+        self._cond = threading.Condition()
+        self._pending: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._statuses: OrderedDict[str, str] = OrderedDict()
+        self._recent: dict[str, tuple[float, str]] = {}
+        self._tokens = float(settings["max_per_minute"])
+        self._refilled_at = clock()
+        self._thread: Optional[threading.Thread] = None
+        self._counter = 0
+        self.delivered = 0
+        self.summaries = 0
+        self.failures = 0
+
+    def reconfigure(self, settings: dict[str, Any]) -> None:
+        with self._cond:
+            self.settings = settings
+            self._tokens = min(self._tokens, float(settings["max_per_minute"]))
+            self._cond.notify()
+
+    @property
+    def sink(self) -> Any:
+        if self._sink is None:
+            self._sink = self._sink_factory()
+        return self._sink
+
+    def _set_status(self, notification_id: str, status: str) -> None:
+        self._statuses[notification_id] = status
+        self._statuses.move_to_end(notification_id)
+        while len(self._statuses) > self.MAX_STATUSES:
+            self._statuses.popitem(last=False)
+
+    def status(self, notification_id: str) -> Optional[str]:
+        with self._cond:
+            return self._statuses.get(notification_id)
+
+    def submit(self, title: str, body: str = "", urgency: str = "normal", key: Optional[str] = None) -> tuple[str, str]:
+        """Met la notification en file ; renvoie (id, statut) sans attendre la livraison."""
+        if urgency not in _URGENCY_LEVELS:
+            urgency = "normal"
+        now = self._clock()
+        fingerprint = f"{title}\n{body}"
+        with self._cond:
+            if key is not None:
+                for notification_id, item in self._pending.items():
+                    if item["key"] == key:
+                        item.update(title=title, body=body, urgency=urgency, submitted=now)
+                        return notification_id, "queued"
+                recent = self._recent.get(key)
+                if recent and recent[1] == fingerprint and now - recent[0] < float(self.settings["dedupe_seconds"]):
+                    self._counter += 1
+                    notification_id = f"n{self._counter}"
+                    self._set_status(notification_id, "duplicate")
+                    return notification_id, "duplicate"
+            self._counter += 1
+            notification_id = f"n{self._counter}"
+            self._pending[notification_id] = {
+                "title": title, "body": body, "urgency": urgency, "key": key, "submitted": now,
+            }
+            self._set_status(notification_id, "queued")
+            while len(self._pending) > int(self.settings["queue_size"]):
+                dropped, _item = self._pending.popitem(last=False)
+                self._set_status(dropped, "dropped")
+            self._cond.notify()
+        if self._autostart:
+            self.start()
+        return notification_id, "queued"
+
+    def _refill(self, now: float) -> None:
+        capacity = float(self.settings["max_per_minute"])
+        self._tokens = min(capacity, self._tokens + (now - self._refilled_at) * capacity / 60.0)
+        self._refilled_at = now
+
+    def run_once(self) -> float:
+        """Livre ce qui est prêt. Renvoie le délai (s) avant le prochain essai, 0 si rien n'attend."""
+        with self._cond:
+            if not self._pending:
+                return 0.0
+            now = self._clock()
+            window = int(self.settings["coalesce_ms"]) / 1000.0
+            first = next(iter(self._pending.values()))["submitted"]
+            last = max(item["submitted"] for item in self._pending.values())
+            # On attend la fin de la rafale, sans la laisser s'éterniser.
+            settle = min(last + window, first + 4 * window) - now
+            if settle > 0:
+                return settle
+            self._refill(now)
+            if self._tokens < 1:
+                return (1 - self._tokens) * 60.0 / max(1.0, float(self.settings["max_per_minute"]))
+            batch = list(self._pending.items())
+            self._pending.clear()
+            summarize = len(batch) > int(self.settings["coalesce_threshold"]) or len(batch) > self._tokens
+            self._tokens -= 1 if summarize else len(batch)
+            for _notification_id, item in batch:
+                if item["key"] is not None:
+                    self._recent[item["key"]] = (now, f"{item['title']}\n{item['body']}")
+            horizon = now - float(self.settings["dedupe_seconds"])
+            self._recent = {k: v for k, v in self._recent.items() if v[0] >= horizon}
+
+        if summarize:
+            titles = [item["title"] for _notification_id, item in batch]
+            body = "\n".join(titles[:5]) + ("\n…" if len(titles) > 5 else "")
+            urgency = max((item["urgency"] for _notification_id, item in batch), key=_URGENCY_LEVELS.__getitem__)
+            outcomes = [self._deliver(f"{len(batch)} nouvelles notifications", body, urgency)] * len(batch)
+            self.summaries += 1
+        else:
+            outcomes = [self._deliver(item["title"], item["body"], item["urgency"]) for _notification_id, item in batch]
+        with self._cond:
+            for (notification_id, _item), sent in zip(batch, outcomes):
+                self._set_status(notification_id, ("coalesced" if summarize else "delivered") if sent else "failed")
+        return 0.0
+
+    def _deliver(self, title: str, body: str, urgency: str) -> bool:
         try:
-            return _normalize_value(value.to_dict())
+            sent = bool(self.sink.send(title[:100], body[:300], urgency))
         except Exception:
+            traceback.print_exc()
+            sent = False
+        if sent:
+            self.delivered += 1
+        else:
+            self.failures += 1
+        return sent
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="pronote-notifications", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            delay = self.run_once()
+            if delay > 0:
+                with self._cond:
+                    self._cond.wait(delay)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "sink": getattr(self._sink, "name", None),
+                "pending": len(self._pending),
+                "delivered": self.delivered,
+                "summaries": self.summaries,
+                "failures": self.failures,
+            }
+
+
+_notifier = NotificationDispatcher(_build_notification_sink, _notifications_settings(CONFIG))
+
+
+@config_manager.subscribe
+def _apply_notifications_tuning(previous: dict, current: dict) -> None:
+    _notifier.reconfigure(_notifications_settings(current))
+
+
+# ─── Mémoire (/api/debug/memory) ──────────────────────────────────────────────
+# PRONOTE_TRACEMALLOC=<cadres> active tracemalloc dès le chargement ; sinon
+# `POST /api/debug/memory?trace=start` l'active à la demande (coût : ~x1,5 en mémoire).
+if os.environ.get("PRONOTE_TRACEMALLOC", "").strip().isdigit() and not tracemalloc.is_tracing():
+    tracemalloc.start(max(1, int(os.environ["PRONOTE_TRACEMALLOC"])))
+
+_SECTION_RE = re.compile(r"^# ─── (.+?) ─")
+_source_sections: Optional[tuple[list[int], list[str]]] = None
+
+
+def _section_at(lineno: int) -> str:
+    """Section (« # ─── Titre ─── ») de ce fichier contenant la ligne `lineno`."""
+    global _source_sections
+    if _source_sections is None:
+        starts, titles = [0], ["en-tête"]
+        try:
+            with open(__file__, encoding="utf-8") as f:
+                for number, line in enumerate(f, 1):
+                    match = _SECTION_RE.match(line)
+                    if match:
+                        starts.append(number)
+                        titles.append(match.group(1).strip())
+        except OSError:
             pass
-    return str(value)
+        _source_sections = (starts, titles)
+    starts, titles = _source_sections
+    return titles[bisect.bisect_right(starts, lineno) - 1]
+
+
+def _subsystem_of(filename: str, lineno: int) -> str:
+    if os.path.abspath(filename) == os.path.abspath(__file__):
+        return f"pronote_api : {_section_at(lineno)}"
+    parts = filename.replace("\\", "/").split("/")
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return parts[index + 1].split(".")[0]
+    if filename.startswith("<"):
+        return "imports"
+    return "stdlib"
+
+
+def memory_by_subsystem(snapshot: Any, limit: int = 30) -> list[dict[str, Any]]:
+    """Allocations vivantes regroupées par section de pronote_api ou par paquet."""
+    groups: dict[str, list[int]] = {}
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    for stat in snapshot.statistics("lineno"):
+        frame = stat.traceback[0]
+        totals = groups.setdefault(_subsystem_of(frame.filename, frame.lineno), [0, 0])
+        totals[0] += stat.size
+        totals[1] += stat.count
+    ranked = sorted(groups.items(), key=lambda item: item[1][0], reverse=True)
+    return [{"subsystem": name, "bytes": size, "blocks": count} for name, (size, count) in ranked[:limit]]
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
 
 
-def recipient_to_dict(recipient: Any) -> dict:
-    identity = getattr(recipient, "identity", None)
-    return {
-        "id": str(getattr(recipient, "id", "")),
-        "name": str(identity.name) if identity and hasattr(identity, "name") else str(getattr(recipient, "name", "Destinataire")),
-        "kind": str(getattr(recipient, "kind", getattr(recipient, "type", "unknown"))),
+def _memory_caches() -> dict[str, Any]:
+    """Taille approchée de ce que retient chaque cache en mémoire."""
+    caches: dict[str, Any] = {
+        "search_index": dict(
+            _search_index.stats(),
+            bytes=approximate_size((_search_index._docs, _search_index._postings, _search_index._lengths)),
+        ),
+        "timetable_index": {
+            "days": len(_timetable_index._covered),
+            "bytes": approximate_size((_timetable_index._resources, _timetable_index._merged)),
+        },
+        "grade_stats": {
+            "entries": len(_grade_stats_cache._entries),
+            "bytes": approximate_size(_grade_stats_cache._entries),
+        },
+        "attachments": {
+            "entries": len(_attachments._entries),
+            "bytes": approximate_size(_attachments._entries),
+        },
+        "period_history": dict(
+            _period_history.cache.stats(),
+            bytes=approximate_size(_period_history.cache._entries),
+        ),
     }
+    snapshot = getattr(_adapter, "memory_snapshot", None)
+    if callable(snapshot):
+        caches.update(snapshot())
+    return caches
+
+
+# ─── Profilage à la demande (/api/debug/profile) ─────────────────────────────
+PROFILING_DEFAULTS: dict[str, Any] = {
+    "interval_ms": 2.0,
+    "max_profiles": 50,
+    # L'en-tête X-Pronote-Profile force le profilage sans armement préalable :
+    # désactivé tant que config.json ne l'autorise pas explicitement.
+    "allow_header": False,
+}
+PROFILE_DIR = os.environ.get("PRONOTE_PROFILE_DIR") or os.path.join(DATA_DIR, "profiles")
+PROFILE_HEADER = "X-Pronote-Profile"
+_PROFILE_UPSTREAM_PACKAGES = frozenset({"pronotepy", "requests", "urllib3", "charset_normalizer", "idna", "certifi"})
+_PROFILE_FLASK_PACKAGES = frozenset({"flask", "flask_cors", "werkzeug"})
+_PROFILE_SERIALIZERS = frozenset({
+    "_normalize_value", "rows_to_columnar", "_rows_response", "_attachments_of", "attachment_to_dict",
+})
+# Le thread de requête attend ici le worker de ResilientBackendAdapter : la pile
+# du worker est greffée à cet endroit au lieu de compter deux fois l'attente.
+_PROFILE_HANDOFF = "_call_with_deadline"
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def _profiling_settings(config: dict) -> dict[str, Any]:
+    """Fusionne la section `profiling` de config.json avec les défauts."""
+    return _merge_settings(PROFILING_DEFAULTS, config.get("profiling"))
+
+
+def _profile_frame(frame: Any) -> tuple[str, Optional[str]]:
+    """(libellé pour le flame graph, catégorie) d'un cadre de pile."""
+    code = frame.f_code
+    module = str(frame.f_globals.get("__name__") or "?")
+    if os.path.abspath(code.co_filename) == _THIS_FILE:
+        module = "pronote_api"
+        category = "serializers" if code.co_name.endswith("_to_dict") or code.co_name in _PROFILE_SERIALIZERS else "backend"
+    else:
+        top = module.split(".")[0]
+        if top in _PROFILE_UPSTREAM_PACKAGES:
+            category = "pronotepy"
+        elif top in _PROFILE_FLASK_PACKAGES:
+            category = "flask"
+        elif top == "json":
+            category = "serializers"
+        else:
+            category = None
+    return f"{code.co_name} ({module}:{code.co_firstlineno})", category
+
+
+def _profile_stack(frame: Any) -> list[Any]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class ProfileCapture:
+    """Échantillons d'une requête : thread de la requête + workers upstream qu'elle attend."""
+
+    def __init__(self, method: str, path: str) -> None:
+        self.method = method
+        self.path = path
+        self.thread_id = threading.get_ident()
+        self.workers: set[int] = set()
+        self.stacks: dict[tuple[str, ...], int] = {}
+        self.categories: dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def sample(self, frames: dict[int, Any]) -> None:
+        head = frames.get(self.thread_id)
+        if head is None:
+            return
+        stack = _profile_stack(head)
+        branches = [stack]
+        cut = next((i for i, f in enumerate(stack) if f.f_code.co_name == _PROFILE_HANDOFF), None)
+        if cut is not None:
+            workers = [_profile_stack(frames[tid]) for tid in list(self.workers) if tid in frames]
+            if workers:
+                # Sans l'amorce du pool (threading, concurrent.futures, enveloppe `wrap`).
+                branches = [
+                    stack[:cut + 1] + w[next((i + 1 for i, f in enumerate(w) if f.f_code is _WORKER_ENTRY), 0):]
+                    for w in workers
+                ]
+        for branch in branches:
+            labels, category = [], "other"
+            for frame in branch:
+                label, kind = _profile_frame(frame)
+                labels.append(label)
+                # pronotepy l'emporte sur tout ; un sérialiseur sur le code qu'il appelle.
+                if category == "pronotepy" or kind is None:
+                    continue
+                if kind == "pronotepy" or category != "serializers":
+                    category = kind
+            key = tuple(labels)
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.categories[category] = self.categories.get(category, 0) + 1
+
+
+class RequestProfiler:
+    """Profileur par échantillonnage, armé pour les N prochaines requêtes d'une route.
+
+    Désarmé, le seul coût est un test par requête. Armé, un thread échantillonne
+    les piles (`sys._current_frames`) des requêtes capturées toutes les
+    `interval_ms` et écrit, par requête, un fichier `.folded` (piles repliées,
+    lisibles par speedscope, inferno ou flamegraph.pl) et un résumé `.json`
+    ventilant le temps entre pronotepy, sérialiseurs, Flask et le reste du backend.
+    """
 
+    def __init__(self, directory: str, settings: dict[str, Any]) -> None:
+        self.directory = directory
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._rules: list[dict[str, Any]] = []
+        self._active: list[ProfileCapture] = []
+        self._local = threading.local()
+        self._sampler: Optional[threading.Thread] = None
+        self.armed = False
+
+    def arm(self, route: str, count: int) -> dict[str, Any]:
+        rule = {"route": route, "remaining": max(1, count)}
+        with self._lock:
+            self._rules = [r for r in self._rules if r["route"] != route] + [rule]
+            self.armed = True
+        return dict(rule)
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._rules = []
+            self.armed = False
+
+    def rules(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self._rules]
+
+    def _claim(self, path: str) -> bool:
+        with self._lock:
+            for rule in self._rules:
+                if fnmatch.fnmatchcase(path, rule["route"]) or path.startswith(rule["route"].rstrip("*")):
+                    rule["remaining"] -= 1
+                    self._rules = [r for r in self._rules if r["remaining"] > 0]
+                    self.armed = bool(self._rules)
+                    return True
+        return False
 
-def menu_to_dict(menu: Any) -> dict:
-    payload = _normalize_value(menu)
-    if isinstance(payload, dict):
-        return payload
-    return {"value": payload}
-
+    def begin(self, method: str, path: str, forced: bool) -> Optional[ProfileCapture]:
+        if not forced and not self._claim(path):
+            return None
+        capture = ProfileCapture(method, path)
+        self._local.capture = capture
+        with self._lock:
+            self._active.append(capture)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="pronote-profiler", daemon=True)
+                self._sampler.start()
+        return capture
+
+    def end(self, capture: ProfileCapture, status: int) -> dict[str, Any]:
+        self._local.capture = None
+        with self._lock:
+            if capture in self._active:
+                self._active.remove(capture)
+        capture.duration = time.perf_counter() - capture.started
+        return self._write(capture, status)
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Rattache l'exécution de `fn` dans un worker à la capture du thread courant."""
+        capture = getattr(self._local, "capture", None)
+        if capture is None:
+            return fn
+
+        return functools.partial(self._run_in_worker, capture, fn)
+
+    @staticmethod
+    def _run_in_worker(capture: ProfileCapture, fn: Callable[..., Any], *args: Any) -> Any:
+        worker = threading.get_ident()
+        capture.workers.add(worker)
+        try:
+            return fn(*args)
+        finally:
+            capture.workers.discard(worker)
+
+    def _sample_loop(self) -> None:
+        while True:
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for capture in active:
+                capture.sample(frames)
+            del frames
+            time.sleep(max(0.0005, float(self.settings["interval_ms"]) / 1000.0))
+
+    def _write(self, capture: ProfileCapture, status: int) -> dict[str, Any]:
+        samples = sum(capture.categories.values())
+        duration_ms = capture.duration * 1000
+        summary = {
+            "id": "",
+            "method": capture.method,
+            "path": capture.path,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "interval_ms": float(self.settings["interval_ms"]),
+            "samples": samples,
+            "categories": {
+                name: {"samples": count, "share": round(count / samples, 3)}
+                for name, count in sorted(capture.categories.items(), key=lambda item: -item[1])
+            },
+        }
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", capture.path).strip("-") or "root"
+        summary["id"] = profile_id = f"{stamp}-{slug}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+                for stack, count in sorted(capture.stacks.items()):
+                    f.write(";".join(label.replace(";", ",") for label in stack) + f" {count}\n")
+            _atomic_write_json(os.path.join(self.directory, f"{profile_id}.json"), summary)
+            self._prune()
+        except OSError:
+            traceback.print_exc()
+        return summary
+
+    def _prune(self) -> None:
+        summaries = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        for name in summaries[:max(0, len(summaries) - int(self.settings["max_profiles"]))]:
+            for suffix in (".json", ".folded"):
+                with contextlib.suppress(OSError):
+                    os.unlink(os.path.join(self.directory, name[:-5] + suffix))
+
+    def recent(self, limit: int = 20) -> list[dict[str, Any]]:
+        try:
+            names = sorted((n for n in os.listdir(self.directory) if n.endswith(".json")), reverse=True)
+        except OSError:
+            return []
+        profiles = []
+        for name in names[:limit]:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
 
-def get_selected_period(
-    period_id: Optional[str],
-    period_name: Optional[str] = None,
-    period_start: Optional[str] = None,
-    period_end: Optional[str] = None,
-) -> Any:
-    periods = _adapter.get_periods()
-    if not periods:
-        return None
 
-    target_id = str(period_id).strip() if period_id is not None else ""
-    target_name = str(period_name).strip().lower() if period_name else ""
-    target_start = str(period_start).strip() if period_start else ""
-    target_end = str(period_end).strip() if period_end else ""
+_WORKER_ENTRY = RequestProfiler._run_in_worker.__code__
+_profiler = RequestProfiler(PROFILE_DIR, _profiling_settings(CONFIG))
 
-    def period_id_value(period: Any) -> str:
-        return str(getattr(period, "id", "")).strip()
 
-    def period_name_value(period: Any) -> str:
-        return str(getattr(period, "name", "")).strip().lower()
+@config_manager.subscribe
+def _apply_profiling_tuning(previous: dict, current: dict) -> None:
+    _profiler.settings = _profiling_settings(current)
 
-    def period_start_value(period: Any) -> str:
-        start = getattr(period, "start", None)
-        if start is None:
-            return ""
-        if hasattr(start, "isoformat"):
-            try:
-                return str(start.isoformat())
-            except Exception:
-                return str(start)
-        return str(start)
 
-    def period_end_value(period: Any) -> str:
-        end = getattr(period, "end", None)
-        if end is None:
-            return ""
-        if hasattr(end, "isoformat"):
-            try:
-                return str(end.isoformat())
-            except Exception:
-                return str(end)
-        return str(end)
+@app.before_request
+def _profile_before_request() -> None:
+    forced = PROFILE_HEADER in request.headers and _profiler.settings["allow_header"]
+    if not (_profiler.armed or forced) or request.path.startswith("/api/debug/profile"):
+        return
+    capture = _profiler.begin(request.method, request.path, forced)
+    if capture is not None:
+        request.environ["pronote.profile"] = capture
 
-    candidates = periods
-    if target_id:
-        by_id = [p for p in periods if period_id_value(p) == target_id]
-        if len(by_id) == 1:
-            return by_id[0]
-        if by_id:
-            candidates = by_id
 
-    if target_name:
-        by_name = [p for p in candidates if period_name_value(p) == target_name]
-        if len(by_name) == 1:
-            return by_name[0]
-        if by_name:
-            candidates = by_name
+@app.after_request
+def _profile_after_request(response: Response) -> Response:
+    capture = request.environ.pop("pronote.profile", None)
+    if capture is None:
+        return response
+    summary = _profiler.end(capture, response.status_code)
+    response.headers["X-Profile-Id"] = summary["id"]
+    samples = max(1, summary["samples"])
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={summary['duration_ms'] * data['samples'] / samples:.1f}"
+        for name, data in summary["categories"].items()
+    )
+    return response
 
-    if target_start or target_end:
-        by_dates = [
-            p for p in candidates
-            if (not target_start or period_start_value(p) == target_start)
-            and (not target_end or period_end_value(p) == target_end)
-        ]
-        if len(by_dates) == 1:
-            return by_dates[0]
-        if by_dates:
-            candidates = by_dates
 
-    return candidates[0] if candidates else periods[0]
+@app.teardown_request
+def _profile_teardown(error: Optional[BaseException]) -> None:
+    # Exception non interceptée : after_request n'a pas tourné.
+    capture = request.environ.pop("pronote.profile", None)
+    if capture is not None:
+        _profiler.end(capture, 500)
 
 
 # ─── Routes ───────────────────────────────────────────────────────────────────
 
+def _serve_spa_index():
+    entry = _static_index.lookup('index.html')
+    if entry is None:
+        return jsonify({"error": "Not found"}), 404
+    return _static_index.serve(entry)
+
 @app.route('/')
 def index():
     """Sert le frontend React (SPA)."""
-    return send_from_directory(DIST_DIR, 'index.html')
+    return _serve_spa_index()
+
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    """Assets Vite : cache long `immutable` pour les fichiers hashés."""
+    entry = _static_index.lookup('assets/' + filename)
+    if entry is None:
+        return jsonify({"error": "Not found"}), 404
+    return _static_index.serve(entry)
 
 @app.route('/<path:path>')
 def spa_fallback(path):
     """Fallback SPA : sert les fichiers statiques existants, sinon renvoie index.html."""
     if path.startswith('api/'):
         return jsonify({"error": "Not found"}), 404
-    # Servir les fichiers statiques existants (JS, CSS, images, fonts…)
-    full_path = os.path.join(DIST_DIR, path)
-    if os.path.isfile(full_path):
-        return send_from_directory(DIST_DIR, path)
+    # Servir les fichiers statiques existants (JS, CSS, images, fonts…) : lookup O(1) dans l'index
+    entry = _static_index.lookup(path)
+    if entry is not None:
+        return _static_index.serve(entry)
     # Fallback SPA : toutes les routes React renvoient index.html
-    return send_from_directory(DIST_DIR, 'index.html')
+    return _serve_spa_index()
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok", "version": "1.7.13"})
+    payload: dict[str, Any] = {"status": "ok", "version": "1.7.13", "startup": _startup.snapshot()}
+    snapshot = getattr(_adapter, "health_snapshot", None)
+    if callable(snapshot):
+        payload["upstream"] = snapshot()
+    return jsonify(payload)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Métriques internes du backend (pool HTTP upstream, ordonnanceur, notifications)."""
+    return jsonify({
+        "upstream_http": _upstream_http_pool.stats(),
+        "scheduler": _upstream_scheduler.stats(),
+        "notifications": _notifier.stats(),
+    })
+
+@app.route('/api/debug/memory', methods=['GET', 'POST'])
+def debug_memory():
+    """RSS, caches internes et, si tracemalloc est actif, allocations par sous-système.
+
+    Démarrer ou arrêter tracemalloc (`trace=start|stop`) se fait en POST.
+    """
+    try:
+        frames = max(1, min(int(request.args.get('frames', 1)), 25))
+        limit = max(1, int(request.args.get('limit', 30)))
+    except ValueError:
+        return jsonify({"error": "Paramètre frames/limit invalide"}), 400
+    trace = request.args.get('trace', '')
+    if trace and request.method != 'POST':
+        return jsonify({"error": "trace=start|stop : utiliser POST"}), 405
+    if trace == 'start' and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    elif trace == 'stop' and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    payload: dict[str, Any] = {
+        "rss_bytes": _rss_bytes(),
+        "tracing": tracemalloc.is_tracing(),
+        "caches": _memory_caches(),
+    }
+    if payload["tracing"]:
+        current, peak = tracemalloc.get_traced_memory()
+        payload["traced"] = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "subsystems": memory_by_subsystem(tracemalloc.take_snapshot(), limit),
+        }
+    return jsonify(payload)
+
+@app.route('/api/debug/profile', methods=['GET', 'POST', 'DELETE'])
+def debug_profile():
+    """Arme le profileur (POST `route`, `n`), le désarme (DELETE) ou liste les derniers profils (GET)."""
+    if request.method == 'DELETE':
+        _profiler.disarm()
+        return jsonify({"armed": []})
+    route = request.args.get('route', '')
+    if route and request.method != 'POST':
+        return jsonify({"error": "Armement du profileur : utiliser POST"}), 405
+    if route:
+        try:
+            count = min(int(request.args.get('n', 1)), 100)
+        except ValueError:
+            return jsonify({"error": "Paramètre n invalide"}), 400
+        _profiler.arm(route, count)
+    return jsonify({
+        "armed": _profiler.rules(),
+        "directory": _profiler.directory,
+        "header": PROFILE_HEADER if _profiler.settings["allow_header"] else None,
+        "profiles": _profiler.recent(),
+    })
 
 @app.route('/api/login', methods=['POST'])
 def login():
+    global _adapter
     data = request.json
     url = data.get('pronote_url', '')
     username = data.get('username', '')
     password = data.get('password', '')
     try:
-        logged = _adapter.login(url, username, password)
+        account_id = _accounts.account_id(url, username)
+        current = _accounts.find(_adapter)
+        # L'adapter actif appartient à un autre compte (connecté ou expiré) : la
+        # nouvelle connexion se fait sur sa propre pile, jamais sur celle du compte actif.
+        switching = current is not None and current.id != account_id
+        if switching:
+            existing = _accounts.get(account_id)
+            target = existing.adapter if existing is not None else _new_account_adapter()
+        else:
+            target = _adapter
+            _reset_session_state()
+        logged = target.login(url, username, password)
         if logged:
-            return jsonify({"success": True, "client_info": client_to_dict(_adapter.get_client())})
+            if switching:
+                _reset_session_state()
+            account = _accounts.register(account_id, url, username, target)
+            account.client_info = client_to_dict(account.adapter.get_client())
+            _adapter = _accounts.activate(account.id).adapter
+            _search_index.open(account.search_key)
+            return jsonify({"success": True, "client_info": account.client_info, "account_id": account.id})
         return jsonify({"success": False, "error": "Connexion échouée"}), 401
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/api/logout', methods=['POST'])
 def logout():
+    account = _accounts.find(_adapter)
     _adapter.logout()
+    if account is not None:
+        _accounts.remove(account.id)
+    _reset_session_state()
+    return jsonify({"success": True})
+
+@app.route('/api/accounts', methods=['GET'])
+def accounts():
+    """Comptes connectés, avec compteurs et état de la synchronisation d'arrière-plan."""
+    active = _accounts.find(_adapter)
+    return jsonify([a.to_dict(active is not None and a.id == active.id) for a in _accounts.accounts()])
+
+@app.route('/api/accounts/<account_id>/activate', methods=['POST'])
+def activate_account(account_id):
+    """Bascule sur un compte déjà connecté, sans nouvelle authentification."""
+    account = _accounts.get(account_id)
+    if account is None:
+        return jsonify({"error": "Compte inconnu"}), 404
+    if not account.adapter.is_logged_in():
+        return jsonify({"error": "Session expirée, reconnexion nécessaire"}), 409
+    try:
+        if account.adapter is not _adapter:
+            _activate_account(account)
+        return jsonify({"success": True, "client_info": account.client_info, "account_id": account.id})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/accounts/<account_id>', methods=['DELETE'])
+def remove_account(account_id):
+    """Déconnecte et oublie un compte ; le compte actif se retire via /api/logout."""
+    account = _accounts.get(account_id)
+    if account is None:
+        return jsonify({"error": "Compte inconnu"}), 404
+    if account.adapter is _adapter:
+        return jsonify({"error": "Compte actif : utiliser /api/logout"}), 409
+    _accounts.remove(account_id)
     return jsonify({"success": True})
 
 @app.route('/api/timetable', methods=['GET'])
@@ -603,10 +5888,58 @@ def timetable():
         date_from = datetime.date.fromisoformat(date_from_str) if date_from_str else datetime.date.today()
         date_to = datetime.date.fromisoformat(date_to_str) if date_to_str else date_from + datetime.timedelta(days=6)
         lessons = _adapter.get_lessons(date_from, date_to)
-        return jsonify([lesson_to_dict(l) for l in lessons])
+        rows = [lesson_to_dict(l) for l in lessons]
+        _timetable_index.ingest(date_from, date_to, rows)
+        return _rows_response(rows, TIMETABLE_INTERNED)
     except Exception as e:
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
+@app.route('/api/timetable/free-slots', methods=['GET'])
+def timetable_free_slots():
+    """Créneaux libres d'une ressource (`teacher`, `room`, `group`, sinon tous mes cours)
+    entre `from` et `to`, ou salles libres à l'instant `at` (pendant `min_minutes`)."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    try:
+        min_minutes = int(request.args.get('min_minutes', 55))
+        at = request.args.get('at')
+        if at:
+            start = datetime.datetime.fromisoformat(at)
+            end = start + datetime.timedelta(minutes=max(1, min_minutes))
+            # Toute la semaine : les salles connues sont celles vues dans l'emploi du temps.
+            monday = start.date() - datetime.timedelta(days=start.weekday())
+            _ensure_timetable_coverage(monday, max(end.date(), monday + datetime.timedelta(days=6)))
+            free, busy = _timetable_index.free_rooms(start, end)
+            return jsonify({"at": start.isoformat(), "until": end.isoformat(), "free_rooms": free, "busy_rooms": busy})
+
+        date_from_str = request.args.get('from')
+        date_to_str = request.args.get('to')
+        date_from = datetime.date.fromisoformat(date_from_str) if date_from_str else datetime.date.today()
+        date_to = datetime.date.fromisoformat(date_to_str) if date_to_str else date_from + datetime.timedelta(days=6)
+        if date_to < date_from or (date_to - date_from).days > FREE_SLOTS_MAX_DAYS:
+            return jsonify({"error": f"Plage invalide (maximum {FREE_SLOTS_MAX_DAYS} jours)"}), 400
+        day_start = datetime.time.fromisoformat(request.args.get('day_start', '08:00'))
+        day_end = datetime.time.fromisoformat(request.args.get('day_end', '18:00'))
+        weekdays = frozenset(int(d) - 1 for d in request.args.get('weekdays', '1,2,3,4,5').split(',') if d.strip())
+
+        resource = _ALL_LESSONS
+        for kind in ('teacher', 'room', 'group'):
+            if request.args.get(kind):
+                resource = TimetableIntervalIndex.resource_key(kind, request.args[kind])
+                break
+        _ensure_timetable_coverage(date_from, date_to)
+        slots = _timetable_index.free_slots(resource, date_from, date_to, min_minutes, day_start, day_end, weekdays)
+        return jsonify({
+            "resource": {"kind": resource[0], "key": resource[1]},
+            "from": date_from.isoformat(),
+            "to": date_to.isoformat(),
+            "slots": slots,
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/homework', methods=['GET'])
 def homework():
     if not _adapter.is_logged_in():
@@ -617,7 +5950,9 @@ def homework():
         date_from = datetime.date.fromisoformat(date_from_str) if date_from_str else datetime.date.today()
         date_to = datetime.date.fromisoformat(date_to_str) if date_to_str else date_from + datetime.timedelta(days=14)
         hw = _adapter.get_homework(date_from, date_to)
-        return jsonify([homework_to_dict(h) for h in hw])
+        payload = [homework_to_dict(h) for h in hw]
+        _search_index.index_homework(payload, date_from, date_to)
+        return jsonify(payload)
     except Exception as e:
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
@@ -646,8 +5981,57 @@ def lesson_content(lesson_id: str):
         date_to_str = request.args.get('to')
         date_from = datetime.date.fromisoformat(date_from_str) if date_from_str else datetime.date.today() - datetime.timedelta(days=45)
         date_to = datetime.date.fromisoformat(date_to_str) if date_to_str else datetime.date.today() + datetime.timedelta(days=45)
-        content = _adapter.get_lesson_content(lesson_id, date_from, date_to)
-        return jsonify({"id": lesson_id, "content": _normalize_value(content)})
+        content, normalized = _adapter.read_normalized("get_lesson_content", lesson_id, date_from, date_to)
+        # Premier niveau copié : la forme normalisée est partagée avec le cache de secours.
+        payload = dict(normalized) if isinstance(normalized, dict) else normalized
+        if isinstance(payload, dict) and getattr(content, "files", None):
+            payload["files"] = _attachments_of(content)
+        return jsonify({"id": lesson_id, "content": payload})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/files/<file_id>', methods=['GET'])
+def attachment_file(file_id: str):
+    """Proxy des pièces jointes : cache disque, Range/ETag, sinon relais en streaming."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    try:
+        # Seules les pièces jointes vues par la session courante sont servies, copie en cache ou non.
+        entry = _attachments.get(file_id)
+        if entry is None:
+            return jsonify({"error": "Pièce jointe inconnue"}), 404
+        cached = _file_cache.lookup(file_id)
+        if cached is None:
+            if entry["type"] == 0 or not entry["url"]:
+                return jsonify({"error": "Ce lien n'est pas un fichier"}), 400
+            upstream = _adapter.download_attachment(entry["url"])
+            if request.range is None:
+                mimetype = str(upstream.headers.get("Content-Type", "") or "").split(";")[0] or _guess_mimetype(entry["name"])
+                response = Response(_download_to_cache(entry, upstream), mimetype=mimetype)
+                # Générateur jamais démarré (client parti) : le flux upstream est fermé quand même.
+                response.call_on_close(upstream.close)
+                length = upstream.headers.get("Content-Length")
+                if length:
+                    response.headers["Content-Length"] = length
+                response.headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(entry['name'])}"
+                response.headers["Cache-Control"] = ATTACHMENT_CACHE_CONTROL
+                response.headers["X-Cache"] = "MISS"
+                return response
+            # Plage demandée sans copie locale : téléchargement complet, puis service depuis le disque.
+            for _chunk in _download_to_cache(entry, upstream):
+                pass
+            cached = _file_cache.lookup(file_id)
+            if cached is None:
+                return jsonify({"error": "Téléchargement incomplet"}), 502
+        path, blob = cached
+        response = _cached_file_response(
+            path,
+            blob.get("mimetype") or _guess_mimetype(blob.get("name", "")),
+            entry.get("name") or blob.get("name") or file_id,
+        )
+        response.headers["X-Cache"] = "HIT"
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -661,6 +6045,17 @@ def periods():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _unavailable_response(error: AdapterError):
+    """503 + `Retry-After` : Pronote indisponible, à ne pas confondre avec « aucune donnée »."""
+    retry_in = None
+    snapshot = getattr(_adapter, "health_snapshot", None)
+    if callable(snapshot):
+        retry_in = (snapshot().get("breaker") or {}).get("retry_in")
+    response = jsonify({"error": str(error), "unavailable": True})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_in)) if retry_in else 5)
+    return response
+
 @app.route('/api/grades', methods=['GET'])
 def grades():
     if not _adapter.is_logged_in():
@@ -675,10 +6070,71 @@ def grades():
             return jsonify([])
         p_dict = period_to_dict(period)
         try:
-            gs = period.grades
-            return jsonify([grade_to_dict(g, p_dict) for g in gs])
+            gs = _adapter.get_period_grades(period)
+            return _rows_response([grade_to_dict(g, p_dict) for g in gs], GRADES_INTERNED)
+        except UPSTREAM_UNAVAILABLE:
+            raise
         except Exception:
+            # Période aux données pronotepy inexploitables : liste vide.
             return jsonify([])
+    except UPSTREAM_UNAVAILABLE as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/grades/stats', methods=['GET'])
+def grades_stats():
+    """Moyennes pondérées par matière, moyenne générale, histogramme ; `trend=1` ajoute l'évolution par période."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    try:
+        period = get_selected_period(
+            request.args.get('period_id'),
+            request.args.get('period_name'),
+            request.args.get('period_start'),
+            request.args.get('period_end'),
+        )
+        if not period:
+            return jsonify({"error": "Période introuvable"}), 404
+        stats = dict(_grade_stats_cache.get_or_compute(_adapter, period))
+        if request.args.get('trend', '').lower() in ('1', 'true', 'yes'):
+            trend = []
+            previous: dict[str, Optional[float]] = {}
+            for p in _adapter.get_periods():
+                try:
+                    period_stats = _grade_stats_cache.get_or_compute(_adapter, p)
+                except Exception:
+                    continue
+                current = {s["subject"]["id"]: s["average"] for s in period_stats["subjects"]}
+                trend.append({
+                    "period": period_stats["period"],
+                    "overall_average": period_stats["overall_average"],
+                    "subjects": {
+                        sid: {
+                            "average": avg,
+                            "delta": round(avg - previous[sid], 2) if avg is not None and previous.get(sid) is not None else None,
+                        }
+                        for sid, avg in current.items()
+                    },
+                })
+                previous = current
+            stats["trend"] = trend
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/history', methods=['GET'])
+def history():
+    """Notes, moyennes, absences, retards de toutes les périodes en un appel, chargés en parallèle."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    requested = request.args.get('resources')
+    resources = [r.strip() for r in requested.split(',') if r.strip()] if requested else list(HISTORY_RESOURCES)
+    unknown = sorted(set(resources) - set(HISTORY_RESOURCES))
+    if unknown:
+        return jsonify({"error": f"Ressources inconnues: {', '.join(unknown)}"}), 400
+    try:
+        return jsonify(_period_history.load(_adapter, list(_adapter.get_periods()), list(dict.fromkeys(resources))))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -695,10 +6151,15 @@ def averages():
         if not period:
             return jsonify([])
         try:
-            avgs = period.averages
+            avgs = _adapter.get_period_averages(period)
             return jsonify([average_to_dict(a) for a in avgs])
+        except UPSTREAM_UNAVAILABLE:
+            raise
         except Exception:
+            # Période aux données pronotepy inexploitables : liste vide.
             return jsonify([])
+    except UPSTREAM_UNAVAILABLE as e:
+        return _unavailable_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -708,17 +6169,44 @@ def discussions():
         return jsonify({"error": "Non connecté"}), 401
     try:
         ds = _adapter.get_discussions()
-        return jsonify([discussion_to_dict(d) for d in ds])
+        payload = [discussion_to_dict(d) for d in ds]
+        _search_index.index_discussions(payload)
+        return jsonify(payload)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/search', methods=['GET'])
+def search():
+    """Recherche dans les messages, informations et devoirs déjà chargés."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    query = request.args.get('q', '').strip()
+    try:
+        limit = max(1, min(100, int(request.args.get('limit', 20))))
+    except ValueError:
+        limit = 20
+    kinds = {k.strip() for k in request.args.get('kind', '').split(',') if k.strip()} or None
+    started = time.perf_counter()
+    result = _search_index.search(query, limit=limit, kinds=kinds)
+    return jsonify({"query": query, **result, "took_ms": round((time.perf_counter() - started) * 1000, 3)})
+
+
 @app.route('/api/recipients', methods=['GET'])
 def recipients():
     if not _adapter.is_logged_in():
         return jsonify({"error": "Non connecté"}), 401
     try:
-        recs = _adapter.get_recipients()
+        query = request.args.get('q', '').strip()
+        limit_arg = request.args.get('limit')
+        if query or limit_arg:
+            try:
+                limit = max(1, min(500, int(limit_arg or 50)))
+            except ValueError:
+                limit = 50
+            recs = _adapter.search_recipients(query, limit)
+        else:
+            recs = _adapter.get_recipients()
         return jsonify([recipient_to_dict(r) for r in recs])
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -795,7 +6283,9 @@ def informations():
         return jsonify({"error": "Non connecté"}), 401
     try:
         infos = _adapter.get_informations()
-        return jsonify([info_to_dict(i) for i in infos])
+        payload = [info_to_dict(i) for i in infos]
+        _search_index.index_informations(payload)
+        return jsonify(payload)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -813,6 +6303,24 @@ def information_mark_read(information_id: str):
         return jsonify({"updated": False, "error": str(e)}), 500
 
 
+@app.route('/api/counters', methods=['GET'])
+def counters():
+    """Compteurs des badges : discussions et informations non lues, devoirs à faire."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    try:
+        days = min(max(int(request.args.get('days', 7)), 0), 60)
+        payload = dict(_adapter.get_counters(days))
+        payload["days"] = days
+        response = jsonify(payload)
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    except ValueError:
+        return jsonify({"error": "Paramètre days invalide"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/menus', methods=['GET'])
 def menus():
     if not _adapter.is_logged_in():
@@ -822,8 +6330,8 @@ def menus():
         date_to_str = request.args.get('to')
         date_from = datetime.date.fromisoformat(date_from_str) if date_from_str else datetime.date.today()
         date_to = datetime.date.fromisoformat(date_to_str) if date_to_str else date_from + datetime.timedelta(days=6)
-        data = _adapter.get_menus(date_from, date_to)
-        return jsonify([menu_to_dict(m) for m in data])
+        _menus, payload = _adapter.read_normalized("get_menus", date_from, date_to)
+        return jsonify(menu_rows(payload))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -846,6 +6354,99 @@ def export_ical():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _active_account_key() -> Optional[str]:
+    account = _accounts.find(_adapter)
+    return account.search_key if account is not None else None
+
+@app.route('/api/export/ical/subscription', methods=['GET', 'POST', 'DELETE'])
+def ical_subscription():
+    """Abonnement iCal du compte actif : état (GET), nouveau jeton (POST), révocation (DELETE)."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    account_key = _active_account_key()
+    if account_key is None:
+        return jsonify({"error": "Compte actif introuvable"}), 409
+    try:
+        if request.method == 'POST':
+            token = _ical_subscriptions.create(account_key)
+            url = request.host_url.rstrip('/') + f"/api/export/ical/feed/{token}.ics"
+            return jsonify({"active": True, "url": url, **(_ical_subscriptions.status(account_key) or {})}), 201
+        if request.method == 'DELETE':
+            return jsonify({"active": False, "revoked": _ical_subscriptions.revoke(account_key)})
+        status = _ical_subscriptions.status(account_key)
+        return jsonify({"active": status is not None, "created": status.get("created") if status else None})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/ical/feed/<token>.ics', methods=['GET'])
+def ical_feed(token):
+    """Flux d'abonnement : authentifié par le jeton, 304 tant qu'aucun cours n'a changé."""
+    account_key = _ical_subscriptions.resolve(token)
+    if account_key is None:
+        return jsonify({"error": "Abonnement inconnu"}), 404
+    try:
+        calendar = _ical_subscriptions.calendar(account_key)
+        window = _ical_subscriptions.window()
+        if calendar.stale(window, float(_ical_subscriptions.settings["refresh_seconds"])):
+            adapter = _adapter_for_account(account_key)
+            if adapter is not None:
+                # Interrogations périodiques des agendas : jamais devant les clics.
+                with upstream_priority("background"):
+                    calendar.update(window, adapter.get_lessons(*window))
+        rendered = calendar.render()
+        if rendered is None:
+            response = jsonify({"error": "Compte déconnecté, calendrier pas encore disponible"})
+            response.status_code = 503
+            response.headers["Retry-After"] = "600"
+            return response
+        body, etag, modified = rendered
+        response = Response(body, mimetype="text/calendar")
+        response.set_etag(etag)
+        response.last_modified = datetime.datetime.fromtimestamp(int(modified), datetime.timezone.utc)
+        response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/archive', methods=['GET'])
+def export_archive():
+    """Export complet du compte, envoyé au fil du chargement (NDJSON ou zip de fichiers JSON)."""
+    if not _adapter.is_logged_in():
+        return jsonify({"error": "Non connecté"}), 401
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'zip'):
+        return jsonify({"error": "Format invalide (ndjson ou zip)"}), 400
+    requested = request.args.get('include')
+    sections = [s.strip() for s in requested.split(',') if s.strip()] if requested else list(ARCHIVE_SECTIONS)
+    unknown = sorted(set(sections) - set(ARCHIVE_SECTIONS))
+    if unknown:
+        return jsonify({"error": f"Sections inconnues: {', '.join(unknown)}"}), 400
+    try:
+        date_from = datetime.date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        date_to = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"error": "Date invalide"}), 400
+    try:
+        periods, tasks = archive_tasks(_adapter, sections, date_from, date_to)
+        job = _archive_exporter.create_job(fmt, len(tasks))
+        stamp = datetime.date.today().isoformat()
+        headers = {"X-Archive-Id": job.id, "X-Archive-Total": str(job.total), "Cache-Control": "no-store"}
+        if fmt == 'zip':
+            headers["Content-Disposition"] = f"attachment; filename=pronote-archive-{stamp}.zip"
+            return Response(_archive_exporter.zip(job, periods, tasks), mimetype="application/zip", headers=headers)
+        headers["Content-Disposition"] = f"attachment; filename=pronote-archive-{stamp}.ndjson"
+        return Response(_archive_exporter.ndjson(job, periods, tasks), mimetype="application/x-ndjson", headers=headers)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/archive/<job_id>', methods=['GET'])
+def export_archive_progress(job_id):
+    """Avancement d'un export en cours (utile pour le zip, qui ne porte pas de lignes de progression)."""
+    job = _archive_exporter.job(job_id)
+    if job is None:
+        return jsonify({"error": "Export inconnu"}), 404
+    return jsonify(job.to_dict())
+
 @app.route('/api/absences', methods=['GET'])
 def absences():
     if not _adapter.is_logged_in():
@@ -859,21 +6460,14 @@ def absences():
         if not period:
             return jsonify([])
         try:
-            abs_list = period.absences
-            result = []
-            for a in abs_list:
-                result.append({
-                    "id": str(a.id) if hasattr(a, 'id') else str(id(a)),
-                    "from_date": a.from_date.isoformat() if hasattr(a, 'from_date') and a.from_date else "",
-                    "to_date": a.to_date.isoformat() if hasattr(a, 'to_date') and a.to_date else "",
-                    "justified": bool(a.justified) if hasattr(a, 'justified') else False,
-                    "hours": str(a.hours) if hasattr(a, 'hours') else "0",
-                    "days": int(a.days) if hasattr(a, 'days') else 0,
-                    "reasons": list(a.reasons) if hasattr(a, 'reasons') else [],
-                })
-            return jsonify(result)
+            return jsonify([absence_to_dict(a) for a in _adapter.get_period_absences(period)])
+        except UPSTREAM_UNAVAILABLE:
+            raise
         except Exception:
+            # Période aux données pronotepy inexploitables : liste vide.
             return jsonify([])
+    except UPSTREAM_UNAVAILABLE as e:
+        return _unavailable_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -890,48 +6484,44 @@ def delays():
         if not period:
             return jsonify([])
         try:
-            dl = period.delays
-            result = []
-            for d in dl:
-                result.append({
-                    "id": str(d.id) if hasattr(d, 'id') else str(id(d)),
-                    "date": d.date.isoformat() if hasattr(d, 'date') and d.date else "",
-                    "minutes": int(d.minutes) if hasattr(d, 'minutes') else 0,
-                    "justified": bool(d.justified) if hasattr(d, 'justified') else False,
-                    "justification": str(d.justification) if hasattr(d, 'justification') else "",
-                    "reasons": list(d.reasons) if hasattr(d, 'reasons') else [],
-                })
-            return jsonify(result)
+            return jsonify([delay_to_dict(d) for d in _adapter.get_period_delays(period)])
+        except UPSTREAM_UNAVAILABLE:
+            raise
         except Exception:
+            # Période aux données pronotepy inexploitables : liste vide.
             return jsonify([])
+    except UPSTREAM_UNAVAILABLE as e:
+        return _unavailable_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/notify', methods=['POST'])
 def notify():
-    """Envoie une notification desktop via libnotify (notify-send)."""
+    """Met une notification desktop en file ; livrée en arrière-plan (D-Bus ou notify-send)."""
     try:
         data = request.get_json() or {}
         title = str(data.get('title', 'Pronote Desktop'))[:100]
         body = str(data.get('body', ''))[:300]
         urgency = data.get('urgency', 'normal')
-        if urgency not in ('low', 'normal', 'critical'):
-            urgency = 'normal'
-        result = subprocess.run(
-            ['notify-send', '-a', 'Pronote Desktop', '-u', urgency, '--', title, body],
-            capture_output=True, timeout=5
-        )
-        return jsonify({"sent": result.returncode == 0})
-    except FileNotFoundError:
-        return jsonify({"sent": False, "error": "notify-send not available"}), 200
+        key = data.get('key')
+        notification_id, status = _notifier.submit(title, body, urgency, str(key) if key is not None else None)
+        return jsonify({"queued": status == "queued", "id": notification_id, "status": status}), 202
     except Exception as e:
-        return jsonify({"sent": False, "error": str(e)}), 200
+        return jsonify({"queued": False, "error": str(e)}), 200
+
+
+@app.route('/api/notify/<notification_id>', methods=['GET'])
+def notify_status(notification_id: str):
+    status = _notifier.status(notification_id)
+    if status is None:
+        return jsonify({"error": "Notification inconnue"}), 404
+    return jsonify({"id": notification_id, "status": status})
 
 
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """Retourne la configuration publique (sans secrets)."""
-    cfg = load_config()
+    cfg = config_manager.get()
     return jsonify({"api_port": cfg.get('api_port', 5174), "theme": cfg.get('theme', 'light')})
 
 
@@ -941,14 +6531,10 @@ def patch_config():
     try:
         updates = request.get_json() or {}
         allowed = {'theme'}
-        cfg = load_config()
-        for k, v in updates.items():
-            if k in allowed:
-                cfg[k] = v
-        os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(cfg, f, indent=2)
+        config_manager.update({k: v for k, v in updates.items() if k in allowed})
         return jsonify({"updated": True})
+    except ConfigError as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -959,5 +6545,13 @@ if __name__ == '__main__':
     # Valeur par défaut : 127.0.0.1 (local uniquement)
     # Pour accès LAN/WAN : définir "api_host": "0.0.0.0"
     host = CONFIG.get('api_host', '127.0.0.1')
-    print(f"Pronote Desktop API v1.7.13 — http://{host}:{port}")
-    app.run(host=host, port=port, debug=False)
+    config_manager.start_watching()
+    from werkzeug.serving import make_server
+
+    # Le socket est ouvert avant tout import pronotepy : /api/health répond aussitôt.
+    server = make_server(host, port, app, threaded=True)
+    _startup.mark("listening")
+    if STARTUP_MODE == "warm":
+        threading.Thread(target=_warm_pronotepy, name="pronotepy-warmup", daemon=True).start()
+    print(f"Pronote Desktop API v1.7.13 — http://{host}:{port} (démarrage {STARTUP_MODE})")
+    server.serve_forever()
@@ -1,8 +1,9 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { NavLink, useNavigate } from 'react-router-dom';
 import { ChevronRight, LogOut, User, X } from 'lucide-react';
 import { useAuthStore } from '../../lib/store/authStore';
-import { setClient } from '../../lib/pronote/client';
+import { getClient, setClient } from '../../lib/pronote/client';
+import type { Counters } from '../../types/pronote';
 
 // ─── Icônes SVG colorées personnalisées ─────────────────────────────────────
 
@@ -210,8 +211,8 @@ const menuItems: MenuItem[] = [
     icon: <IconMessage />,
     children: [
       { id: 'casier', label: 'Casier numérique', icon: <IconBriefcase />, path: '/casier' },
-      { id: 'informations', label: 'Informations & sondages', icon: <IconBell />, path: '/informations', badge: 4 },
-      { id: 'discussions', label: 'Discussions', icon: <IconMessage />, path: '/messaging', badge: 2 },
+      { id: 'informations', label: 'Informations & sondages', icon: <IconBell />, path: '/informations' },
+      { id: 'discussions', label: 'Discussions', icon: <IconMessage />, path: '/messaging' },
       { id: 'nouveau-message', label: 'Nouveau message', icon: <IconMessage />, path: '/messaging/new' },
     ],
   },
@@ -223,6 +224,22 @@ const menuItems: MenuItem[] = [
   },
 ];
 
+// Badges alimentés par /api/counters (simples compteurs, interrogés périodiquement).
+const COUNTERS_POLL_MS = 60_000;
+
+function withBadges(items: MenuItem[], counters: Counters | null): MenuItem[] {
+  if (!counters) return items;
+  const badges: Record<string, number> = {
+    informations: counters.informations_unread,
+    discussions: counters.discussions_unread,
+  };
+  return items.map((item) => ({
+    ...item,
+    badge: badges[item.id] ?? item.badge,
+    children: item.children ? withBadges(item.children, counters) : undefined,
+  }));
+}
+
 // ─── Composant SidebarItem ────────────────────────────────────────────────────
 
 interface SidebarProps {
@@ -294,6 +311,22 @@ const SidebarItem: React.FC<{ item: MenuItem; depth?: number }> = ({ item, depth
 const Sidebar: React.FC<SidebarProps> = ({ isOpen, onToggle }) => {
   const navigate = useNavigate();
   const { clientInfo, logout } = useAuthStore();
+  const [counters, setCounters] = useState<Counters | null>(null);
+
+  useEffect(() => {
+    if (!clientInfo) return;
+    let cancelled = false;
+    const refresh = async () => {
+      const next = await getClient()?.getCounters();
+      if (!cancelled && next) setCounters(next);
+    };
+    refresh();
+    const timer = window.setInterval(refresh, COUNTERS_POLL_MS);
+    return () => {
+      cancelled = true;
+      window.clearInterval(timer);
+    };
+  }, [clientInfo]);
 
   const handleLogout = () => {
     logout();
@@ -363,7 +396,7 @@ const Sidebar: React.FC<SidebarProps> = ({ isOpen, onToggle }) => {
 
         {/* Menu de navigation */}
         <nav className="flex-1 overflow-y-auto p-3 space-y-0.5 scrollbar-thin scrollbar-thumb-blue-600 scrollbar-track-transparent">
-          {menuItems.map((item) => (
+          {withBadges(menuItems, counters).map((item) => (
             <SidebarItem key={item.id} item={item} />
           ))}
         </nav>
@@ -8,7 +8,9 @@ import type { AxiosInstance } from 'axios';
 import type {
   Lesson, Homework, Grade, Average, Period,
   Absence, Delay, Discussion, Information,
-  ClientInfo, PronoteCredentials, Recipient, MenuEntry
+  ClientInfo, PronoteCredentials, Recipient, MenuEntry, GradeStats,
+  SearchResult, FreeSlot, Attachment, Counters, Account,
+  HistoryResource, PeriodHistory
 } from '../../types/pronote';
 
 // ─── URL de l'API : compatible navigateur + Electron packagé ─────────────────
@@ -23,6 +25,18 @@ function resolveApiBase(): string {
 
 const API_BASE = resolveApiBase();
 
+// Les fichiers passent par le proxy du backend (/api/files/<id>) : on rend
+// l'URL absolue pour qu'elle fonctionne aussi depuis file://.
+function toAttachment(f: Record<string, unknown>): Attachment {
+  const url = String(f.url || '');
+  return {
+    id: String(f.id || ''),
+    name: String(f.name || 'fichier'),
+    type: f.type === 0 ? 0 : 1,
+    url: url.startsWith('/api/') ? API_BASE + url.slice(4) : url,
+  };
+}
+
 // ─── Helpers de parsing des dates ISO ─────────────────────────────────────────
 function parseDate(s: string | null | undefined): Date {
   if (!s) return new Date();
@@ -33,6 +47,35 @@ function parseDate(s: string | null | undefined): Date {
   }
 }
 
+// ─── Format colonnaire (?format=columnar) ──────────────────────────────────────
+// Une liste par colonne ; les colonnes présentes dans `tables` contiennent des
+// index vers des valeurs internées (matières, périodes, enseignants…).
+interface ColumnarPayload {
+  format: 'columnar';
+  version: number;
+  count: number;
+  columns: Record<string, unknown[]>;
+  tables: Record<string, unknown[]>;
+}
+
+function decodeRows(data: unknown): Record<string, unknown>[] | null {
+  if (Array.isArray(data)) return data as Record<string, unknown>[];
+  if (!data || typeof data !== 'object' || (data as { format?: unknown }).format !== 'columnar') return null;
+  const { count, columns, tables } = data as ColumnarPayload;
+  const keys = Object.keys(columns);
+  const rows: Record<string, unknown>[] = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const row: Record<string, unknown> = {};
+    for (const key of keys) {
+      const value = columns[key][i];
+      const table = tables[key];
+      row[key] = table ? table[value as number] : value;
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
 // ─── Classe principale ────────────────────────────────────────────────────────
 export class PronoteClient {
   private http: AxiosInstance;
@@ -82,9 +125,9 @@ export class PronoteClient {
     try {
       const from = this.formatDate(dateFrom);
       const to = this.formatDate(dateTo || new Date(dateFrom.getTime() + 6 * 24 * 60 * 60 * 1000));
-      const resp = await this.http.get(`/timetable?from=${from}&to=${to}`);
-      const data = resp.data;
-      if (!Array.isArray(data)) return this.getFallbackLessons();
+      const resp = await this.http.get(`/timetable?from=${from}&to=${to}&format=columnar`);
+      const data = decodeRows(resp.data);
+      if (!data) return this.getFallbackLessons();
       return data.map((l: Record<string, unknown>) => ({
         ...(Array.isArray(l.teacher_names)
           ? {
@@ -134,6 +177,41 @@ export class PronoteClient {
     }
   }
 
+  // Créneaux libres d'une ressource (sinon de mes cours) sur une plage de dates.
+  async getFreeSlots(
+    dateFrom: Date,
+    dateTo: Date,
+    options: { teacher?: string; room?: string; group?: string; minMinutes?: number } = {},
+  ): Promise<FreeSlot[]> {
+    try {
+      const params = new URLSearchParams({ from: this.formatDate(dateFrom), to: this.formatDate(dateTo) });
+      if (options.teacher) params.set('teacher', options.teacher);
+      if (options.room) params.set('room', options.room);
+      if (options.group) params.set('group', options.group);
+      if (options.minMinutes) params.set('min_minutes', String(options.minMinutes));
+      const resp = await this.http.get(`/timetable/free-slots?${params.toString()}`);
+      return Array.isArray(resp.data?.slots) ? (resp.data.slots as FreeSlot[]) : [];
+    } catch (error) {
+      console.error('[getFreeSlots] Erreur:', error);
+      return [];
+    }
+  }
+
+  async getFreeRooms(at: Date, minMinutes = 55): Promise<{ free: string[]; busy: string[] }> {
+    try {
+      const pad = (n: number) => String(n).padStart(2, '0');
+      const local = `${this.formatDate(at)}T${pad(at.getHours())}:${pad(at.getMinutes())}`;
+      const resp = await this.http.get(`/timetable/free-slots?at=${local}&min_minutes=${minMinutes}`);
+      return {
+        free: Array.isArray(resp.data?.free_rooms) ? resp.data.free_rooms.map(String) : [],
+        busy: Array.isArray(resp.data?.busy_rooms) ? resp.data.busy_rooms.map(String) : [],
+      };
+    } catch (error) {
+      console.error('[getFreeRooms] Erreur:', error);
+      return { free: [], busy: [] };
+    }
+  }
+
   private getFallbackLessons(): Lesson[] {
     const today = new Date();
     const monday = new Date(today);
@@ -176,7 +254,7 @@ export class PronoteClient {
         description: String(h.description || ''),
         done: Boolean(h.done),
         date: parseDate(String(h.date || '')),
-        files: [],
+        files: Array.isArray(h.files) ? (h.files as Record<string, unknown>[]).map(toAttachment) : [],
       }));
     } catch (error) {
       console.error('[getHomework] Erreur:', error);
@@ -252,36 +330,73 @@ export class PronoteClient {
   // ─── Notes ─────────────────────────────────────────────────────────────────
   async getGrades(period: Period): Promise<Grade[]> {
     try {
-      const resp = await this.http.get(`/grades?${this.buildPeriodQuery(period)}`);
-      const data = resp.data;
-      if (!Array.isArray(data) || data.length === 0) return this.getFallbackGrades(period);
-      return data.map((g: Record<string, unknown>) => ({
-        id: String(g.id || ''),
-        grade: String(g.grade || '—'),
-        out_of: String(g.out_of || '20'),
-        default_out_of: String(g.default_out_of || '20'),
-        date: parseDate(String(g.date || '')),
-        subject: g.subject ? {
-          id: String((g.subject as Record<string, unknown>).id || ''),
-          name: String((g.subject as Record<string, unknown>).name || 'Matière'),
-          groups: false,
-        } : { id: '', name: 'Matière', groups: false },
-        period,
-        average: String(g.average || ''),
-        max: String(g.max || ''),
-        min: String(g.min || ''),
-        coefficient: String(g.coefficient || '1'),
-        comment: String(g.comment || ''),
-        is_bonus: Boolean(g.is_bonus),
-        is_optionnal: Boolean(g.is_optionnal),
-        is_out_of_20: Boolean(g.is_out_of_20),
-      }));
+      const resp = await this.http.get(`/grades?${this.buildPeriodQuery(period)}&format=columnar`);
+      const data = decodeRows(resp.data);
+      if (!data || data.length === 0) return this.getFallbackGrades(period);
+      return data.map((g: Record<string, unknown>) => this.toGrade(g, period));
     } catch (error) {
       console.error('[getGrades] Erreur:', error);
       return this.getFallbackGrades(period);
     }
   }
 
+  private toGrade(g: Record<string, unknown>, period: Period): Grade {
+    return {
+      id: String(g.id || ''),
+      grade: String(g.grade || '—'),
+      out_of: String(g.out_of || '20'),
+      default_out_of: String(g.default_out_of || '20'),
+      date: parseDate(String(g.date || '')),
+      subject: g.subject ? {
+        id: String((g.subject as Record<string, unknown>).id || ''),
+        name: String((g.subject as Record<string, unknown>).name || 'Matière'),
+        groups: false,
+      } : { id: '', name: 'Matière', groups: false },
+      period,
+      average: String(g.average || ''),
+      max: String(g.max || ''),
+      min: String(g.min || ''),
+      coefficient: String(g.coefficient || '1'),
+      comment: String(g.comment || ''),
+      is_bonus: Boolean(g.is_bonus),
+      is_optionnal: Boolean(g.is_optionnal),
+      is_out_of_20: Boolean(g.is_out_of_20),
+    };
+  }
+
+  // Toutes les périodes en un appel : le serveur les charge en parallèle et
+  // garde en cache celles qui sont closes.
+  async getHistory(resources: HistoryResource[] = ['grades']): Promise<PeriodHistory[]> {
+    try {
+      const resp = await this.http.get(`/history?resources=${resources.join(',')}`);
+      const order: string[] = Array.isArray(resp.data?.order) ? resp.data.order : [];
+      const entries = (resp.data?.periods ?? {}) as Record<string, Record<string, unknown>>;
+      return order.filter((id) => entries[id]).map((id) => {
+        const entry = entries[id];
+        const raw = (entry.period ?? {}) as Record<string, unknown>;
+        const period: Period = {
+          id: String(raw.id || ''),
+          name: String(raw.name || ''),
+          start: parseDate(String(raw.start || '')),
+          end: parseDate(String(raw.end || '')),
+        };
+        const rows = (key: HistoryResource) => (Array.isArray(entry[key]) ? (entry[key] as Record<string, unknown>[]) : []);
+        return {
+          period,
+          closed: Boolean(entry.closed),
+          grades: rows('grades').map((g) => this.toGrade(g, period)),
+          averages: rows('averages').map((a) => this.toAverage(a)),
+          absences: rows('absences').map((a) => this.toAbsence(a)),
+          delays: rows('delays').map((d) => this.toDelay(d)),
+          errors: (entry.errors ?? {}) as Record<string, string>,
+        };
+      });
+    } catch (error) {
+      console.error('[getHistory] Erreur:', error);
+      return [];
+    }
+  }
+
   private getFallbackGrades(period: Period): Grade[] {
     const makeDate = (m: number, d: number) => new Date(2025, m - 1, d);
     const maths = { id: '1', name: 'MATHÉMATIQUES', groups: false };
@@ -293,31 +408,47 @@ export class PronoteClient {
     ];
   }
 
+  // Moyennes pondérées calculées côté serveur (bonus / facultatives, sur 20).
+  async getGradeStats(period: Period, withTrend = false): Promise<GradeStats | null> {
+    try {
+      const trend = withTrend ? '&trend=1' : '';
+      const resp = await this.http.get(`/grades/stats?${this.buildPeriodQuery(period)}${trend}`);
+      return resp.data && typeof resp.data === 'object' ? (resp.data as GradeStats) : null;
+    } catch (error) {
+      console.error('[getGradeStats] Erreur:', error);
+      return null;
+    }
+  }
+
   async getAverages(period: Period): Promise<Average[]> {
     try {
       const resp = await this.http.get(`/averages?${this.buildPeriodQuery(period)}`);
       const data = resp.data;
       if (!Array.isArray(data) || data.length === 0) return this.getFallbackAverages();
-      return data.map((a: Record<string, unknown>) => ({
-        student: String(a.student || '—'),
-        class_average: String(a.class_average || '—'),
-        max: String(a.max || '—'),
-        min: String(a.min || '—'),
-        out_of: String(a.out_of || '20'),
-        default_out_of: String(a.default_out_of || '20'),
-        subject: a.subject ? {
-          id: String((a.subject as Record<string, unknown>).id || ''),
-          name: String((a.subject as Record<string, unknown>).name || 'Matière'),
-          groups: false,
-        } : { id: '', name: 'Matière', groups: false },
-        background_color: String(a.background_color || '#4a90d9'),
-      }));
+      return data.map((a: Record<string, unknown>) => this.toAverage(a));
     } catch (error) {
       console.error('[getAverages] Erreur:', error);
       return this.getFallbackAverages();
     }
   }
 
+  private toAverage(a: Record<string, unknown>): Average {
+    return {
+      student: String(a.student || '—'),
+      class_average: String(a.class_average || '—'),
+      max: String(a.max || '—'),
+      min: String(a.min || '—'),
+      out_of: String(a.out_of || '20'),
+      default_out_of: String(a.default_out_of || '20'),
+      subject: a.subject ? {
+        id: String((a.subject as Record<string, unknown>).id || ''),
+        name: String((a.subject as Record<string, unknown>).name || 'Matière'),
+        groups: false,
+      } : { id: '', name: 'Matière', groups: false },
+      background_color: String(a.background_color || '#4a90d9'),
+    };
+  }
+
   private getFallbackAverages(): Average[] {
     return [
       { student: '15,33', class_average: '11,5', max: '18', min: '4', out_of: '20', default_out_of: '20', subject: { id: '1', name: 'MATHÉMATIQUES', groups: false }, background_color: '#4a90d9' },
@@ -392,9 +523,27 @@ export class PronoteClient {
     }
   }
 
-  async getRecipients(): Promise<Recipient[]> {
+  // Recherche dans les messages, informations et devoirs déjà consultés.
+  async search(query: string, limit = 20): Promise<SearchResult[]> {
+    if (!query.trim()) return [];
+    try {
+      const params = new URLSearchParams({ q: query, limit: String(limit) });
+      const resp = await this.http.get(`/search?${params.toString()}`);
+      return Array.isArray(resp.data?.results) ? (resp.data.results as SearchResult[]) : [];
+    } catch (error) {
+      console.error('[search] Erreur:', error);
+      return [];
+    }
+  }
+
+  // Sans argument : annuaire complet. Avec `query` : recherche par préfixe (sans accents) côté serveur.
+  async getRecipients(query?: string, limit?: number): Promise<Recipient[]> {
     try {
-      const resp = await this.http.get('/recipients');
+      const params = new URLSearchParams();
+      if (query) params.set('q', query);
+      if (limit) params.set('limit', String(limit));
+      const qs = params.toString();
+      const resp = await this.http.get(qs ? `/recipients?${qs}` : '/recipients');
       const data = resp.data;
       if (!Array.isArray(data)) return [];
       return data.map((r: Record<string, unknown>) => ({
@@ -422,6 +571,52 @@ export class PronoteClient {
     }
   }
 
+  // ─── Compteurs (badges) ────────────────────────────────────────────────────
+  // Non lus et devoirs à faire, sans charger ni sérialiser les listes complètes.
+  async getCounters(days = 7): Promise<Counters | null> {
+    try {
+      // Polling de fond : l'ordonnanceur du backend le sert après les clics.
+      const resp = await this.http.get(`/counters?days=${days}`, {
+        headers: { 'X-Pronote-Priority': 'prefetch' },
+      });
+      return resp.data && typeof resp.data === 'object' ? (resp.data as Counters) : null;
+    } catch (error) {
+      console.error('[getCounters] Erreur:', error);
+      return null;
+    }
+  }
+
+  // ─── Comptes multiples ─────────────────────────────────────────────────────
+  // Les comptes déjà connectés restent ouverts côté serveur et synchronisés en
+  // arrière-plan : basculer de l'un à l'autre ne redemande pas de connexion.
+  async getAccounts(): Promise<Account[]> {
+    try {
+      const resp = await this.http.get('/accounts');
+      return Array.isArray(resp.data) ? (resp.data as Account[]) : [];
+    } catch (error) {
+      console.error('[getAccounts] Erreur:', error);
+      return [];
+    }
+  }
+
+  async activateAccount(accountId: string): Promise<boolean> {
+    try {
+      const resp = await this.http.post(`/accounts/${encodeURIComponent(accountId)}/activate`);
+      if (!resp.data?.success) return false;
+      const ci = resp.data.client_info || {};
+      this.clientInfo = {
+        name: ci.name || 'Professeur',
+        establishment: ci.establishment || '',
+        class_name: ci.class_name || null,
+        profile_picture_url: ci.profile_picture_url || null,
+      };
+      return true;
+    } catch (error) {
+      console.error('[activateAccount] Erreur:', error);
+      return false;
+    }
+  }
+
   // ─── Informations & Sondages ───────────────────────────────────────────────
   async getInformations(): Promise<Information[]> {
     try {
@@ -487,6 +682,34 @@ export class PronoteClient {
     }
   }
 
+  // Export complet du compte, produit par le serveur au fil du chargement :
+  // un lien direct laisse le navigateur écrire le fichier sans le garder en mémoire.
+  archiveUrl(format: 'zip' | 'ndjson' = 'zip'): string {
+    return `${API_BASE}/export/archive?format=${format}`;
+  }
+
+  // URL d'abonnement stable pour les agendas (Thunderbird, GNOME Agenda…).
+  // Elle n'est renvoyée qu'à la création : un nouvel appel révoque l'ancienne.
+  async createIcalSubscription(): Promise<string | null> {
+    try {
+      const resp = await this.http.post('/export/ical/subscription');
+      return typeof resp.data?.url === 'string' ? resp.data.url : null;
+    } catch (error) {
+      console.error('[createIcalSubscription] Erreur:', error);
+      return null;
+    }
+  }
+
+  async revokeIcalSubscription(): Promise<boolean> {
+    try {
+      await this.http.delete('/export/ical/subscription');
+      return true;
+    } catch (error) {
+      console.error('[revokeIcalSubscription] Erreur:', error);
+      return false;
+    }
+  }
+
   async getLessonContent(lessonId: string): Promise<string> {
     try {
       const resp = await this.http.get(`/lessons/${encodeURIComponent(lessonId)}/content`);
@@ -503,40 +726,48 @@ export class PronoteClient {
       const resp = await this.http.get(`/absences?${this.buildPeriodQuery(period)}`);
       const data = resp.data;
       if (!Array.isArray(data)) return [];
-      return data.map((a: Record<string, unknown>) => ({
-        id: String(a.id || ''),
-        from_date: parseDate(String(a.from_date || '')),
-        to_date: parseDate(String(a.to_date || '')),
-        justified: Boolean(a.justified),
-        hours: String(a.hours || '0'),
-        days: Number(a.days || 0),
-        reasons: Array.isArray(a.reasons) ? (a.reasons as string[]) : [],
-      }));
+      return data.map((a: Record<string, unknown>) => this.toAbsence(a));
     } catch (error) {
       console.error('[getAbsences] Erreur:', error);
       return [];
     }
   }
 
+  private toAbsence(a: Record<string, unknown>): Absence {
+    return {
+      id: String(a.id || ''),
+      from_date: parseDate(String(a.from_date || '')),
+      to_date: parseDate(String(a.to_date || '')),
+      justified: Boolean(a.justified),
+      hours: String(a.hours || '0'),
+      days: Number(a.days || 0),
+      reasons: Array.isArray(a.reasons) ? (a.reasons as string[]) : [],
+    };
+  }
+
   async getDelays(period: Period): Promise<Delay[]> {
     try {
       const resp = await this.http.get(`/delays?${this.buildPeriodQuery(period)}`);
       const data = resp.data;
       if (!Array.isArray(data)) return [];
-      return data.map((d: Record<string, unknown>) => ({
-        id: String(d.id || ''),
-        date: parseDate(String(d.date || '')),
-        minutes: Number(d.minutes || 0),
-        justified: Boolean(d.justified),
-        justification: String(d.justification || ''),
-        reasons: Array.isArray(d.reasons) ? (d.reasons as string[]) : [],
-      }));
+      return data.map((d: Record<string, unknown>) => this.toDelay(d));
     } catch (error) {
       console.error('[getDelays] Erreur:', error);
       return [];
     }
   }
 
+  private toDelay(d: Record<string, unknown>): Delay {
+    return {
+      id: String(d.id || ''),
+      date: parseDate(String(d.date || '')),
+      minutes: Number(d.minutes || 0),
+      justified: Boolean(d.justified),
+      justification: String(d.justification || ''),
+      reasons: Array.isArray(d.reasons) ? (d.reasons as string[]) : [],
+    };
+  }
+
   // ─── Utilitaires ───────────────────────────────────────────────────────────
   private formatDate(date: Date): string {
     const y = date.getFullYear();
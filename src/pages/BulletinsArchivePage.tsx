@@ -1,5 +1,5 @@
 import React, { useEffect, useMemo, useState } from 'react';
-import { Archive, ChevronDown, ChevronUp } from 'lucide-react';
+import { Archive, ChevronDown, ChevronUp, Download } from 'lucide-react';
 import { getClient } from '../lib/pronote/client';
 import type { Grade, Period } from '../types/pronote';
 
@@ -91,10 +91,16 @@ const BulletinsArchivePage: React.FC = () => {
 
       setLoading(true);
       try {
-        const periods = await client.getPeriods();
+        // Un seul appel pour toutes les périodes ; repli période par période
+        // (données de démonstration comprises) si l'historique est vide.
+        const history = await client.getHistory(['grades']);
+        const loaded = history.length > 0
+          ? history.map(({ period, grades }) => ({ period, grades }))
+          : await Promise.all(
+            (await client.getPeriods()).map(async (period) => ({ period, grades: await client.getGrades(period) }))
+          );
         const archive = await Promise.all(
-          periods.map(async (period, index) => {
-            const grades = await client.getGrades(period);
+          loaded.map(async ({ period, grades }, index) => {
             const mean = computeMean(grades);
             const subjectMeans = getSubjectMeans(grades);
             const sorted = Array.from(subjectMeans.entries()).sort((a, b) => b[1] - a[1]);
@@ -148,9 +154,20 @@ const BulletinsArchivePage: React.FC = () => {
         <p className="text-sm text-gray-500 mt-1">Historique des périodes avec indicateurs de performance</p>
       </div>
 
-      <div className="bg-white border border-gray-200 rounded-xl shadow-sm p-4 text-sm text-gray-700 inline-flex items-center gap-2">
-        <Archive className="w-4 h-4 text-blue-600" />
-        Moyenne historique globale: <span className="font-semibold text-gray-900">{globalMean}/20</span>
+      <div className="flex flex-wrap items-center gap-3">
+        <div className="bg-white border border-gray-200 rounded-xl shadow-sm p-4 text-sm text-gray-700 inline-flex items-center gap-2">
+          <Archive className="w-4 h-4 text-blue-600" />
+          Moyenne historique globale: <span className="font-semibold text-gray-900">{globalMean}/20</span>
+        </div>
+        {getClient() && (
+          <a
+            href={getClient()!.archiveUrl('zip')}
+            className="bg-white border border-gray-200 rounded-xl shadow-sm p-4 text-sm text-blue-700 hover:bg-blue-50 inline-flex items-center gap-2"
+          >
+            <Download className="w-4 h-4" />
+            Exporter toute l'année (zip)
+          </a>
+        )}
       </div>
 
       {allPeriodsShareSameSnapshot && (
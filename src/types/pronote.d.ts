@@ -64,6 +64,46 @@ export interface Average {
   background_color: string;
 }
 
+export interface SubjectGradeStats {
+  subject: { id: string; name: string };
+  average: number | null; // pondérée, sur 20
+  count: number;
+  min: number;
+  max: number;
+  coefficient_total: number;
+}
+
+export interface GradeStats {
+  count: number;
+  graded: number;
+  excluded: Record<string, number>; // "Abs", "Disp"…
+  overall_average: number | null;
+  subjects: SubjectGradeStats[];
+  histogram: { bins: number[]; counts: number[] };
+  trend?: {
+    period: { id: string; name: string; start: string; end: string };
+    overall_average: number | null;
+    subjects: Record<string, { average: number | null; delta: number | null }>;
+  }[];
+}
+
+export interface SearchResult {
+  id: string;
+  kind: 'message' | 'information' | 'homework';
+  ref_id: string; // discussion, information ou devoir d'origine
+  title: string;
+  date: string;
+  snippet: string;
+  highlights: [number, number][]; // positions dans snippet
+  score: number;
+}
+
+export interface FreeSlot {
+  start: string;
+  end: string;
+  minutes: number;
+}
+
 export interface Period {
   id: string;
   name: string;
@@ -90,6 +130,18 @@ export interface Delay {
   reasons: string[];
 }
 
+export type HistoryResource = 'grades' | 'averages' | 'absences' | 'delays';
+
+export interface PeriodHistory {
+  period: Period;
+  closed: boolean; // terminée : gardée en cache côté serveur
+  grades: Grade[];
+  averages: Average[];
+  absences: Absence[];
+  delays: Delay[];
+  errors: Record<string, string>; // ressource → erreur
+}
+
 export interface Message {
   id: string;
   author: string;
@@ -118,6 +170,25 @@ export interface Information {
   category: string;
 }
 
+export interface Counters {
+  discussions_unread: number;
+  informations_unread: number;
+  homework_pending: number; // non faits, d'ici `days` jours
+  days: number;
+}
+
+export interface Account {
+  id: string;
+  pronote_url: string;
+  username: string;
+  client_info: Partial<ClientInfo>;
+  active: boolean;
+  logged_in: boolean;
+  counters: Omit<Counters, 'days'> | null; // dernière synchronisation d'arrière-plan
+  last_sync: string | null;
+  sync_error: string | null;
+}
+
 export interface Recipient {
   id: string;
   name: string;
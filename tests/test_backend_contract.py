@@ -1,11 +1,22 @@
 import datetime as dt
+import gc
 import importlib
+import importlib.util
+import io
+import json
 import os
 import sys
+import tempfile
+import threading
+import time
 import types
 import unittest
+import warnings
+import zipfile
 from unittest import mock
 
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
 
 def _build_fake_pronotepy_module() -> types.ModuleType:
     """Build a minimal pronotepy module so backend tests are deterministic."""
@@ -65,12 +76,23 @@ def _build_fake_flask_cors_module() -> types.ModuleType:
 def _import_pronote_api(adapter_name: str = "pronotepy-refonte"):
     fake_pronotepy = _build_fake_pronotepy_module()
     fake_flask_cors = _build_fake_flask_cors_module()
+    # Isole config.json, données et cache locaux dans un répertoire jetable.
+    sandbox = tempfile.mkdtemp(prefix="pronote-api-test-")
+    env = {
+        "PRONOTE_BACKEND_ADAPTER": adapter_name,
+        "PRONOTE_CONFIG": os.path.join(sandbox, "config.json"),
+        "PRONOTE_DATA_DIR": os.path.join(sandbox, "data"),
+        "PRONOTE_CACHE_DIR": os.path.join(sandbox, "cache"),
+    }
     with mock.patch.dict(sys.modules, {"pronotepy": fake_pronotepy, "flask_cors": fake_flask_cors}):
-        with mock.patch.dict(os.environ, {"PRONOTE_BACKEND_ADAPTER": adapter_name}, clear=False):
+        with mock.patch.dict(os.environ, env, clear=False):
             if "pronote_api" in sys.modules:
                 del sys.modules["pronote_api"]
             module = importlib.import_module("pronote_api")
-            return importlib.reload(module)
+            module = importlib.reload(module)
+    # Les doubles de test normalisent comme le module qu'ils remplacent.
+    DummyAdapter.normalize = staticmethod(module._normalize_value)
+    return module
 
 
 class DummyAdapter:
@@ -127,6 +149,18 @@ class DummyAdapter:
     def get_periods(self):
         return list(self._periods)
 
+    def get_period_grades(self, period):
+        return list(period.grades)
+
+    def get_period_averages(self, period):
+        return list(period.averages)
+
+    def get_period_absences(self, period):
+        return list(period.absences)
+
+    def get_period_delays(self, period):
+        return list(period.delays)
+
     def get_discussions(self):
         return list(self._discussions)
 
@@ -202,6 +236,10 @@ class DummyAdapter:
     def get_menus(self, date_from, date_to):
         return list(self._menus)
 
+    def read_normalized(self, method, *args):
+        value = getattr(self, method)(*args)
+        return value, self.normalize(value)
+
     def export_ical(self, date_from, date_to):
         return self._ical_payload
 
@@ -326,6 +364,1984 @@ class RefonteAdapterBehaviorTests(unittest.TestCase):
                     adapter.login("https://demo.example/pronote", "demo", "bad")
 
 
+class RefonteClientProbeCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-refonte")
+
+    def _patched_clients(self, calls):
+        class TeacherClientFail:
+            def __init__(self, pronote_url: str, username: str = "", password: str = ""):
+                calls.append("teacher")
+                raise RuntimeError("teacher failure")
+
+        class ClientOk:
+            def __init__(self, pronote_url: str, username: str = "", password: str = ""):
+                calls.append("client")
+                self.logged_in = True
+
+        return mock.patch.multiple(self.api.pronotepy, TeacherClient=TeacherClientFail, Client=ClientOk)
+
+    def test_second_login_tries_remembered_client_first(self):
+        calls = []
+        with self._patched_clients(calls):
+            self.assertTrue(self.api.PronotepyRefonteAdapter().login("https://demo.example/pronote", "eleve", "ok"))
+            self.assertEqual(calls, ["teacher", "client"])
+
+            calls.clear()
+            adapter = self.api.PronotepyRefonteAdapter()
+            self.assertTrue(adapter.login("https://demo.example/pronote", "eleve", "ok"))
+
+        self.assertEqual(calls, ["client"])
+        self.assertEqual(adapter._client_kind, "pronotepy.Client")
+
+    def test_probe_cache_is_scoped_per_account_and_hashes_identifiers(self):
+        calls = []
+        with self._patched_clients(calls):
+            self.api.PronotepyRefonteAdapter().login("https://demo.example/pronote", "eleve", "ok")
+            calls.clear()
+            self.api.PronotepyRefonteAdapter().login("https://demo.example/pronote", "autre", "ok")
+
+        self.assertEqual(calls, ["teacher", "client"])
+        with open(self.api._client_probe_path()) as f:
+            raw = f.read()
+        self.assertNotIn("eleve", raw)
+        self.assertIn("pronotepy.Client", raw)
+
+    def test_race_mode_keeps_first_logged_in_candidate(self):
+        calls = []
+        with self._patched_clients(calls):
+            with mock.patch.dict(os.environ, {"PRONOTE_REFRONTE_RACE_CLIENTS": "1"}, clear=False):
+                adapter = self.api.PronotepyRefonteAdapter()
+                logged = adapter.login("https://demo.example/pronote", "eleve", "ok")
+
+        self.assertTrue(logged)
+        self.assertEqual(sorted(calls), ["client", "teacher"])
+        self.assertEqual(adapter._client_kind, "pronotepy.Client")
+
+
+class UpstreamHttpPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+
+    def test_settings_merge_config_overrides_and_ignore_invalid_values(self):
+        settings = self.api._upstream_http_settings(
+            {"upstream_http": {"pool_maxsize": 32, "read_timeout": "12.5", "max_retries": "beaucoup"}}
+        )
+        self.assertEqual(settings["pool_maxsize"], 32)
+        self.assertEqual(settings["read_timeout"], 12.5)
+        self.assertEqual(settings["max_retries"], self.api.UPSTREAM_HTTP_DEFAULTS["max_retries"])
+
+    def test_attach_is_noop_for_clients_without_http_session(self):
+        pool = self.api.UpstreamHttpPool(self.api.UPSTREAM_HTTP_DEFAULTS)
+        self.assertFalse(pool.attach(types.SimpleNamespace(info=None)))
+        self.assertEqual(pool.stats()["attached_sessions"], 0)
+
+    @unittest.skipUnless(importlib.util.find_spec("requests"), "requests non installé")
+    def test_attach_mounts_shared_adapter_once_per_session(self):
+        import requests
+
+        pool = self.api.UpstreamHttpPool(self.api.UPSTREAM_HTTP_DEFAULTS)
+        first = types.SimpleNamespace(communication=types.SimpleNamespace(session=requests.Session()))
+        second = types.SimpleNamespace(communication=types.SimpleNamespace(session=requests.Session()))
+
+        self.assertTrue(pool.attach(first))
+        self.assertTrue(pool.attach(first))
+        self.assertTrue(pool.attach(second))
+
+        shared = first.communication.session.get_adapter("https://demo.example/")
+        self.assertIs(shared, second.communication.session.get_adapter("https://demo.example/"))
+        self.assertEqual(pool.stats()["attached_sessions"], 2)
+
+    def test_metrics_exposes_upstream_pool_statistics(self):
+        response = self.api.app.test_client().get("/api/metrics")
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertIn("upstream_http", body)
+        self.assertIn("connection_reuse_ratio", body["upstream_http"])
+        self.assertEqual(body["upstream_http"]["settings"]["pool_maxsize"], 16)
+
+
+class FlakyUpstreamAdapter(DummyAdapter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.failing = False
+        self.delay = 0.0
+        self.calls = {"get_lessons": 0, "reply_discussion": 0}
+
+    def get_lessons(self, date_from, date_to):
+        self.calls["get_lessons"] += 1
+        if self.delay:
+            import time
+
+            time.sleep(self.delay)
+        if self.failing:
+            raise ConnectionError("upstream down")
+        return super().get_lessons(date_from, date_to)
+
+    def reply_discussion(self, discussion_id, content):
+        self.calls["reply_discussion"] += 1
+        raise ConnectionError("upstream down")
+
+
+class ResilientAdapterTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.settings = self.api._resilience_settings(
+            {"resilience": {"read_retries": 1, "retry_base_delay": 0.0, "failure_threshold": 2, "reset_timeout": 60}}
+        )
+
+    def test_module_adapter_is_wrapped_by_default(self):
+        self.assertIsInstance(self.api._adapter, self.api.ScheduledAdapter)
+        self.assertIsInstance(self.api._adapter.inner, self.api.ResilientBackendAdapter)
+        self.assertIsInstance(self.api._adapter.inner.inner, self.api.PronotepySyncAdapter)
+
+    def test_reads_are_retried_but_mutations_are_not(self):
+        inner = FlakyUpstreamAdapter(logged_in=True)
+        inner.failing = True
+        adapter = self.api.ResilientBackendAdapter(inner, self.settings)
+
+        with self.assertRaises(ConnectionError):
+            adapter.get_lessons(dt.date(2026, 2, 2), dt.date(2026, 2, 8))
+        with self.assertRaises(ConnectionError):
+            adapter.reply_discussion("d1", "Réponse")
+
+        self.assertEqual(inner.calls, {"get_lessons": 2, "reply_discussion": 1})
+
+    def test_open_breaker_serves_last_known_read_then_fast_fails(self):
+        lesson = types.SimpleNamespace(id="l1")
+        inner = FlakyUpstreamAdapter(logged_in=True, lessons=[lesson])
+        adapter = self.api.ResilientBackendAdapter(inner, self.settings)
+        week = (dt.date(2026, 2, 2), dt.date(2026, 2, 8))
+
+        self.assertEqual(adapter.get_lessons(*week), [lesson])
+        inner.failing = True
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                adapter.get_lessons(dt.date(2026, 3, 2), dt.date(2026, 3, 8))
+        calls_before = inner.calls["get_lessons"]
+
+        self.assertEqual([l.id for l in adapter.get_lessons(*week)], ["l1"])
+        with self.assertRaises(self.api.CircuitOpenError):
+            adapter.get_lessons(dt.date(2026, 3, 2), dt.date(2026, 3, 8))
+        self.assertEqual(inner.calls["get_lessons"], calls_before)
+        self.assertEqual(adapter.health_snapshot()["breaker"]["state"], "open")
+
+    def test_period_reads_fall_back_to_last_known_grades_across_period_instances(self):
+        def period():
+            # pronotepy renvoie de nouvelles instances à chaque get_periods.
+            return types.SimpleNamespace(id="p1", name="Trimestre 1", start=dt.date(2026, 1, 1), end=dt.date(2026, 3, 31), grades=grades)
+
+        grades = [types.SimpleNamespace(id="g1", grade="15", subject=None)]
+        inner = DummyAdapter(logged_in=True)
+        adapter = self.api.ResilientBackendAdapter(inner, self.settings)
+        self.assertEqual([g.id for g in adapter.get_period_grades(period())], ["g1"])
+
+        def down(p):
+            raise ConnectionError("upstream down")
+
+        inner.get_period_grades = down
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                adapter.get_period_grades(types.SimpleNamespace(id="p2", name="Trimestre 2", start=None, end=None))
+
+        stale = adapter.get_period_grades(period())
+        self.assertEqual([(g.id, g.grade) for g in stale], [("g1", "15")])
+        self.assertIsInstance(stale[0], self.api.GradeRecord)
+
+    def test_last_known_reads_are_compacted_off_the_request_thread(self):
+        threads = []
+
+        class Lesson:
+            id = "l1"
+
+            @property
+            def subject(self):
+                threads.append(threading.current_thread().name)
+                return None
+
+        adapter = self.api.ResilientBackendAdapter(FlakyUpstreamAdapter(logged_in=True, lessons=[Lesson()]), self.settings)
+        adapter.get_lessons(dt.date(2026, 2, 2), dt.date(2026, 2, 8))
+        adapter.settle()
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("pronote-compact"))
+        self.assertEqual(adapter.health_snapshot()["stale_entries"], 1)
+
+        adapter.logout()
+        adapter.settle()
+        self.assertEqual(adapter.health_snapshot()["stale_entries"], 0)
+
+    def test_menus_are_normalized_once_and_cached_without_the_raw_result(self):
+        api = self.api
+        menu = {"date": dt.date(2026, 2, 2), "lunch": ["salade", "poulet"]}
+
+        class Menus(api.PronoteBackendAdapter):
+            def is_logged_in(self):
+                return True
+
+            def get_menus(self, date_from, date_to):
+                return [menu]
+
+        adapter = api.ResilientBackendAdapter(Menus(), self.settings)
+        api._adapter = adapter
+        calls = []
+        original = api._normalize_value
+        api._normalize_value = lambda value: calls.append(value) or original(value)
+        try:
+            # Requête servie par un autre thread que l'appel upstream : la forme normalisée suit quand même.
+            body = api.app.test_client().get("/api/menus?from=2026-02-02&to=2026-02-08").get_json()
+            adapter.settle()
+        finally:
+            api._normalize_value = original
+        self.assertEqual(body[0]["date"], "2026-02-02")
+        self.assertEqual(len(calls), 1)
+
+        found, cached = adapter._stale_value(("read_normalized", ("get_menus", dt.date(2026, 2, 2), dt.date(2026, 2, 8))))
+        self.assertTrue(found)
+        self.assertIsNone(cached[0])
+        self.assertEqual(cached[1][0]["lunch"], ["salade", "poulet"])
+
+    def test_period_routes_report_an_unreachable_upstream_as_503(self):
+        state = {"down": True}
+
+        class Period:
+            id, name, start, end = "p1", "Trimestre 1", dt.date(2026, 1, 1), dt.date(2026, 3, 31)
+            delays = absences = averages = []
+
+            @property
+            def grades(self):
+                if state["down"]:
+                    raise ConnectionError("upstream down")
+                raise AttributeError("grades")  # donnée pronotepy inexploitable
+
+        settings = dict(self.settings, failure_threshold=1)
+        self.api._adapter = self.api.ResilientBackendAdapter(DummyAdapter(logged_in=True, periods=[Period()]), settings)
+        client = self.api.app.test_client()
+        self.assertEqual(client.get("/api/grades?period_id=p1").status_code, 503)
+        opened = client.get("/api/grades?period_id=p1")
+        self.assertEqual(opened.status_code, 503)
+        self.assertTrue(opened.get_json()["unavailable"])
+        self.assertGreater(int(opened.headers["Retry-After"]), 50)
+        self.assertEqual(client.get("/api/delays?period_id=p1").status_code, 503)
+
+        state["down"] = False
+        self.api._adapter = self.api.ResilientBackendAdapter(DummyAdapter(logged_in=True, periods=[Period()]), self.settings)
+        response = client.get("/api/grades?period_id=p1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), [])
+
+    def test_logical_error_during_half_open_trial_releases_it(self):
+        inner = FlakyUpstreamAdapter(logged_in=True)
+        adapter = self.api.ResilientBackendAdapter(inner, dict(self.settings, reset_timeout=0.0))
+        inner.failing = True
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                adapter.get_lessons(dt.date(2026, 3, 2), dt.date(2026, 3, 8))
+        inner.failing = False
+
+        def not_connected(*args):
+            raise self.api.AdapterError("Non connecté")
+
+        inner.get_recipients = not_connected
+        with self.assertRaises(self.api.AdapterError):
+            adapter.get_recipients()
+        self.assertEqual(adapter.get_lessons(dt.date(2026, 3, 2), dt.date(2026, 3, 8)), [])
+        self.assertEqual(adapter.health_snapshot()["breaker"]["state"], "closed")
+
+    def test_slow_upstream_is_cut_at_deadline(self):
+        inner = FlakyUpstreamAdapter(logged_in=True)
+        inner.delay = 0.5
+        settings = dict(self.settings, deadlines={"get_lessons": 0.05})
+        adapter = self.api.ResilientBackendAdapter(inner, settings)
+
+        with self.assertRaises(self.api.AdapterTimeoutError):
+            adapter.get_lessons(dt.date(2026, 2, 2), dt.date(2026, 2, 8))
+        self.assertEqual(adapter.health_snapshot()["timeouts"], 1)
+
+    def test_health_reports_breaker_state(self):
+        self.api._adapter = self.api.ResilientBackendAdapter(DummyAdapter(logged_in=True), self.settings)
+        body = self.api.app.test_client().get("/api/health").get_json()
+        self.assertEqual(body["status"], "ok")
+        self.assertEqual(body["upstream"]["breaker"]["state"], "closed")
+
+
+class ConfigManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.path = os.path.join(tempfile.mkdtemp(prefix="pronote-config-test-"), "config.json")
+        self.manager = self.api.ConfigManager(self.path, {"theme": "light", "api_port": 5174})
+
+    def _write(self, payload: str) -> None:
+        with open(self.path, "w") as f:
+            f.write(payload)
+
+    def test_unchanged_file_is_not_reparsed(self):
+        self._write('{"theme": "dark"}')
+        self.assertEqual(self.manager.get()["theme"], "dark")
+        with mock.patch.object(self.manager, "_read_file", wraps=self.manager._read_file) as read_file:
+            self.manager.get()
+            self.manager.get()
+        read_file.assert_not_called()
+
+    def test_external_change_is_picked_up_and_notified(self):
+        self._write('{"theme": "dark"}')
+        self.manager.get()
+        changes = []
+        self.manager.subscribe(lambda previous, current: changes.append((previous["theme"], current["theme"])))
+
+        self._write('{"theme": "light", "api_port": 5175}')
+        self.assertEqual(self.manager.get()["api_port"], 5175)
+        self.assertEqual(changes, [("dark", "light")])
+
+    def test_update_writes_atomically_and_preserves_unknown_keys(self):
+        self._write('{"theme": "light", "api_host": "0.0.0.0"}')
+        with mock.patch.object(self.api.os, "replace", wraps=self.api.os.replace) as replace:
+            self.manager.update({"theme": "dark"})
+        replace.assert_called_once()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"theme": "dark", "api_host": "0.0.0.0"})
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["config.json"])
+
+    def test_update_refuses_to_overwrite_an_invalid_file(self):
+        self._write('{"theme": "dark", "api_host": "0.0.0.0"}')
+        self.assertEqual(self.manager.get()["theme"], "dark")
+
+        self._write('{"theme": "dark", "api_host": ')
+        self.assertEqual(self.manager.get()["api_host"], "0.0.0.0")
+        with self.assertRaises(self.api.ConfigError):
+            self.manager.update({"theme": "light"})
+        with open(self.path) as f:
+            self.assertEqual(f.read(), '{"theme": "dark", "api_host": ')
+
+        self._write('{"theme": "dark", "api_host": "0.0.0.0", "api_port": 5175}')
+        self.manager.update({"theme": "light"})
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"theme": "light", "api_host": "0.0.0.0", "api_port": 5175})
+
+    def test_patch_config_route_rejects_an_invalid_file(self):
+        self._write("[1, 2]")
+        with mock.patch.object(self.api, "config_manager", self.manager):
+            response = self.api.app.test_client().patch("/api/config", json={"theme": "dark"})
+        self.assertEqual(response.status_code, 409)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "[1, 2]")
+
+    def test_patch_config_route_updates_cached_config(self):
+        client = self.api.app.test_client()
+        response = client.patch("/api/config", json={"theme": "dark", "api_port": 1})
+        self.assertEqual(response.status_code, 200)
+        body = client.get("/api/config").get_json()
+        self.assertEqual(body, {"api_port": 5174, "theme": "dark"})
+        self.assertEqual(self.api.CONFIG["theme"], "dark")
+
+
+class StaticFileIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        root = tempfile.mkdtemp(prefix="pronote-dist-test-")
+        os.makedirs(os.path.join(root, "assets"))
+        files = {
+            "index.html": b"<!doctype html><div id=root></div>",
+            "favicon.svg": b"<svg></svg>",
+            "assets/index-C9x2LmQa.js": b"console.log('app');" * 10,
+            "assets/index-C9x2LmQa.js.gz": b"gzipped-bytes",
+        }
+        for name, content in files.items():
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(content)
+        self.api._static_index = self.api.StaticFileIndex(root)
+        self.client = self.api.app.test_client()
+
+    def test_hashed_assets_are_immutable_and_index_is_revalidated(self):
+        asset = self.client.get("/assets/index-C9x2LmQa.js")
+        self.assertEqual(asset.status_code, 200)
+        self.assertIn("immutable", asset.headers["Cache-Control"])
+        self.assertIn("javascript", asset.content_type)
+
+        page = self.client.get("/")
+        self.assertEqual(page.headers["Cache-Control"], "no-cache")
+        self.assertIn(b"id=root", page.data)
+
+    def test_spa_routes_fall_back_to_index_without_stat(self):
+        with mock.patch.object(self.api.os.path, "isfile") as isfile, mock.patch.object(self.api.os, "stat") as stat:
+            response = self.client.get("/timetable/multi")
+            favicon = self.client.get("/favicon.svg")
+        isfile.assert_not_called()
+        stat.assert_not_called()
+        self.assertIn(b"id=root", response.data)
+        self.assertEqual(favicon.data, b"<svg></svg>")
+
+    def test_precompressed_variant_and_conditional_requests(self):
+        gzipped = self.client.get("/assets/index-C9x2LmQa.js", headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(gzipped.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzipped.data, b"gzipped-bytes")
+        self.assertIn("Accept-Encoding", gzipped.headers["Vary"])
+
+        etag = self.client.get("/").headers["ETag"]
+        revalidated = self.client.get("/", headers={"If-None-Match": etag})
+        self.assertEqual(revalidated.status_code, 304)
+
+        partial = self.client.get("/favicon.svg", headers={"Range": "bytes=0-3"})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.data, b"<svg")
+
+    def test_unknown_asset_and_api_paths_return_404(self):
+        self.assertEqual(self.client.get("/assets/missing-AAAAAAAA.js").status_code, 404)
+        self.assertEqual(self.client.get("/api/unknown").status_code, 404)
+
+
+class LoadBenchmarkSmokeTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-refonte")
+        with mock.patch.object(sys, "path", [BENCHMARKS_DIR] + sys.path):
+            self.synthetic = importlib.import_module("synthetic_pronotepy")
+            self.load = importlib.import_module("load_backend")
+            self.serializers = importlib.import_module("bench_serializers")
+
+    def test_load_report_counts_upstream_calls_per_route(self):
+        school = self.synthetic.SyntheticSchool(lessons_per_week=5, discussions=3, messages_per_discussion=2)
+        module = self.synthetic.build_module(school)
+        self.load.prepare_backend(self.api, module)
+
+        report = self.load.run_load(
+            self.api, module, concurrency=2, requests_per_route=3, routes=["health", "timetable_week", "grades"]
+        )
+
+        self.assertEqual(set(report["routes"]), {"health", "timetable_week", "grades"})
+        self.assertEqual(report["totals"]["errors"], 0)
+        self.assertEqual(report["routes"]["health"]["upstream_calls"], 0)
+        self.assertEqual(report["routes"]["timetable_week"]["upstream_breakdown"], {"Client.lessons": 3})
+        self.assertIn("p99", report["routes"]["grades"]["latency_ms"])
+
+    def test_serializer_bench_covers_sparse_objects_and_flags_regressions(self):
+        school = self.synthetic.SyntheticSchool(lessons_per_week=4, homework_per_week=2, grades_per_period=5, sparse_ratio=0.5)
+        module = self.synthetic.build_module(school)
+        self.load.prepare_backend(self.api, module)
+
+        report = self.serializers.run_bench(self.api, module, repeat=1)
+
+        self.assertIn("lesson_to_dict", report["cases"])
+        self.assertIn("jsonify_lessons", report["cases"])
+        self.assertGreater(report["cases"]["lesson_to_dict"]["items"], 0)
+        self.assertEqual(self.serializers.find_regressions(report, report), [])
+        faster = json.loads(json.dumps(report))
+        faster["cases"]["grade_to_dict"]["relative_cost"] = report["cases"]["grade_to_dict"]["relative_cost"] / 3
+        self.assertTrue(self.serializers.find_regressions(faster, report)[0].startswith("grade_to_dict"))
+
+
+class RecordReplayAdapterTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        self.fixtures = tempfile.mkdtemp(prefix="pronote-fixtures-")
+
+    def _live_adapter(self):
+        subject = types.SimpleNamespace(id="mat-001", name="Mathématiques", groups=False)
+        lesson = types.SimpleNamespace(
+            id="lesson-1",
+            subject=subject,
+            teacher_name="Mme Martin",
+            classroom="B12",
+            start=dt.datetime(2026, 2, 2, 9, 0),
+            end=dt.datetime(2026, 2, 2, 10, 0),
+            canceled=False,
+            status=None,
+            content=None,
+        )
+        grade = types.SimpleNamespace(id="g1", grade="15", out_of="20", date=dt.date(2026, 2, 3), subject=subject)
+        period = types.SimpleNamespace(
+            id="p1", name="Trimestre 1", start=dt.date(2026, 1, 1), end=dt.date(2026, 3, 31), grades=[grade]
+        )
+        grade.period = period  # référence circulaire, comme dans pronotepy
+        return DummyAdapter(lessons=[lesson], periods=[period])
+
+    def _login(self):
+        return self.client.post(
+            "/api/login",
+            json={"pronote_url": "https://demo.example/pronote/", "username": "demo", "password": "secret-pass"},
+        )
+
+    def test_replay_serves_recorded_responses_without_upstream(self):
+        store = self.api.FixtureStore(self.fixtures)
+        self.api._adapter = self.api.RecordingAdapter(self._live_adapter(), store)
+        self.assertEqual(self._login().status_code, 200)
+        live_timetable = self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08").get_json()
+        live_grades = self.client.get("/api/grades?period_id=p1").get_json()
+
+        self.api._adapter = self.api.ReplayAdapter(store)
+        login = self._login()
+        self.assertEqual(login.get_json()["client_info"]["name"], "Prof Démo")
+        self.assertEqual(self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08").get_json(), live_timetable)
+        self.assertEqual(self.client.get("/api/grades?period_id=p1").get_json(), live_grades)
+        # Semaine jamais enregistrée : échec explicite, sauf repli demandé sur la plus récente.
+        missed = self.client.get("/api/timetable?from=2026-03-02&to=2026-03-08")
+        self.assertEqual(missed.status_code, 500)
+        self.assertIn("aucune fixture pour get_lessons", missed.get_json()["error"])
+        self.api._adapter = self.api.ReplayAdapter(store, fallback_latest=True)
+        self._login()
+        self.assertEqual(self.client.get("/api/timetable?from=2026-03-02&to=2026-03-08").get_json(), live_timetable)
+
+    def test_recording_periods_does_not_evaluate_lazy_properties(self):
+        evaluated = []
+
+        class Period:
+            def __init__(self):
+                self.id, self.name, self.start, self.end = "p1", "Trimestre 1", dt.date(2026, 1, 1), dt.date(2026, 3, 31)
+
+            @property
+            def grades(self):
+                evaluated.append("grades")
+                return []
+
+        store = self.api.FixtureStore(self.fixtures)
+        recording = self.api.RecordingAdapter(DummyAdapter(logged_in=True, periods=[Period()]), store)
+        recording.get_periods()
+        self.assertEqual(evaluated, [])
+        self.assertEqual([p.name for p in self.api.ReplayAdapter(store).get_periods()], ["Trimestre 1"])
+
+    def test_attachments_are_recorded_and_replayed(self):
+        store = self.api.FixtureStore(self.fixtures)
+        live = DummyAdapter(logged_in=True)
+        live.download_attachment = lambda url: types.SimpleNamespace(
+            headers={"Content-Type": "application/pdf"},
+            iter_content=lambda chunk_size: iter([b"%PDF", b"-1.4"]),
+            close=lambda: None,
+        )
+        stream = self.api.RecordingAdapter(live, store).download_attachment("https://pronote.invalid/f?signed=1")
+        self.assertEqual(b"".join(stream.iter_content(chunk_size=4)), b"%PDF-1.4")
+
+        replay = self.api.ReplayAdapter(store)
+        replayed = replay.download_attachment("https://pronote.invalid/f?signed=1")
+        self.assertEqual(replayed.headers["Content-Type"], "application/pdf")
+        self.assertEqual(b"".join(replayed.iter_content(chunk_size=3)), b"%PDF-1.4")
+        with self.assertRaises(self.api.FixtureMissError):
+            replay.download_attachment("https://pronote.invalid/autre")
+
+    def test_fixtures_never_contain_the_password(self):
+        self.api._adapter = self.api.RecordingAdapter(self._live_adapter(), self.api.FixtureStore(self.fixtures))
+        self._login()
+        for root, _dirs, files in os.walk(self.fixtures):
+            for name in files:
+                with open(os.path.join(root, name), encoding="utf-8") as f:
+                    self.assertNotIn("secret-pass", f.read())
+
+    def test_recorded_errors_are_replayed_as_adapter_errors(self):
+        store = self.api.FixtureStore(self.fixtures)
+        failing = DummyAdapter(logged_in=True)
+        failing.get_periods = mock.Mock(side_effect=RuntimeError("Pronote indisponible"))
+        with self.assertRaises(RuntimeError):
+            self.api.RecordingAdapter(failing, store).get_periods()
+
+        with self.assertRaisesRegex(self.api.AdapterError, "Pronote indisponible"):
+            self.api.ReplayAdapter(store).get_periods()
+
+    def test_factory_selects_replay_and_recording_modes(self):
+        env = {"PRONOTE_FIXTURES_DIR": self.fixtures, "PRONOTE_BACKEND_ADAPTER": "replay"}
+        with mock.patch.dict(os.environ, env, clear=False):
+            self.assertIsInstance(self.api.build_backend_adapter(), self.api.ReplayAdapter)
+        env.update(PRONOTE_BACKEND_ADAPTER="pronotepy-sync", PRONOTE_BACKEND_RECORD="1")
+        with mock.patch.dict(os.environ, env, clear=False):
+            adapter = self.api.build_backend_adapter()
+        self.assertIsInstance(adapter, self.api.RecordingAdapter)
+        self.assertIsInstance(adapter.inner, self.api.PronotepySyncAdapter)
+
+
+class StartupModeTests(unittest.TestCase):
+    def test_eager_mode_reports_import_phases(self):
+        api = _import_pronote_api("pronotepy-sync")
+        startup = api.app.test_client().get("/api/health").get_json()["startup"]
+
+        self.assertEqual(startup["mode"], "eager")
+        self.assertTrue(startup["pronotepy_loaded"])
+        self.assertIn("import_pronotepy", startup["phases"])
+        self.assertIn("adapter", startup["phases"])
+
+    def test_lazy_mode_defers_pronotepy_until_first_use(self):
+        with mock.patch.dict(os.environ, {"PRONOTE_STARTUP_MODE": "lazy"}, clear=False):
+            api = _import_pronote_api("pronotepy-sync")
+        client = api.app.test_client()
+
+        startup = client.get("/api/health").get_json()["startup"]
+        self.assertEqual(startup["mode"], "lazy")
+        self.assertFalse(startup["pronotepy_loaded"])
+        self.assertNotIn("import_pronotepy", startup["phases"])
+
+        fake_pronotepy = _build_fake_pronotepy_module()
+        with mock.patch.dict(sys.modules, {"pronotepy": fake_pronotepy}):
+            api._warm_pronotepy()
+            self.assertIs(api.pronotepy.Client, fake_pronotepy.Client)
+
+        startup = client.get("/api/health").get_json()["startup"]
+        self.assertTrue(startup["pronotepy_loaded"])
+        self.assertIn("import_pronotepy", startup["phases"])
+
+
+class ColumnarFormatTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        subjects = [types.SimpleNamespace(id=f"mat-{i}", name=f"Matière {i}", groups=False) for i in range(2)]
+        lessons = [
+            types.SimpleNamespace(
+                id=f"lesson-{i}",
+                subject=subjects[i % 2],
+                teacher_name="Mme Martin",
+                classroom="B12",
+                start=dt.datetime(2026, 2, 2, 8 + i, 0),
+                end=dt.datetime(2026, 2, 2, 9 + i, 0),
+            )
+            for i in range(6)
+        ]
+        self.api._adapter = DummyAdapter(logged_in=True, lessons=lessons)
+
+    def test_default_format_is_unchanged(self):
+        body = self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08").get_json()
+        self.assertIsInstance(body, list)
+        self.assertEqual(len(body), 6)
+
+    def test_columnar_format_interns_repeated_values_and_round_trips(self):
+        rows = self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08").get_json()
+        response = self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08&format=columnar")
+        body = response.get_json()
+
+        self.assertEqual(body["format"], "columnar")
+        self.assertEqual(body["count"], 6)
+        self.assertEqual(len(body["tables"]["subject"]), 2)
+        self.assertEqual(body["columns"]["subject"], [0, 1, 0, 1, 0, 1])
+        self.assertEqual(body["tables"]["teacher_name"], ["Mme Martin"])
+        self.assertEqual(self.api.columnar_to_rows(body), rows)
+        self.assertIn("Accept", response.headers.get("Vary", ""))
+
+    def test_msgpack_is_negotiated_through_accept(self):
+        response = self.client.get(
+            "/api/timetable?from=2026-02-02&to=2026-02-08", headers={"Accept": "application/x-msgpack"}
+        )
+        if importlib.util.find_spec("msgpack") is None:
+            # Sans msgpack installé : repli sur le colonnaire JSON.
+            self.assertEqual(response.mimetype, "application/json")
+            self.assertEqual(response.get_json()["format"], "columnar")
+        else:
+            import msgpack
+
+            self.assertEqual(response.mimetype, "application/x-msgpack")
+            self.assertEqual(msgpack.unpackb(response.data)["count"], 6)
+
+
+class GradeStatsTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        self.maths = types.SimpleNamespace(id="mat", name="Mathématiques")
+        self.french = types.SimpleNamespace(id="fra", name="Français")
+
+    def _grade(self, subject, grade, out_of="20", coefficient="1", **flags):
+        return types.SimpleNamespace(subject=subject, grade=grade, out_of=out_of, coefficient=coefficient, **flags)
+
+    def _period(self, period_id, grades):
+        class CountingPeriod:
+            id, name = period_id, f"Période {period_id}"
+            start, end = dt.date(2026, 1, 1), dt.date(2026, 3, 31)
+            fetches = 0
+
+            @property
+            def grades(self):
+                self.fetches += 1
+                return grades
+
+        return CountingPeriod()
+
+    def test_weighted_averages_follow_pronote_rules(self):
+        stats = self.api.compute_grade_stats([
+            self._grade(self.maths, "12", coefficient="2"),
+            self._grade(self.maths, "7,5", out_of="10"),          # 15/20
+            self._grade(self.maths, "Abs"),
+            self._grade(self.maths, "16", is_bonus=True),          # +6 points sur la somme
+            self._grade(self.maths, "5", is_optionnal=True),       # ignorée : ferait baisser
+            self._grade(self.french, "8"),
+            self._grade(self.french, "14", is_optionnal=True),     # retenue : fait monter
+        ])
+
+        subjects = {s["subject"]["id"]: s for s in stats["subjects"]}
+        self.assertEqual(subjects["mat"]["average"], round((12 * 2 + 15 + 6) / 3, 2))
+        self.assertEqual(subjects["fra"]["average"], 11.0)
+        self.assertEqual(stats["overall_average"], round((15.0 + 11.0) / 2, 2))
+        self.assertEqual(stats["excluded"], {"Abs": 1})
+        self.assertEqual(stats["graded"], 6)
+        self.assertEqual(sum(stats["histogram"]["counts"]), 6)
+
+    def test_route_caches_per_period_and_reports_trend(self):
+        first = self._period("p1", [self._grade(self.maths, "10")])
+        second = self._period("p2", [self._grade(self.maths, "14")])
+        self.api._adapter = DummyAdapter(logged_in=True, periods=[first, second])
+
+        body = self.client.get("/api/grades/stats?period_id=p2&trend=1").get_json()
+        self.client.get("/api/grades/stats?period_id=p2")
+
+        self.assertEqual(body["period"]["id"], "p2")
+        self.assertEqual(body["overall_average"], 14.0)
+        self.assertEqual([t["overall_average"] for t in body["trend"]], [10.0, 14.0])
+        self.assertEqual(body["trend"][1]["subjects"]["mat"]["delta"], 4.0)
+        self.assertEqual(second.fetches, 1)
+
+    def test_stats_require_authentication(self):
+        self.api._adapter = DummyAdapter(logged_in=False)
+        self.assertEqual(self.client.get("/api/grades/stats").status_code, 401)
+
+
+class SearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        discussion = types.SimpleNamespace(
+            id="d1",
+            subject="Sortie au musée",
+            creator="M. Durand",
+            unread=True,
+            date=dt.datetime(2026, 2, 10, 8, 0),
+            messages=[
+                types.SimpleNamespace(id="m1", author="M. Durand", content="Rappel : l'autorisation parentale est à rendre vendredi.", date=dt.datetime(2026, 2, 10, 8, 0), seen=True),
+                types.SimpleNamespace(id="m2", author="Mme Martin", content="Merci, je préviens les élèves.", date=dt.datetime(2026, 2, 11, 9, 0), seen=False),
+            ],
+        )
+        information = types.SimpleNamespace(id="i1", title="Conseil de classe", author="Direction", content="Le conseil de classe du 2nd trimestre est avancé.", creation_date=dt.datetime(2026, 2, 1), read=False, category="Vie scolaire")
+        homework = types.SimpleNamespace(id="h1", subject=types.SimpleNamespace(id="mat", name="Mathématiques"), description="Exercices sur les fonctions affines", done=False, date=dt.date(2026, 2, 12))
+        self.adapter = DummyAdapter(discussions=[discussion], informations=[information], homeworks=[homework])
+        self.api._adapter = self.adapter
+        self.client.post("/api/login", json={"pronote_url": "https://demo.example/pronote/", "username": "demo", "password": "x"})
+        self.client.get("/api/discussions")
+        self.client.get("/api/informations")
+        self.client.get("/api/homework?from=2026-02-09&to=2026-02-15")
+
+    def test_accent_insensitive_prefix_search_with_snippets(self):
+        body = self.client.get("/api/search?q=eleves").get_json()
+        self.assertEqual(body["total"], 1)
+        result = body["results"][0]
+        self.assertEqual((result["kind"], result["ref_id"]), ("message", "d1"))
+        start, end = result["highlights"][0]
+        self.assertEqual(result["snippet"][start:end], "élèves")
+
+        body = self.client.get("/api/search?q=conseil+trim").get_json()
+        self.assertEqual([r["id"] for r in body["results"]], ["information:i1"])
+        self.assertEqual(self.client.get("/api/search?q=affin&kind=message").get_json()["total"], 0)
+        self.assertEqual(self.client.get("/api/search?q=affin&kind=homework").get_json()["total"], 1)
+
+    def test_index_is_incremental_and_persisted_per_account(self):
+        stats = self.api._search_index.stats()
+        self.client.get("/api/discussions")
+        self.assertEqual(self.api._search_index.stats(), stats)
+
+        self.client.post("/api/logout")
+        self.adapter._logged_in = True
+        self.assertEqual(self.client.get("/api/search?q=musee").get_json()["total"], 0)
+        self.client.post("/api/login", json={"pronote_url": "https://demo.example/pronote/", "username": "demo", "password": "x"})
+        self.assertEqual(self.client.get("/api/search?q=musee").get_json()["total"], 2)
+
+    def test_refresh_evicts_deleted_messages_and_homework(self):
+        self.adapter._discussions[0].messages.pop()
+        self.client.get("/api/discussions")
+        self.assertEqual(self.client.get("/api/search?q=eleves").get_json()["total"], 0)
+        self.assertEqual(self.client.get("/api/search?q=autorisation").get_json()["total"], 1)
+
+        self.adapter._homeworks.clear()
+        self.client.get("/api/homework?from=2026-03-02&to=2026-03-08")
+        self.assertEqual(self.client.get("/api/search?q=affines").get_json()["total"], 1)
+        self.client.get("/api/homework?from=2026-02-09&to=2026-02-15")
+        self.assertEqual(self.client.get("/api/search?q=affines").get_json()["total"], 0)
+
+    def test_persisted_index_holds_terms_not_text(self):
+        self.api._search_index.flush()
+        directory = self.api._search_index.directory
+        raw = ""
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name)) as f:
+                raw += f.read()
+        self.assertNotIn("autorisation parentale", raw)
+        self.assertNotIn("Sortie au musée", raw)
+
+        self.client.post("/api/logout")
+        self.adapter._logged_in = True
+        self.client.post("/api/login", json={"pronote_url": "https://demo.example/pronote/", "username": "demo", "password": "x"})
+        result = self.client.get("/api/search?q=autorisation").get_json()["results"][0]
+        self.assertEqual((result["ref_id"], result["snippet"]), ("d1", ""))
+
+    def test_search_requires_authentication(self):
+        self.api._adapter = DummyAdapter(logged_in=False)
+        self.assertEqual(self.client.get("/api/search?q=test").status_code, 401)
+
+
+class RecipientDirectoryTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.recipients = [
+            types.SimpleNamespace(id=f"rcp-{i}", name=f"M. Professeur {i}", type="teacher") for i in range(3000)
+        ]
+        self.recipients.append(types.SimpleNamespace(id="rcp-x", name="Mme Élodie Lefèvre", type="staff"))
+        fetched = self.fetches = []
+        recipients = self.recipients
+
+        class DirectoryClient:
+            logged_in = True
+
+            def get_recipients(self):
+                fetched.append(1)
+                return list(recipients)
+
+            def new_discussion(self, selected, subject, content):
+                return types.SimpleNamespace(id="new", subject=subject, messages=[], selected=selected)
+
+        self.adapter = self.api.PronotepySyncAdapter()
+        self.adapter._client = DirectoryClient()
+
+    def test_recipients_are_fetched_once_and_ids_resolved_in_order(self):
+        first = self.adapter.create_discussion(["rcp-x", "rcp-2", "rcp-x"], "Objet", "Texte")
+        self.adapter.create_discussion(["rcp-10"], "Objet", "Texte")
+
+        self.assertEqual([r.id for r in first.selected], ["rcp-x", "rcp-2"])
+        self.assertEqual(len(self.fetches), 1)
+
+    def test_unknown_id_triggers_a_single_refresh(self):
+        self.adapter.get_recipients()
+        self.recipients.append(types.SimpleNamespace(id="rcp-new", name="Nouvel Arrivant"))
+
+        created = self.adapter.create_discussion(["rcp-new"], "Bienvenue", "Texte")
+        self.assertEqual([r.id for r in created.selected], ["rcp-new"])
+        self.assertEqual(len(self.fetches), 2)
+        with self.assertRaises(self.api.AdapterError):
+            self.adapter.create_discussion(["rcp-ghost"], "Objet", "Texte")
+
+    def test_prefix_search_is_accent_insensitive_and_ranks_name_starts_first(self):
+        self.assertEqual([r.id for r in self.adapter.search_recipients("elod lef")], ["rcp-x"])
+        self.assertEqual([r.id for r in self.adapter.search_recipients("LEFE")], ["rcp-x"])
+        self.assertEqual(len(self.adapter.search_recipients("professeur", limit=25)), 25)
+        self.assertEqual(self.adapter.search_recipients("zzz"), [])
+
+    def test_recipients_route_supports_query_and_limit(self):
+        self.api._adapter = self.adapter
+        client = self.api.app.test_client()
+
+        body = client.get("/api/recipients?q=elodie").get_json()
+        self.assertEqual(body, [{"id": "rcp-x", "name": "Mme Élodie Lefèvre", "kind": "staff"}])
+        self.assertEqual(len(client.get("/api/recipients?limit=10").get_json()), 10)
+        self.assertEqual(len(client.get("/api/recipients").get_json()), 3001)
+
+
+class FreeSlotsTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+
+        def lesson(lesson_id, day, start_hour, end_hour, teacher, room, group, canceled=False):
+            return types.SimpleNamespace(
+                id=lesson_id,
+                subject=None,
+                start=dt.datetime(2026, 2, day, start_hour, 0),
+                end=dt.datetime(2026, 2, day, end_hour, 0),
+                teacher_names=[teacher],
+                classrooms=[room],
+                group_names=[group],
+                canceled=canceled,
+            )
+
+        self.lessons = [
+            lesson("l1", 2, 8, 10, "Mme Martin", "B12", "3A"),
+            lesson("l2", 2, 9, 11, "M. Durand", "B14", "3B"),
+            lesson("l3", 2, 13, 15, "Mme Martin", "B14", "3A"),
+            lesson("l4", 2, 15, 16, "Mme Martin", "B12", "3A", canceled=True),
+            lesson("l5", 3, 10, 12, "Mme Martin", "Salle Éco", "3A"),
+        ]
+        self.adapter = DummyAdapter(logged_in=True, lessons=self.lessons)
+        self.adapter.get_lessons = mock.Mock(side_effect=lambda date_from, date_to: [
+            l for l in self.lessons if date_from <= l.start.date() <= date_to
+        ])
+        self.api._adapter = self.adapter
+
+    def test_free_slots_for_a_teacher_skip_cancelled_lessons(self):
+        body = self.client.get(
+            "/api/timetable/free-slots?teacher=mme%20martin&from=2026-02-02&to=2026-02-02&min_minutes=60"
+        ).get_json()
+        self.assertEqual(
+            [(s["start"][11:16], s["end"][11:16]) for s in body["slots"]],
+            [("10:00", "13:00"), ("15:00", "18:00")],
+        )
+
+    def test_rooms_free_at_time_are_answered_from_the_index(self):
+        body = self.client.get("/api/timetable/free-slots?at=2026-02-02T10:30&min_minutes=30").get_json()
+        self.assertEqual(body["busy_rooms"], ["B14"])
+        self.assertEqual(body["free_rooms"], ["B12", "Salle Éco"])
+
+    def test_weeks_already_loaded_by_the_timetable_are_not_refetched(self):
+        self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08")
+        self.client.get("/api/timetable/free-slots?room=salle%20eco&from=2026-02-02&to=2026-02-06")
+        self.assertEqual(self.adapter.get_lessons.call_count, 1)
+
+        body = self.client.get("/api/timetable/free-slots?room=salle%20eco&from=2026-02-03&to=2026-02-03").get_json()
+        self.assertEqual([s["minutes"] for s in body["slots"]], [120, 360])
+
+    def test_invalid_range_is_rejected(self):
+        response = self.client.get("/api/timetable/free-slots?from=2026-02-02&to=2026-06-30")
+        self.assertEqual(response.status_code, 400)
+
+
+class AttachmentProxyTests(unittest.TestCase):
+    PAYLOAD = bytes(range(256)) * 1024
+
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        payload = self.PAYLOAD
+        downloads = self.downloads = []
+
+        class StreamingResponse:
+            headers = {"Content-Type": "application/pdf", "Content-Length": str(len(payload))}
+            closed = False
+
+            def iter_content(self, chunk_size):
+                for offset in range(0, len(payload), chunk_size):
+                    yield payload[offset:offset + chunk_size]
+
+            def close(self):
+                self.closed = True
+
+        def download_attachment(url):
+            downloads.append(url)
+            return StreamingResponse()
+
+        homework = types.SimpleNamespace(
+            id="hw-1",
+            subject=None,
+            description="Lire le chapitre",
+            done=False,
+            date=dt.date(2026, 2, 2),
+            files=[
+                types.SimpleNamespace(id="f-1", name="chapitre 3.pdf", url="https://pronote.invalid/f?signed=1", type=1),
+                types.SimpleNamespace(id="f-2", name="Vidéo", url="https://video.invalid/watch", type=0),
+            ],
+        )
+        self.adapter = DummyAdapter(logged_in=True, homeworks=[homework])
+        self.adapter.download_attachment = download_attachment
+        self.api._adapter = self.adapter
+
+    def _files(self):
+        return self.client.get("/api/homework?from=2026-02-01&to=2026-02-08").get_json()[0]["files"]
+
+    def test_homework_files_point_to_the_proxy_and_links_stay_external(self):
+        pdf, link = self._files()
+        self.assertEqual(pdf["url"], f"/api/files/{pdf['id']}")
+        self.assertEqual(pdf["name"], "chapitre 3.pdf")
+        self.assertEqual(link["url"], "https://video.invalid/watch")
+        self.assertNotIn("signed", json.dumps(self._files()))
+
+    def test_sync_download_uses_the_pronote_session_with_a_timeout(self):
+        requests_made = []
+
+        class Session:
+            def get(self, url, **kwargs):
+                requests_made.append((url, kwargs))
+                return types.SimpleNamespace(raise_for_status=lambda: None)
+
+        adapter = self.api.PronotepySyncAdapter()
+        adapter._client = types.SimpleNamespace(logged_in=True, communication=types.SimpleNamespace(session=Session()))
+        adapter.download_attachment("https://pronote.invalid/f")
+        settings = self.api._upstream_http_pool.settings
+        self.assertEqual(
+            requests_made,
+            [("https://pronote.invalid/f", {"stream": True, "timeout": (settings["connect_timeout"], settings["read_timeout"])})],
+        )
+
+        adapter._client = types.SimpleNamespace(logged_in=True)
+        with self.assertRaises(self.api.AdapterError):
+            adapter.download_attachment("https://pronote.invalid/f")
+
+    def test_first_download_streams_then_cache_serves_ranges(self):
+        url = self._files()[0]["url"]
+
+        first = self.client.get(url)
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(first.data, self.PAYLOAD)
+        self.assertEqual(first.mimetype, "application/pdf")
+        self.assertEqual(first.headers["Cache-Control"], "private, no-cache")
+
+        partial = self.client.get(url, headers={"Range": "bytes=100-199"})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.data, self.PAYLOAD[100:200])
+        self.assertEqual(partial.headers["X-Cache"], "HIT")
+        self.assertEqual(partial.headers["Cache-Control"], "private, no-cache")
+
+        etag = partial.headers["ETag"]
+        with self.client.get(url, headers={"If-None-Match": etag}) as revalidated:
+            self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(len(self.downloads), 1)
+
+    def test_range_on_a_cold_cache_downloads_once(self):
+        url = self._files()[0]["url"]
+        partial = self.client.get(url, headers={"Range": "bytes=-10"})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.data, self.PAYLOAD[-10:])
+        self.assertEqual(self.client.get(url).data, self.PAYLOAD)
+        self.assertEqual(len(self.downloads), 1)
+
+    def test_cache_is_bounded_and_unknown_ids_are_404(self):
+        self.api._file_cache.reconfigure({"max_bytes": len(self.PAYLOAD), "chunk_size": 4096})
+        self.assertEqual(len(self.client.get(self._files()[0]["url"]).data), len(self.PAYLOAD))
+        self.assertEqual(self.api._file_cache.stats()["entries"], 1)
+
+        self.api._file_cache.reconfigure({"max_bytes": 1024, "chunk_size": 4096})
+        self.assertEqual(self.api._file_cache.stats()["entries"], 0)
+        self.assertEqual(self.client.get("/api/files/inconnu").status_code, 404)
+
+    def test_session_reset_forgets_signed_urls(self):
+        url = self._files()[0]["url"]
+        self.api._reset_session_state()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_cached_copy_is_not_served_to_another_session(self):
+        url = self._files()[0]["url"]
+        self.assertEqual(self.client.get(url).data, self.PAYLOAD)
+        self.api._reset_session_state()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_cache_hits_leave_no_file_open(self):
+        url = self._files()[0]["url"]
+        self.client.get(url).get_data()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            self.assertEqual(self.client.get(url, headers={"Range": "bytes=10-19"}).data, self.PAYLOAD[10:20])
+            self.assertEqual(self.client.get(url).data, self.PAYLOAD)
+            gc.collect()
+        self.assertEqual([w for w in caught if issubclass(w.category, ResourceWarning)], [])
+
+
+class NotificationDispatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.now = 1000.0
+        self.sink = self.api.MemoryNotificationSink()
+        settings = dict(self.api.NOTIFICATIONS_DEFAULTS, coalesce_ms=500, coalesce_threshold=3, max_per_minute=4)
+        self.dispatcher = self.api.NotificationDispatcher(
+            lambda: self.sink, settings, clock=lambda: self.now, autostart=False
+        )
+
+    def test_delivery_waits_for_the_burst_to_settle(self):
+        first, _ = self.dispatcher.submit("Nouveau message", "Mme Martin")
+        self.now += 0.3
+        second, _ = self.dispatcher.submit("Nouvelle note", "Maths : 15/20")
+        self.assertAlmostEqual(self.dispatcher.run_once(), 0.5)
+        self.assertEqual(self.sink.sent, [])
+
+        self.now += 0.5
+        self.assertEqual(self.dispatcher.run_once(), 0.0)
+        self.assertEqual([n["title"] for n in self.sink.sent], ["Nouveau message", "Nouvelle note"])
+        self.assertEqual(self.dispatcher.status(first), "delivered")
+        self.assertEqual(self.dispatcher.status(second), "delivered")
+
+    def test_large_burst_is_coalesced_into_one_summary(self):
+        ids = [self.dispatcher.submit(f"Message {i}", urgency="critical" if i == 2 else "low")[0] for i in range(7)]
+        self.now += 1
+        self.dispatcher.run_once()
+
+        self.assertEqual(len(self.sink.sent), 1)
+        summary = self.sink.sent[0]
+        self.assertEqual(summary["title"], "7 nouvelles notifications")
+        self.assertEqual(summary["urgency"], "critical")
+        self.assertTrue(summary["body"].endswith("…"))
+        self.assertEqual({self.dispatcher.status(i) for i in ids}, {"coalesced"})
+
+    def test_rate_limit_delays_then_summarizes(self):
+        for i in range(3):
+            self.dispatcher.submit(f"A{i}")
+            self.now += 1
+            self.dispatcher.run_once()
+        self.dispatcher.submit("B1")
+        self.dispatcher.submit("B2")
+        self.now += 1
+        self.dispatcher.run_once()
+        # Plus qu'un jeton environ : les deux notifications partent en une synthèse.
+        self.assertEqual(self.sink.sent[-1]["title"], "2 nouvelles notifications")
+
+        self.dispatcher.submit("C")
+        self.now += 1
+        self.assertGreater(self.dispatcher.run_once(), 0)
+        self.now += 15
+        self.dispatcher.run_once()
+        self.assertEqual(self.sink.sent[-1]["title"], "C")
+
+    def test_keys_merge_pending_and_drop_recent_duplicates(self):
+        first, _ = self.dispatcher.submit("3 messages", key="discussions")
+        merged, status = self.dispatcher.submit("4 messages", key="discussions")
+        self.assertEqual((merged, status), (first, "queued"))
+        self.now += 1
+        self.dispatcher.run_once()
+        self.assertEqual([n["title"] for n in self.sink.sent], ["4 messages"])
+
+        _, status = self.dispatcher.submit("4 messages", key="discussions")
+        self.assertEqual(status, "duplicate")
+        self.now += 120
+        self.assertEqual(self.dispatcher.submit("4 messages", key="discussions")[1], "queued")
+
+    def test_route_returns_immediately_with_a_queue_id(self):
+        self.api._notifier = self.dispatcher
+        client = self.api.app.test_client()
+        with mock.patch.object(self.api.subprocess, "run") as run:
+            response = client.post("/api/notify", json={"title": "Nouveau devoir", "urgency": "bogus"})
+        run.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        notification_id = response.get_json()["id"]
+
+        self.now += 1
+        self.dispatcher.run_once()
+        self.assertEqual(client.get(f"/api/notify/{notification_id}").get_json()["status"], "delivered")
+        self.assertEqual(self.sink.sent[0]["urgency"], "normal")
+        self.assertEqual(client.get("/api/notify/n999").status_code, 404)
+
+    def test_background_thread_delivers(self):
+        dispatcher = self.api.NotificationDispatcher(
+            lambda: self.sink, dict(self.api.NOTIFICATIONS_DEFAULTS, coalesce_ms=10)
+        )
+        notification_id, _ = dispatcher.submit("Absence signalée")
+        deadline = time.monotonic() + 5
+        while dispatcher.status(notification_id) == "queued" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(dispatcher.status(notification_id), "delivered")
+
+
+class BadgeCountersTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        today = dt.date.today()
+        calls = self.calls = []
+
+        def item(**fields):
+            obj = types.SimpleNamespace(**fields)
+            obj.mark_as = lambda mark_as: setattr(obj, "unread", mark_as == "unread")
+            obj.mark_as_read = lambda: setattr(obj, "read", True)
+            obj.set_done = lambda done: setattr(obj, "done", done)
+            obj.delete = lambda: None
+            return obj
+
+        discussions = [item(id=f"d{i}", unread=i < 3, messages=["corps " * 1000]) for i in range(10)]
+        informations = [item(id=f"i{i}", read=i % 2 == 0) for i in range(5)]
+        homework = [
+            item(id="h1", date=today, done=False),
+            item(id="h2", date=today + dt.timedelta(days=3), done=True),
+            item(id="h3", date=today + dt.timedelta(days=5), done=False),
+            item(id="h4", date=today + dt.timedelta(days=20), done=False),
+        ]
+
+        class CountingClient:
+            logged_in = True
+
+            def discussions(self):
+                calls.append("discussions")
+                return list(discussions)
+
+            def information_and_surveys(self):
+                calls.append("informations")
+                return list(informations)
+
+            def homework(self, date_from, date_to):
+                calls.append("homework")
+                return [h for h in homework if date_from <= h.date <= date_to]
+
+        self.adapter = self.api.PronotepySyncAdapter()
+        self.adapter._client = CountingClient()
+        self.api._adapter = self.adapter
+
+    def test_counts_and_upstream_calls_only_when_stale(self):
+        self.assertEqual(
+            self.adapter.get_counters(7),
+            {"discussions_unread": 3, "informations_unread": 2, "homework_pending": 2},
+        )
+        self.assertEqual(sorted(self.calls), ["discussions", "homework", "informations"])
+        self.adapter.get_counters(7)
+        self.assertEqual(len(self.calls), 3)
+
+        self.adapter._counters.ttl = 0
+        self.adapter.get_counters(7)
+        self.assertEqual(len(self.calls), 6)
+
+    def test_regular_fetches_feed_the_index(self):
+        today = dt.date.today()
+        self.adapter.get_discussions()
+        self.adapter.get_informations()
+        self.adapter.get_homework(today - dt.timedelta(days=7), today + dt.timedelta(days=30))
+        self.calls.clear()
+
+        self.assertEqual(self.adapter.get_counters(30)["homework_pending"], 3)
+        self.assertEqual(self.calls, [])
+
+    def test_actions_update_counts_without_refetch(self):
+        self.adapter.get_counters(7)
+        self.adapter.mark_discussion("d0", "read")
+        self.adapter.delete_discussion("d1")
+        self.adapter.mark_information_read("i1")
+        self.adapter.set_homework_done("h1", True)
+
+        self.assertEqual(
+            self.adapter._counters.counts(dt.date.today(), dt.date.today() + dt.timedelta(days=7)),
+            {"discussions_unread": 1, "informations_unread": 1, "homework_pending": 1},
+        )
+
+    def test_route_reports_days_and_validates(self):
+        client = self.api.app.test_client()
+        body = client.get("/api/counters?days=30").get_json()
+        self.assertEqual(body["days"], 30)
+        self.assertEqual(body["homework_pending"], 3)
+        self.assertEqual(client.get("/api/counters?days=abc").status_code, 400)
+
+    def test_default_contract_counts_from_full_lists(self):
+        dummy = DummyAdapter(
+            logged_in=True,
+            discussions=[types.SimpleNamespace(id="a", unread=True)],
+            informations=[types.SimpleNamespace(id="b", read=False)],
+        )
+        dummy.get_counters = types.MethodType(self.api.PronoteBackendAdapter.get_counters, dummy)
+        self.assertEqual(
+            dummy.get_counters(),
+            {"discussions_unread": 1, "informations_unread": 1, "homework_pending": 0},
+        )
+
+
+class NormalizeValueTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+
+    class Node:
+        def __init__(self, **fields):
+            self.__dict__.update(fields)
+
+        def to_dict(self):
+            return dict(self.__dict__)
+
+    def test_matches_plain_conversion(self):
+        label = self.Node(id="bio", name="Bio")
+        menu = self.Node(date=dt.date(2026, 3, 2), meals=(self.Node(name="Soupe", labels=[label]),), extra={1: None})
+        self.assertEqual(
+            self.api._normalize_value([menu]),
+            [{"date": "2026-03-02", "meals": [{"name": "Soupe", "labels": [{"id": "bio", "name": "Bio"}]}], "extra": {"1": None}}],
+        )
+        self.assertEqual(self.api.menus_to_dicts([menu, "brut"])[1], {"value": "brut"})
+
+    def test_cycles_depth_and_failing_to_dict(self):
+        parent = self.Node(name="parent")
+        parent.child = self.Node(name="enfant", parent=parent)
+        self.assertEqual(self.api._normalize_value(parent)["child"]["parent"], self.api._NORMALIZE_CYCLE)
+
+        nested = []
+        for _ in range(5000):
+            nested = [nested]
+        value = self.api._normalize_value(nested)
+        for _ in range(self.api._NORMALIZE_MAX_DEPTH):
+            value = value[0]
+        self.assertEqual(value, self.api._NORMALIZE_TRUNCATED)
+
+        class Broken:
+            def to_dict(self):
+                raise ValueError("boom")
+
+            def __str__(self):
+                return "broken"
+
+        self.assertEqual(self.api._normalize_value({"x": Broken(), "y": object}), {"x": "broken", "y": str(object)})
+
+    def test_repeated_objects_are_converted_once(self):
+        calls = []
+
+        class Label(self.Node):
+            def to_dict(self):
+                calls.append(self.id)
+                return super().to_dict()
+
+        shared = Label(id="local")
+        value = self.api._normalize_value([self.Node(labels=[shared]), self.Node(labels=[shared])])
+        self.assertEqual(len(calls), 1)
+        self.assertIs(value[0]["labels"][0], value[1]["labels"][0])
+
+
+class CompactRecordTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+
+    def _lesson(self, index):
+        class Client:
+            def __init__(self):
+                self.payload = bytearray(200_000)
+
+        class Lesson:  # comme pronotepy : classe ordinaire, donc référençable faiblement
+            def __init__(self, **fields):
+                self.__dict__.update(fields)
+
+        return Lesson(
+            id=f"l{index}",
+            subject=types.SimpleNamespace(id="s1", name="Maths", groups=False, _client=Client()),
+            teacher_name="Mme Martin",
+            start=dt.datetime(2026, 2, 2, 8, 0),
+            end=dt.datetime(2026, 2, 2, 9, 0),
+            canceled=False,
+            content="Chapitre 3",
+            _client=Client(),
+        )
+
+    def test_records_serialize_like_the_original_and_drop_the_graph(self):
+        lesson = self._lesson(1)
+        record = self.api.compact_result("get_lessons", [lesson])[0]
+
+        self.assertEqual(self.api.lesson_to_dict(record), self.api.lesson_to_dict(lesson))
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(record.content, "Chapitre 3")  # délégué tant que l'original vit
+        self.assertLess(self.api.approximate_size(record), self.api.approximate_size(lesson) / 100)
+
+        del lesson
+        import gc
+
+        gc.collect()
+        self.assertFalse(hasattr(record, "content"))
+        self.assertFalse(hasattr(record, "memo"))
+        self.assertEqual(self.api.lesson_to_dict(record)["subject"]["name"], "Maths")
+
+    def _discussions_client(self, fetched):
+        class Discussion:
+            def __init__(self, index):
+                self.id = f"d{index}"
+                self.subject = f"Sujet {index}"
+                self.unread = bool(index % 2)
+
+            @property
+            def messages(self):  # comme pronotepy : une requête ListeMessages par lecture
+                fetched.append(self.id)
+                return [types.SimpleNamespace(id=f"{self.id}-m1", author="Mme Martin", content="Bonjour", date=None, seen=True)]
+
+        class Client:
+            logged_in = True
+
+            def discussions(self):
+                return [Discussion(i) for i in range(3)]
+
+        return Client()
+
+    def test_discussion_messages_are_fetched_once_inside_the_adapter_call(self):
+        fetched = []
+        inner = self.api.PronotepySyncAdapter()
+        inner._client = self._discussions_client(fetched)
+        adapter = self.api.ResilientBackendAdapter(inner, self.api._resilience_settings({}))
+        self.api._adapter = adapter
+
+        body = self.api.app.test_client().get("/api/discussions").get_json()
+        adapter.settle()
+        self.assertEqual(fetched, ["d0", "d1", "d2"])
+        self.assertEqual(body[0]["messages"][0]["content"], "Bonjour")
+
+        found, cached = adapter._stale_value(("get_discussions", ()))
+        self.assertTrue(found)
+        self.assertEqual(self.api.discussion_to_dict(cached[2])["messages"][0]["author"], "Mme Martin")
+        self.assertEqual(len(fetched), 3)
+
+    def test_compaction_never_reads_request_properties(self):
+        fetched = []
+        raw = self._discussions_client(fetched).discussions()
+        records = self.api.compact_result("get_discussions", raw)
+        self.assertFalse(hasattr(records[0], "messages"))
+        self.assertEqual(self.api.discussion_to_dict(records[0])["messages"], [])
+        self.assertEqual(fetched, [])
+
+    def test_record_store_evicts_to_stay_under_budget(self):
+        store = self.api.RecordStore(max_entries=100, max_bytes=20_000)
+        for week in range(10):
+            store.put(("get_lessons", week), self.api.compact_result("get_lessons", [self._lesson(i) for i in range(10)]))
+        stats = store.stats()
+        self.assertLessEqual(stats["bytes"], 20_000)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertTrue(store.get(("get_lessons", 9))[0])
+        self.assertFalse(store.get(("get_lessons", 0))[0])
+
+    def test_resilient_cache_keeps_records_not_streams(self):
+        inner = DummyAdapter(logged_in=True, lessons=[self._lesson(1)])
+        inner.download_attachment = lambda url: object()
+        adapter = self.api.ResilientBackendAdapter(inner, self.api._resilience_settings({}))
+        adapter.get_lessons(dt.date(2026, 2, 2), dt.date(2026, 2, 8))
+        adapter.download_attachment("https://pronote.invalid/f")
+        adapter.settle()
+
+        self.assertEqual(adapter.health_snapshot()["stale_entries"], 1)
+        found, cached = adapter._stale_value(("get_lessons", (dt.date(2026, 2, 2), dt.date(2026, 2, 8))))
+        self.assertTrue(found)
+        self.assertIsInstance(cached[0], self.api.LessonRecord)
+
+    def test_debug_memory_reports_caches_and_subsystems(self):
+        client = self.api.app.test_client()
+        self.assertFalse(client.get("/api/debug/memory").get_json()["tracing"])
+        self.assertEqual(client.get("/api/debug/memory?trace=start").status_code, 405)
+        self.assertFalse(self.api.tracemalloc.is_tracing())
+        try:
+            body = client.post("/api/debug/memory?trace=start").get_json()
+            self.assertTrue(body["tracing"])
+            self.assertIn("stale_records", body["caches"])
+            self.api._search_index.upsert("message", "d1", "m1", "Titre", " ".join(f"mot{i}" for i in range(2000)))
+            subsystems = [s["subsystem"] for s in client.get("/api/debug/memory").get_json()["traced"]["subsystems"]]
+            self.assertTrue(any(name.startswith("pronote_api : ") for name in subsystems))
+        finally:
+            client.post("/api/debug/memory?trace=stop")
+        self.assertEqual(client.get("/api/debug/memory?frames=x").status_code, 400)
+
+
+class RequestProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        # Fonction « upstream » dont le module se présente comme pronotepy.
+        namespace = {"__name__": "pronotepy.synthetic", "time": time}
+        exec("def slow_lessons(date_from, date_to):\n    time.sleep(0.08)\n    return []\n", namespace)
+        inner = DummyAdapter(logged_in=True)
+        inner.get_lessons = namespace["slow_lessons"]
+        self.api._adapter = self.api.ResilientBackendAdapter(inner, self.api._resilience_settings({}))
+
+    def tearDown(self):
+        self.api._profiler.disarm()
+
+    def test_disarmed_profiler_leaves_requests_untouched(self):
+        response = self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08")
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.assertEqual(self.api._profiler.recent(), [])
+
+    def test_next_n_matching_requests_are_profiled_with_upstream_time_split_out(self):
+        self.assertEqual(self.client.get("/api/debug/profile?route=/api/timetable&n=2").status_code, 405)
+        self.assertEqual(self.api._profiler.rules(), [])
+        armed = self.client.post("/api/debug/profile?route=/api/timetable&n=2").get_json()
+        self.assertEqual(armed["armed"], [{"route": "/api/timetable", "remaining": 2}])
+
+        self.assertNotIn("X-Profile-Id", self.client.get("/api/health").headers)
+        first = self.client.get("/api/timetable?from=2026-02-02&to=2026-02-08")
+        self.client.get("/api/timetable?from=2026-02-09&to=2026-02-15")
+        third = self.client.get("/api/timetable?from=2026-02-16&to=2026-02-22")
+        self.assertIn("X-Profile-Id", first.headers)
+        self.assertIn("pronotepy;dur=", first.headers["Server-Timing"])
+        self.assertNotIn("X-Profile-Id", third.headers)
+
+        listing = self.client.get("/api/debug/profile").get_json()
+        self.assertEqual(listing["armed"], [])
+        self.assertEqual(len(listing["profiles"]), 2)
+        summary = listing["profiles"][0]
+        self.assertGreater(summary["categories"]["pronotepy"]["share"], 0.5)
+
+        with open(os.path.join(listing["directory"], f"{first.headers['X-Profile-Id']}.folded")) as f:
+            folded = f.read()
+        # La pile du worker upstream est greffée sous l'attente du thread de requête.
+        self.assertRegex(folded, r"timetable \(pronote_api:\d+\);.*_call_with_deadline.*;slow_lessons \(pronotepy\.synthetic:\d+\) \d+")
+
+    def test_header_profiles_a_single_request_only_when_enabled(self):
+        response = self.client.get("/api/health", headers={"X-Pronote-Profile": "1"})
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.assertIsNone(self.client.get("/api/debug/profile").get_json()["header"])
+
+        settings = self.api._profiler.settings
+        self.api._profiler.settings = self.api._profiling_settings({"profiling": {"allow_header": True}})
+        try:
+            response = self.client.get("/api/health", headers={"X-Pronote-Profile": "1"})
+        finally:
+            self.api._profiler.settings = settings
+        self.assertIn("X-Profile-Id", response.headers)
+        self.assertEqual(self.client.delete("/api/debug/profile").get_json(), {"armed": []})
+        self.assertEqual(self.client.post("/api/debug/profile?route=/api/x&n=abc").status_code, 400)
+
+
+class UpstreamSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.settings = self.api._scheduler_settings(
+            {"scheduler": {"max_concurrent": 1, "reserved_interactive": 0, "rate": 1000, "burst": 1000, "queue_timeout": 5}}
+        )
+
+    def _waiter(self, scheduler, priority, order):
+        def run():
+            with scheduler.slot("pronote.example", priority):
+                order.append(priority)
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def _wait_queued(self, scheduler, count):
+        deadline = time.monotonic() + 2
+        while scheduler.stats()["hosts"]["pronote.example"]["waiting"] < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_waiters_are_served_by_priority_then_arrival(self):
+        scheduler = self.api.UpstreamScheduler(self.settings)
+        order = []
+        scheduler.acquire("pronote.example", "interactive")
+        threads = []
+        for priority in ("background", "prefetch", "interactive", "mutation"):
+            threads.append(self._waiter(scheduler, priority, order))
+            self._wait_queued(scheduler, len(threads))
+        scheduler.release("pronote.example")
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(order, ["interactive", "mutation", "prefetch", "background"])
+        stats = scheduler.stats()["classes"]
+        self.assertEqual(stats["background"]["calls"], 1)
+        self.assertGreater(stats["background"]["wait_max_ms"], 0)
+
+    def test_reserved_slot_and_token_budget(self):
+        settings = dict(self.settings, max_concurrent=2, reserved_interactive=1, queue_timeout=0.05)
+        scheduler = self.api.UpstreamScheduler(settings)
+        scheduler.acquire("pronote.example", "background")
+        with self.assertRaises(self.api.AdapterTimeoutError):
+            scheduler.acquire("pronote.example", "background")
+        scheduler.acquire("pronote.example", "interactive")
+        self.assertEqual(scheduler.stats()["classes"]["background"]["timeouts"], 1)
+
+        ticks = iter(range(1000))
+        scheduler = self.api.UpstreamScheduler(dict(settings, rate=0.0, burst=2), clock=lambda: next(ticks) / 100)
+        for _ in range(2):
+            scheduler.acquire("other.example", "interactive")
+            scheduler.release("other.example")
+        with self.assertRaises(self.api.AdapterTimeoutError):
+            scheduler.acquire("other.example", "interactive")
+
+    def test_adapter_calls_carry_host_and_priority(self):
+        scheduler = self.api.UpstreamScheduler(self.settings)
+        seen = []
+        original = scheduler.acquire
+        scheduler.acquire = lambda host, priority: seen.append((host, priority)) or original(host, priority)
+        adapter = self.api.ScheduledAdapter(DummyAdapter(), scheduler)
+        adapter.login("https://Pronote.Example/pronote/", "u", "p")
+        adapter.get_periods()
+        adapter.set_homework_done("h1", True)
+        with self.api.upstream_priority("background"):
+            adapter.get_discussions()
+        self.assertEqual(
+            seen,
+            [
+                ("pronote.example", "interactive"),
+                ("pronote.example", "interactive"),
+                ("pronote.example", "mutation"),
+                ("pronote.example", "background"),
+            ],
+        )
+
+    def test_timed_out_call_keeps_its_slot_until_the_worker_finishes(self):
+        scheduler = self.api.UpstreamScheduler(self.settings)
+        inner = FlakyUpstreamAdapter(logged_in=True)
+        inner.delay = 0.3
+        resilience = self.api._resilience_settings({"resilience": {"read_deadline": 0.05, "read_retries": 0}})
+        adapter = self.api.ScheduledAdapter(self.api.ResilientBackendAdapter(inner, resilience), scheduler)
+
+        with self.assertRaises(self.api.AdapterTimeoutError):
+            adapter.get_lessons(dt.date(2026, 2, 2), dt.date(2026, 2, 8))
+        self.assertEqual(scheduler.stats()["hosts"]["-"]["in_flight"], 1)
+        deadline = time.monotonic() + 2
+        while scheduler.stats()["hosts"]["-"]["in_flight"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(scheduler.stats()["hosts"]["-"]["in_flight"], 0)
+
+    def test_attachment_stream_holds_its_slot_until_closed(self):
+        scheduler = self.api.UpstreamScheduler(self.settings)
+        upstream = types.SimpleNamespace(headers={}, closed=0)
+        upstream.close = lambda: setattr(upstream, "closed", upstream.closed + 1)
+        inner = DummyAdapter(logged_in=True)
+        inner.download_attachment = lambda url: upstream
+        adapter = self.api.ScheduledAdapter(inner, scheduler)
+
+        stream = adapter.download_attachment("https://pronote.example/f")
+        self.assertEqual(scheduler.stats()["hosts"]["-"]["in_flight"], 1)
+        self.assertEqual(stream.headers, {})
+        stream.close()
+        stream.close()
+        self.assertEqual(scheduler.stats()["hosts"]["-"]["in_flight"], 0)
+        self.assertEqual(upstream.closed, 2)
+
+
+class CountingDummyAdapter(DummyAdapter):
+    """DummyAdapter qui note les lectures parvenues jusqu'à lui."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def get_lessons(self, date_from, date_to):
+        self.calls.append("get_lessons")
+        return super().get_lessons(date_from, date_to)
+
+    def get_homework(self, date_from, date_to):
+        self.calls.append("get_homework")
+        return super().get_homework(date_from, date_to)
+
+
+class AccountRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.api._accounts._autostart = False
+        self.client = self.api.app.test_client()
+        today = dt.date.today()
+        self.first = CountingDummyAdapter(
+            lessons=[
+                types.SimpleNamespace(
+                    id="l1", start=dt.datetime.combine(today, dt.time(8)), end=dt.datetime.combine(today, dt.time(9)), subject=None
+                )
+            ],
+            homeworks=[types.SimpleNamespace(id="h1", date=today, done=False)],
+            discussions=[types.SimpleNamespace(id="d1", unread=True)],
+        )
+        self.second = CountingDummyAdapter()
+        self.api._adapter = self.first
+        self.api._new_account_adapter = lambda: self.second
+
+    def _login(self, username):
+        return self.client.post(
+            "/api/login",
+            json={"pronote_url": "https://demo.index-education.net/pronote/", "username": username, "password": "x"},
+        )
+
+    def test_second_login_keeps_first_account_connected(self):
+        first_id = self._login("parent").get_json()["account_id"]
+        second_id = self._login("enfant2").get_json()["account_id"]
+        self.assertNotEqual(first_id, second_id)
+        self.assertIs(self.api._adapter._inner, self.second)
+        self.assertTrue(self.first.is_logged_in())
+
+        listed = {a["id"]: a for a in self.client.get("/api/accounts").get_json()}
+        self.assertEqual(set(listed), {first_id, second_id})
+        self.assertTrue(listed[second_id]["active"])
+        self.assertFalse(listed[first_id]["active"])
+
+        response = self.client.post(f"/api/accounts/{first_id}/activate")
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(self.api._adapter._inner, self.first)
+        self.assertEqual(self.first.login_calls, [("https://demo.index-education.net/pronote/", "parent", "x")])
+
+    def test_login_after_expired_session_gets_its_own_adapter(self):
+        first_id = self._login("parent").get_json()["account_id"]
+        self.first.logout()
+        second_id = self._login("enfant2").get_json()["account_id"]
+        self.assertIs(self.api._adapter._inner, self.second)
+        self.assertIs(self.api._accounts.get(first_id).adapter._inner, self.first)
+
+        listed = {a["id"]: a for a in self.client.get("/api/accounts").get_json()}
+        self.assertTrue(listed[second_id]["active"])
+        self.assertFalse(listed[first_id]["active"])
+        self.assertFalse(listed[first_id]["logged_in"])
+
+    def test_background_sync_serves_reactivated_account_from_warm_data(self):
+        first_id = self._login("parent").get_json()["account_id"]
+        self._login("enfant2")
+        self.assertEqual(self.api._accounts.sync_due(wait=True), 1)
+        account = self.api._accounts.get(first_id)
+        self.assertEqual(account.counters["discussions_unread"], 1)
+        self.assertEqual(account.counters["homework_pending"], 1)
+
+        self.client.post(f"/api/accounts/{first_id}/activate")
+        self.first.calls.clear()
+        today = dt.date.today().isoformat()
+        response = self.client.get(f"/api/timetable?from={today}&to={today}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([l["id"] for l in response.get_json()], ["l1"])
+        self.assertEqual(self.first.calls, [])
+
+        self.client.patch("/api/homework/h1/done", json={"done": True})
+        self.assertEqual(self.api._adapter._warm, {})
+
+    def test_warm_sync_loads_discussion_messages_once_under_the_session_lock(self):
+        fetched = []
+        inner = self.api.PronotepySyncAdapter()
+
+        class Discussion:
+            id, subject, unread = "d1", "Sortie", True
+
+            @property
+            def messages(self):
+                fetched.append(inner._session_lock._is_owned())
+                return [types.SimpleNamespace(id="m1", author="Mme Martin", content="Bonjour", date=None, seen=False)]
+
+        inner._client = types.SimpleNamespace(
+            logged_in=True,
+            lessons=lambda date_from, date_to: [],
+            homework=lambda date_from, date_to: [],
+            discussions=lambda: [Discussion()],
+            information_and_surveys=lambda: [],
+        )
+        scheduler = self.api.UpstreamScheduler(self.api._scheduler_settings({}))
+        adapter = self.api.WarmAdapter(self.api.ScheduledAdapter(inner, scheduler))
+        today = dt.date.today()
+        with self.api.upstream_priority("background"):
+            counters = adapter.warm(today, today + dt.timedelta(days=7))
+
+        self.assertEqual(counters["discussions_unread"], 1)
+        self.assertEqual(fetched, [True])
+        self.assertEqual(scheduler.stats()["classes"]["background"]["calls"], 4)
+        served = adapter.get_discussions()
+        self.assertEqual(self.api.discussion_to_dict(served[0])["messages"][0]["content"], "Bonjour")
+        self.assertEqual(fetched, [True])
+
+    def test_unknown_active_and_logged_out_accounts(self):
+        first_id = self._login("parent").get_json()["account_id"]
+        self.assertEqual(self.client.post("/api/accounts/inconnu/activate").status_code, 404)
+        self.assertEqual(self.client.delete(f"/api/accounts/{first_id}").status_code, 409)
+
+        second_id = self._login("enfant2").get_json()["account_id"]
+        self.first.logout()
+        self.assertEqual(self.client.post(f"/api/accounts/{first_id}/activate").status_code, 409)
+        self.assertEqual(self.client.delete(f"/api/accounts/{first_id}").status_code, 200)
+
+        self.client.post("/api/logout")
+        self.assertEqual(self.client.get("/api/accounts").get_json(), [])
+        self.assertIsNone(self.api._accounts.get(second_id))
+
+
+class IcalSubscriptionTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.api._accounts._autostart = False
+        self.api._ical_subscriptions.settings = dict(self.api._ical_subscriptions.settings, refresh_seconds=0)
+        self.client = self.api.app.test_client()
+        monday = dt.date.today() - dt.timedelta(days=dt.date.today().weekday())
+        self.lessons = [self._lesson("l1", monday, "Maths"), self._lesson("l2", monday + dt.timedelta(days=7), "SVT; TP")]
+        self.adapter = CountingDummyAdapter(lessons=self.lessons)
+        self.api._adapter = self.adapter
+        self.client.post(
+            "/api/login",
+            json={"pronote_url": "https://demo.index-education.net/pronote/", "username": "prof", "password": "x"},
+        )
+
+    @staticmethod
+    def _lesson(lesson_id, day, subject):
+        return types.SimpleNamespace(
+            id=lesson_id,
+            subject=types.SimpleNamespace(id=subject, name=subject, groups=False),
+            start=dt.datetime.combine(day, dt.time(8)),
+            end=dt.datetime.combine(day, dt.time(9)),
+            classroom="B12",
+            canceled=False,
+        )
+
+    def _feed_path(self):
+        created = self.client.post("/api/export/ical/subscription")
+        self.assertEqual(created.status_code, 201)
+        return created.get_json()["url"].split("localhost", 1)[1]
+
+    def test_feed_requires_a_valid_token(self):
+        path = self._feed_path()
+        self.assertEqual(self.client.get("/api/export/ical/feed/nope.ics").status_code, 404)
+        second = self._feed_path()
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(self.client.get(second).status_code, 200)
+        self.client.delete("/api/export/ical/subscription")
+        self.assertEqual(self.client.get(second).status_code, 404)
+
+    def test_unchanged_polls_are_304_and_only_changed_weeks_rebuild(self):
+        path = self._feed_path()
+        first = self.client.get(path)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.mimetype, "text/calendar")
+        body = first.get_data(as_text=True)
+        self.assertIn("SUMMARY:SVT\\; TP\r\n", body)
+        self.assertEqual(body.count("BEGIN:VEVENT"), 2)
+        calendar = next(iter(self.api._ical_subscriptions._calendars.values()))
+        weeks = len(calendar._weeks)
+        self.assertEqual(calendar.rebuilds, weeks)
+
+        again = self.client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(calendar.rebuilds, weeks)
+
+        self.lessons[1].classroom = "C01"
+        changed = self.client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn("LOCATION:C01", changed.get_data(as_text=True))
+        self.assertEqual(calendar.rebuilds, weeks + 1)
+
+    def test_feed_serves_last_calendar_after_logout(self):
+        path = self._feed_path()
+        self.assertEqual(self.client.get(path).status_code, 200)
+        self.client.post("/api/logout")
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+
+class ArchiveExportTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        monday = dt.date(2026, 1, 5)
+
+        class Period:
+            def __init__(self, period_id, name, start, end, grades):
+                self.id, self.name, self.start, self.end = period_id, name, start, end
+                self.grades = grades
+                self.averages = []
+                self.delays = [types.SimpleNamespace(id="r1", date=start, minutes=5, justified=False)]
+
+            @property
+            def absences(self):
+                raise RuntimeError("absences indisponibles")
+
+        grade = types.SimpleNamespace(id="g1", grade="15", out_of="20", date=monday, subject=None)
+        self.periods = [
+            Period("p1", "Trimestre 1", monday, monday + dt.timedelta(days=6), [grade]),
+            Period("p2", "Trimestre 2", monday + dt.timedelta(days=7), monday + dt.timedelta(days=13), []),
+        ]
+        self.api._adapter = DummyAdapter(logged_in=True, periods=self.periods)
+
+    def test_ndjson_streams_records_progress_and_errors(self):
+        response = self.client.get("/api/export/archive")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines[0]["type"], "periods")
+        self.assertEqual([p["id"] for p in lines[0]["data"]], ["p1", "p2"])
+
+        # 4 sections × 2 périodes, 2 semaines × (emploi du temps + devoirs), discussions, informations
+        total = int(response.headers["X-Archive-Total"])
+        self.assertEqual(total, 14)
+        records = [l for l in lines if l["type"] == "record"]
+        errors = [l for l in lines if l["type"] == "error"]
+        self.assertEqual(len(records) + len(errors), total)
+        self.assertEqual({e["section"] for e in errors}, {"absences"})
+        grades = next(r for r in records if r["section"] == "grades" and r["period"]["id"] == "p1")
+        self.assertEqual(grades["data"][0]["grade"], "15")
+        self.assertEqual([l["done"] for l in lines if l["type"] == "progress"], list(range(1, total + 1)))
+        self.assertEqual(lines[-1]["state"], "done")
+
+        progress = self.client.get(f"/api/export/archive/{response.headers['X-Archive-Id']}").get_json()
+        self.assertEqual((progress["done"], progress["total"], len(progress["errors"])), (total, total, 2))
+
+    def test_zip_contains_one_json_file_per_task(self):
+        response = self.client.get("/api/export/archive?format=zip&include=grades,timetable")
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            [
+                "emploi-du-temps/2026-W02.json",
+                "emploi-du-temps/2026-W03.json",
+                "manifest.json",
+                "periodes.json",
+                "periodes/trimestre-1-p1/grades.json",
+                "periodes/trimestre-2-p2/grades.json",
+            ],
+        )
+        self.assertEqual(json.loads(archive.read("manifest.json"))["done"], 4)
+        self.assertIsNone(archive.testzip())
+
+    def test_period_sections_go_through_the_adapter_at_prefetch_priority(self):
+        seen = []
+        adapter = self.api._adapter
+        adapter.get_period_grades = lambda period: seen.append((period.id, self.api.current_priority("get_period_grades"))) or []
+        self.client.get("/api/export/archive?include=grades").get_data()
+        self.assertEqual(sorted(seen), [("p1", "prefetch"), ("p2", "prefetch")])
+
+    def test_stuck_task_is_reported_and_the_export_finishes(self):
+        release = threading.Event()
+        adapter = self.api._adapter
+        adapter.get_discussions = lambda: release.wait(2) and []
+        self.api._archive_exporter.settings = dict(self.api._archive_exporter.settings, task_timeout=0.05)
+        try:
+            lines = [json.loads(l) for l in self.client.get("/api/export/archive?include=grades,discussions").get_data(as_text=True).splitlines()]
+        finally:
+            release.set()
+        error = next(l for l in lines if l["type"] == "error")
+        self.assertEqual(error["section"], "discussions")
+        self.assertIn("Délai dépassé", error["error"])
+        self.assertEqual(lines[-1]["state"], "done")
+
+    def test_rejects_unknown_sections_and_formats(self):
+        self.assertEqual(self.client.get("/api/export/archive?include=grades,bulletins").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/archive?format=xml").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/archive/inconnu").status_code, 404)
+
+
+class PeriodHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.api = _import_pronote_api("pronotepy-sync")
+        self.client = self.api.app.test_client()
+        today = dt.date.today()
+        self.loads = loads = []
+
+        class Period:
+            def __init__(self, period_id, start, end):
+                self.id, self.name, self.start, self.end = period_id, f"Période {period_id}", start, end
+                self.delays = []
+
+            @property
+            def grades(self):
+                loads.append((self.id, "grades"))
+                time.sleep(0.1)
+                return [types.SimpleNamespace(id=f"{self.id}-g", grade="12", out_of="20", date=self.start, subject=None)]
+
+            @property
+            def averages(self):
+                loads.append((self.id, "averages"))
+                raise RuntimeError("moyennes indisponibles")
+
+        self.periods = [
+            Period("closed", today - dt.timedelta(days=120), today - dt.timedelta(days=30)),
+            Period("current", today - dt.timedelta(days=29), today + dt.timedelta(days=60)),
+            Period("next", today + dt.timedelta(days=61), today + dt.timedelta(days=150)),
+        ]
+        self.api._adapter = DummyAdapter(logged_in=True, periods=self.periods)
+
+    def test_all_periods_load_in_parallel_keyed_by_period(self):
+        started = time.monotonic()
+        payload = self.client.get("/api/history?resources=grades,averages").get_json()
+        self.assertLess(time.monotonic() - started, 0.25)  # en série : 0,3 s
+        self.assertEqual(payload["order"], ["closed", "current", "next"])
+        closed = payload["periods"]["closed"]
+        self.assertTrue(closed["closed"])
+        self.assertFalse(payload["periods"]["current"]["closed"])
+        self.assertEqual(closed["grades"][0]["id"], "closed-g")
+        self.assertEqual(closed["grades"][0]["period"]["id"], "closed")
+        self.assertEqual(closed["averages"], [])
+        self.assertIn("averages", closed["errors"])
+
+    def test_closed_periods_stay_cached_open_ones_expire(self):
+        self.client.get("/api/history?resources=grades")
+        self.loads.clear()
+        self.api._period_history.cache.open_ttl = 0
+        payload = self.client.get("/api/history?resources=grades").get_json()
+        self.assertEqual(payload["periods"]["closed"]["cached"], ["grades"])
+        self.assertEqual(sorted(self.loads), [("current", "grades"), ("next", "grades")])
+
+        self.api._reset_session_state()
+        self.loads.clear()
+        self.client.get("/api/history?resources=grades")
+        self.assertEqual(len(self.loads), 3)
+
+    def test_rejects_unknown_resources(self):
+        self.assertEqual(self.client.get("/api/history?resources=grades,bulletins").status_code, 400)
+
+    def test_reads_go_through_the_adapter_at_prefetch_priority(self):
+        seen = []
+        adapter = self.api._adapter
+        adapter.get_period_grades = lambda period: seen.append((period.id, self.api.current_priority("get_period_grades"))) or []
+        self.client.get("/api/history?resources=grades")
+        self.assertEqual(sorted(seen), [("closed", "prefetch"), ("current", "prefetch"), ("next", "prefetch")])
+
+    def test_slow_resources_are_reported_once_the_timeout_expires(self):
+        self.api._period_history.settings = dict(self.api._period_history.settings, timeout=0.02)
+        payload = self.client.get("/api/history?resources=grades").get_json()
+        self.assertEqual(payload["periods"]["current"]["grades"], [])
+        self.assertIn("Délai dépassé", payload["periods"]["current"]["errors"]["grades"])
+
+    def test_sync_adapter_serializes_calls_on_one_session(self):
+        adapter = self.api.PronotepySyncAdapter()
+        adapter._client = types.SimpleNamespace(logged_in=True)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        class Period:
+            @property
+            def grades(self):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+                return []
+
+        threads = [threading.Thread(target=adapter.get_period_grades, args=(Period(),)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(peak[0], 1)
+
+
 class BackendRoutesContractTests(unittest.TestCase):
     def setUp(self):
         self.api = _import_pronote_api("pronotepy-sync")